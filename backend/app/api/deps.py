@@ -1,23 +1,37 @@
 from typing import Generator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from pydantic import BaseModel, ValidationError
 from app.core import security
 from app.core.config import settings
+from app.core.users import UserStore, user_store
+from app.db.neo4j_client import AsyncNeo4jClient, async_neo4j_client
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
 )
 
+def get_db() -> AsyncNeo4jClient:
+    """
+    注入共享的异步 Neo4j 客户端 (驱动由 app.main 中的 lifespan 管理)。
+    """
+    return async_neo4j_client
+
+def get_user_store() -> UserStore:
+    """
+    注入用户存储 (默认由 AUTH_USER_STORE 决定，可通过 dependency_overrides 替换)。
+    """
+    return user_store
+
 class TokenPayload(BaseModel):
     sub: Optional[str] = None
 
-def get_current_user(token: str = Depends(reusable_oauth2)) -> TokenPayload:
+async def get_current_user(token: str = Depends(reusable_oauth2)) -> TokenPayload:
+    # async 依赖直接在事件循环中执行 (同步依赖会被派发到线程池)；
+    # 已验证过的 token 命中缓存，不再重复校验签名
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = security.decode_access_token(token)
         token_data = TokenPayload(**payload)
     except (JWTError, ValidationError):
         raise HTTPException(
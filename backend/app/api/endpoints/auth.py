@@ -2,8 +2,11 @@ from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from app.api.deps import get_user_store
 from app.core import security
 from app.core.config import settings
+from app.core.security import PasswordHasherBusy, password_hasher
+from app.core.users import UserStore
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -12,24 +15,22 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
-# Mock user database
-FAKE_USERS_DB = {
-    "admin": {
-        "username": "admin",
-        "full_name": "Admin User",
-        "email": "admin@example.com",
-        "hashed_password": security.get_password_hash("admin"),
-        "disabled": False,
-    }
-}
-
 @router.post("/login", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()) -> Any:
-    user_dict = FAKE_USERS_DB.get(form_data.username)
-    if not user_dict:
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    users: UserStore = Depends(get_user_store),
+) -> Any:
+    user_dict = await users.get(form_data.username)
+    if not user_dict or user_dict.get("disabled"):
         raise HTTPException(status_code=400, detail="Incorrect username or password")
     
-    if not security.verify_password(form_data.password, user_dict["hashed_password"]):
+    # bcrypt 在专用线程池中校验，登录洪峰不会阻塞其他请求
+    try:
+        verified = await password_hasher.verify(form_data.password, user_dict["hashed_password"])
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e),
+                            headers={"Retry-After": str(e.retry_after)})
+    if not verified:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
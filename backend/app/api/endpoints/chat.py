@@ -1,17 +1,38 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
-from app.langgraph_agent.graph import run_agent
-import traceback
+from app.langgraph_agent.answer_cache import answer_cache
+from app.langgraph_agent.llm_gateway import LLMOverloaded, llm_gateway, question_flights
+from app.langgraph_agent.templates import intent_router
+import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 class ChatRequest(BaseModel):
     message: str
+    # 同一 session_id 的请求共享对话历史；不传则为单轮问答
+    session_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     response: str
     steps: Optional[List[dict]] = None
+    session_id: Optional[str] = None
+
+def _agent():
+    # 延迟导入: langchain / langgraph 与模型客户端在后台预热或第一次对话时才加载，
+    # 不拖慢应用启动
+    from app.langgraph_agent import graph
+    return graph
+
+def _overloaded(e: LLMOverloaded) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
 
 @router.post("/", response_model=ChatResponse)
 async def chat(request: ChatRequest):
@@ -21,17 +42,79 @@ async def chat(request: ChatRequest):
     """
     try:
         # 调用 LangGraph Agent 处理消息
-        result = await run_agent(request.message)
+        result = await _agent().run_agent(request.message, session_id=request.session_id)
         
         return {
             "response": result["response"],
-            "steps": [
-                {"node": "Agent", "status": "completed", "detail": "LangGraph 处理完成"},
-                # 如果 Agent 状态中捕获了详细步骤，可以在这里扩展
-            ]
+            # 每个图节点 (agent / tools) 的实际执行耗时
+            "steps": result["steps"],
+            "session_id": request.session_id
         }
+    except LLMOverloaded as e:
+        raise _overloaded(e)
     except Exception as e:
-        # 将完整堆栈跟踪记录到控制台以便调试
-        print(f"❌ 聊天端点错误: {e}")
-        traceback.print_exc()
+        logger.exception(f"聊天端点错误: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    流式聊天端点 (Server-Sent Events)。
+    事件类型: token / tool_start / tool_end / step / done / error，
+    每个事件的 data 为 JSON (字段见 stream_agent)。
+    LLM 网关排队已满时在建立流之前直接返回 429。
+    """
+    try:
+        llm_gateway.check_admission()
+    except LLMOverloaded as e:
+        raise _overloaded(e)
+
+    async def _events():
+        try:
+            async for event in _agent().stream_agent(request.message, session_id=request.session_id):
+                name = event.pop("event")
+                if name == "done":
+                    event.pop("full_messages", None)
+                    event["session_id"] = request.session_id
+                yield _sse(name, event)
+        except LLMOverloaded as e:
+            yield _sse("error", {"detail": str(e), "status": 429, "retry_after": e.retry_after})
+        except Exception as e:
+            logger.exception(f"流式聊天错误: {e}")
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        # 禁止反向代理 (nginx) 缓冲，保证 token 实时到达
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/cache/stats")
+async def chat_cache_stats():
+    """
+    问答缓存统计: 条目数、精确/语义命中次数与命中率。
+    """
+    return answer_cache.stats()
+
+@router.delete("/sessions/{session_id}", status_code=204)
+async def delete_chat_session(session_id: str):
+    """
+    清除指定会话的对话历史 (检查点)。
+    """
+    from app.langgraph_agent.memory import conversation_memory
+    await conversation_memory.delete(session_id)
+
+@router.get("/router/stats")
+async def chat_router_stats():
+    """
+    意图路由统计: 未命中问答缓存的请求中走模板快速路径的比例，以及各模板的命中次数。
+    """
+    return intent_router.stats()
+
+@router.get("/gateway/stats")
+async def chat_gateway_stats():
+    """
+    LLM 网关状态: 进行中/排队中的调用数、累计调用与拒绝次数、合并的重复请求数。
+    """
+    return {**llm_gateway.stats(), "coalesced_requests": question_flights.coalesced}
@@ -1,7 +1,12 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 from typing import List
-from app.db.neo4j_client import neo4j_client
+from app.api.deps import get_db
+from app.api.responses import trusted
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.graph_version import graph_version
+from app.db.neo4j_client import AsyncNeo4jClient
 
 router = APIRouter()
 
@@ -10,79 +15,73 @@ class AuditStat(BaseModel):
     value: int
     color: str
 
-@router.get("/stats")
-async def get_dashboard_stats():
-    """
-    获取仪表盘统计数据。
-    包括风险分布（按严重程度）和合规性状态。
-    """
-    # 1. 风险分布 (按严重程度)
-    query_risk = """
-    MATCH (r:Risk)
-    RETURN r.severity as severity, count(r) as count
-    """
-    risk_data = neo4j_client.execute_query(query_risk)
-    
-    # 将严重程度映射到颜色和标准名称
-    # 数据库中的严重程度: 'High', 'Medium', 'Low'
-    risk_map = {
-        "High": {"name": "高危", "color": "#ef4444"},
-        "Medium": {"name": "中危", "color": "#f59e0b"},
-        "Low": {"name": "低危", "color": "#3b82f6"}
-    }
-    
-    risk_stats = []
-    for item in risk_data:
-        severity = item.get("severity")
-        count = item.get("count")
-        if severity in risk_map:
-            risk_stats.append({
-                "name": risk_map[severity]["name"],
-                "value": count,
-                "color": risk_map[severity]["color"]
-            })
-    
-    # 2. 合规性统计 (目前基于风险状态推导)
-    # 逻辑: Open = 不合规, Mitigated = 待审核, Closed = 合规
-    query_status = """
+# 将严重程度映射到颜色和标准名称
+# 数据库中的严重程度: 'High', 'Medium', 'Low'
+RISK_MAP = {
+    "High": {"name": "高危", "color": "#ef4444"},
+    "Medium": {"name": "中危", "color": "#f59e0b"},
+    "Low": {"name": "低危", "color": "#3b82f6"}
+}
+
+# 映射状态到合规类别
+# 逻辑: Open = 不合规, Mitigated = 待审核, Closed = 合规
+STATUS_MAP = {
+    "Open": {"name": "不合规", "color": "#ef4444"},
+    "Mitigated": {"name": "待审核", "color": "#f59e0b"},
+    "Closed": {"name": "已合规", "color": "#10b981"}
+}
+
+# 一次往返完成所有统计:
+# - 全图节点数与 Document 数走计数存储 (count store)，不扫描节点；
+#   节点数只统计 AuditEntity，不含保存图谱版本号的 GraphMeta 节点
+# - Risk 只扫描一次，按 (severity, status) 分组后在 Python 中分别汇总
+DASHBOARD_STATS_QUERY = """
+CALL { MATCH (n:AuditEntity) RETURN count(n) AS total_nodes }
+CALL { MATCH (d:Document) RETURN count(d) AS total_documents }
+CALL {
     MATCH (r:Risk)
-    RETURN r.status as status, count(r) as count
-    """
-    status_data = neo4j_client.execute_query(query_status)
-    
-    # 映射状态到合规类别
-    # 数据库状态: 'Open', 'Mitigated', 'Closed'
-    status_map = {
-        "Open": {"name": "不合规", "color": "#ef4444"},
-        "Mitigated": {"name": "待审核", "color": "#f59e0b"},
-        "Closed": {"name": "已合规", "color": "#10b981"}
-    }
-    
-    compliance_stats = []
-    for item in status_data:
-        status = item.get("status")
-        count = item.get("count")
-        if status in status_map:
-            compliance_stats.append({
-                "name": status_map[status]["name"],
-                "value": count,
-                "color": status_map[status]["color"]
-            })
+    WITH r.severity AS severity, r.status AS status, count(*) AS count
+    RETURN collect({severity: severity, status: status, count: count}) AS buckets
+}
+RETURN total_nodes, total_documents, buckets
+"""
+
+# 按图谱版本缓存，ETL 完成后版本号递增即自动失效
+_stats_cache = TTLCache(maxsize=4, ttl=settings.DASHBOARD_CACHE_TTL)
+
+def _to_stats(totals: dict, mapping: dict) -> List[dict]:
+    return [
+        {"name": mapping[key]["name"], "value": count, "color": mapping[key]["color"]}
+        for key, count in totals.items() if key in mapping
+    ]
 
-    # 3. Graph Stats
-    query_nodes = "MATCH (n) RETURN count(n) as count"
-    nodes_count = neo4j_client.execute_query(query_nodes)[0]['count']
-    
-    # 4. Document Stats (Assuming 'Document' label)
-    query_docs = "MATCH (d:Document) RETURN count(d) as count"
-    docs_count = neo4j_client.execute_query(query_docs)[0]['count']
+async def _compute_dashboard_stats(db: AsyncNeo4jClient) -> dict:
+    record = (await db.execute_query(DASHBOARD_STATS_QUERY, name="dashboard_stats"))[0]
+
+    severity_totals, status_totals = {}, {}
+    for bucket in record["buckets"]:
+        severity_totals[bucket["severity"]] = severity_totals.get(bucket["severity"], 0) + bucket["count"]
+        status_totals[bucket["status"]] = status_totals.get(bucket["status"], 0) + bucket["count"]
 
     return {
-        "compliance": compliance_stats,
-        "risk_distribution": risk_stats,
+        "compliance": _to_stats(status_totals, STATUS_MAP),
+        "risk_distribution": _to_stats(severity_totals, RISK_MAP),
         "summary": {
-            "total_nodes": nodes_count,
-            "total_documents": docs_count,
+            "total_nodes": record["total_nodes"],
+            "total_documents": record["total_documents"],
             # Calculated fields can be done here or frontend, let's pass raw counts
         }
     }
+
+@router.get("/stats")
+async def get_dashboard_stats(db: AsyncNeo4jClient = Depends(get_db)):
+    """
+    获取仪表盘统计数据。
+    包括风险分布（按严重程度）和合规性状态。
+    """
+    version = await graph_version.current(db)
+    stats = _stats_cache.get(version)
+    if stats is None:
+        stats = await _compute_dashboard_stats(db)
+        _stats_cache.set(version, stats)
+    return trusted(stats)
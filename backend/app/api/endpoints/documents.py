@@ -1,26 +1,48 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from pydantic import BaseModel
-from typing import List, Optional
-from app.db.neo4j_client import neo4j_client
+from typing import List, Literal, Optional
+from app.api.deps import get_db
+from app.api.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, build_page_query, paginate, parse_fields
+from app.api.responses import trusted
+from app.db.neo4j_client import AsyncNeo4jClient
 
 router = APIRouter()
 
 class Document(BaseModel):
     id: str
-    name: str
-    type: str
+    name: Optional[str] = None
+    type: Optional[str] = None
     size: Optional[str] = "Unknown"
     uploadDate: Optional[str] = None
     status: Optional[str] = "Indexed"
 
-@router.get("/", response_model=List[Document])
-async def get_documents():
-    query = """
-    MATCH (d:Document)
-    RETURN d.id as id, d.name as name, d.type as type, d.size as size, d.uploadDate as uploadDate, d.status as status
-    """
+DOCUMENT_FIELDS = list(Document.model_fields)
+DOCUMENT_SORT_FIELDS = {"id", "name", "type", "uploadDate", "status"}
+
+@router.get("/", response_model=List[Document], response_model_exclude_unset=True)
+async def get_documents(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    sort: str = Query("id"),
+    order: Literal["asc", "desc"] = "asc",
+    type: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段，例如 id,name,status"),
+    db: AsyncNeo4jClient = Depends(get_db),
+):
+    if sort not in DOCUMENT_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Unsupported sort field: {sort}")
+
+    query, params = build_page_query(
+        label="Document", var="d",
+        filters={"type": type, "status": status},
+        sort=sort, descending=order == "desc", cursor=cursor,
+        fields=parse_fields(fields, DOCUMENT_FIELDS, required=["id", sort]),
+        limit=limit,
+    )
     try:
-        results = neo4j_client.execute_query(query)
-        return results
+        results = await db.execute_query(query, params, name="documents_list")
+        return trusted(paginate(results, sort, limit, response), response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
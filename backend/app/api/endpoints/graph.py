@@ -1,7 +1,16 @@
-from fastapi import APIRouter
+import asyncio
+import re
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
-from typing import List
-from app.db.neo4j_client import neo4j_client
+from typing import List, Literal, Optional
+from app.api.deps import get_db
+from app.api.responses import trusted
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.graph_engine import graph_engine
+from app.db.graph_snapshot import etag_matches, node_size, snapshot_store
+from app.db.graph_version import graph_version
+from app.db.neo4j_client import AsyncNeo4jClient
 
 router = APIRouter()
 
@@ -20,66 +29,250 @@ class GraphData(BaseModel):
     nodes: List[GraphNode]
     links: List[GraphLink]
 
+class ClusterNode(GraphNode):
+    size: int
+
+class ClusterLink(GraphLink):
+    weight: int
+
+class ClusterData(BaseModel):
+    nodes: List[ClusterNode]
+    links: List[ClusterLink]
+
+# 前端分组 (见 etl_pipeline.GROUP_MAP，Risk 为 4)
+GROUP_LABELS = {1: "法规/控制域", 2: "控制措施", 3: "文档/证据", 4: "风险"}
+
+MAX_HOPS = 3
+MAX_NODES = 2000
+# explore 的 Neo4j 查询每一跳最多新发现的节点数: 度数裁剪 (max_nodes) 在展开之后才进行，
+# 这里限制的是展开本身的工作量
+MAX_EXPANDED_NODES = 10000
+
+_IDENTIFIER_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# 聚合视图只在 ETL 之后才会变化，按图谱版本缓存
+_cluster_cache = TTLCache(maxsize=8, ttl=settings.DASHBOARD_CACHE_TTL)
+
+# 给定节点集合 `nodes` (及各自的度数 `kept`)，在同一查询中只取集合内部的关系，
+# 保证返回的每条链接两端都在节点列表中。
+_SUBGRAPH_RETURN = """
+WITH kept, [k IN kept | k.node] AS nodes
+CALL {{
+    WITH nodes
+    UNWIND nodes AS a
+    MATCH (a)-[r{rel_filter}]->(b)
+    WHERE b IN nodes
+    RETURN collect({{source: a.id, target: b.id, type: type(r)}}) AS links
+}}
+RETURN [k IN kept | {{
+    id: k.node.id,
+    group: coalesce(k.node.group, 1),
+    label: coalesce(k.node.label, k.node.title, k.node.id),
+    degree: k.degree
+}}] AS nodes, links
+"""
+
+OVERVIEW_QUERY = """
+MATCH (n)
+WHERE n.id IS NOT NULL
+WITH n LIMIT $limit
+WITH collect({node: n, degree: COUNT { (n)--() }}) AS kept
+""" + _SUBGRAPH_RETURN.format(rel_filter="")
+
+GROUP_CLUSTER_NODES_QUERY = """
+MATCH (n:AuditEntity)
+RETURN coalesce(n.group, 1) AS cluster, count(*) AS size
+"""
+
+GROUP_CLUSTER_LINKS_QUERY = """
+MATCH (a:AuditEntity)-[r]->(b:AuditEntity)
+WITH coalesce(a.group, 1) AS source, coalesce(b.group, 1) AS target, type(r) AS type, count(*) AS weight
+WHERE source <> target
+RETURN source, target, type, weight
+"""
+
+DOMAIN_CLUSTER_NODES_QUERY = """
+MATCH (d:ControlDomain)
+CALL {
+    WITH d
+    OPTIONAL MATCH (d)-[:CONTAINS]->(c:Control)
+    OPTIONAL MATCH (c)-[:MITIGATES|EVIDENCED_BY]-(x:AuditEntity)
+    RETURN count(DISTINCT c) + count(DISTINCT x) AS size
+}
+RETURN d.id AS cluster, coalesce(d.title, d.code, d.id) AS label, size
+"""
+
+# 两个控制域之间的边权 = 同时被两个域下控制措施关联的风险/文档数量
+DOMAIN_CLUSTER_LINKS_QUERY = """
+MATCH (d1:ControlDomain)-[:CONTAINS]->(:Control)-[:MITIGATES|EVIDENCED_BY]-(x:AuditEntity)
+      -[:MITIGATES|EVIDENCED_BY]-(:Control)<-[:CONTAINS]-(d2:ControlDomain)
+WHERE d1.id < d2.id
+RETURN d1.id AS source, d2.id AS target, 'SHARES' AS type, count(DISTINCT x) AS weight
+"""
+
+def _to_graph_data(record: dict) -> dict:
+    nodes = [
+        {"id": n["id"], "group": n["group"], "label": n["label"], "val": node_size(n["degree"])}
+        for n in record["nodes"]
+    ]
+    return {"nodes": nodes, "links": record["links"]}
+
+def _check_identifiers(names: Optional[List[str]]) -> List[str]:
+    for name in names or []:
+        if not _IDENTIFIER_RE.match(name):
+            raise HTTPException(status_code=400, detail=f"Invalid label or relationship type: {name}")
+    return names or []
+
 @router.get("/", response_model=GraphData)
-async def get_graph_data():
+async def get_graph_data(
+    limit: int = Query(500, ge=1, le=MAX_NODES),
+    db: AsyncNeo4jClient = Depends(get_db),
+):
     """
     获取图谱可视化数据。
     返回节点和链接，供前端 D3/Recharts 渲染使用。
+    链接只在返回的节点之间选取，节点大小 (val) 由度数决定。
     """
-    # 1. 获取节点
-    # 返回所有具有 'id' 属性的节点。
-    query_nodes = """
-    MATCH (n)
-    WHERE n.id IS NOT NULL
-    RETURN n
-    LIMIT 500
+    engine = await graph_engine.get(db)
+    if engine is not None:
+        return trusted(_to_graph_data(await asyncio.to_thread(engine.overview, limit)))
+    results = await db.execute_query(OVERVIEW_QUERY, {"limit": limit}, name="graph_overview")
+    return trusted(_to_graph_data(results[0]))
+
+@router.get("/explore", response_model=GraphData)
+async def explore_graph(
+    seed: str,
+    hops: int = Query(1, ge=0, le=MAX_HOPS),
+    labels: Optional[List[str]] = Query(None, description="只保留这些标签的节点 (种子节点始终保留)"),
+    rel_types: Optional[List[str]] = Query(None, description="只沿这些关系类型扩展"),
+    max_nodes: int = Query(200, ge=1, le=MAX_NODES),
+    db: AsyncNeo4jClient = Depends(get_db),
+):
+    """
+    从种子节点出发的 k 跳邻域展开。
+    超过 max_nodes 时按度数保留最重要的节点，链接只在保留的节点之间返回。
+    """
+    rel_filter = ":" + "|".join(_check_identifiers(rel_types)) if rel_types else ""
+    engine = await graph_engine.get(db)
+    if engine is not None:
+        record = await asyncio.to_thread(engine.explore, seed, hops, labels, rel_types, max_nodes)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Seed node not found")
+        return trusted(_to_graph_data(record))
+
+    # 逐跳 BFS: 每一跳只从上一跳新发现的节点扩展，已到达的节点不再重复展开。
+    # 变长模式 *0..k 会枚举每一条路径，高度数节点附近 3 跳的路径数可达数百万，而邻域本身只有几千个节点；
+    # 每一跳新发现的节点数不超过 MAX_EXPANDED_NODES，超出部分不再展开 (内存图引擎按完整邻域计算)
+    expand = """
+    CALL {{
+        WITH frontier, reached
+        UNWIND frontier AS f
+        MATCH (f)-[{rel_filter}]-(m)
+        WHERE NOT m IN reached
+        WITH DISTINCT m
+        LIMIT $expand_limit
+        RETURN collect(m) AS next
+    }}
+    WITH seed, next AS frontier, reached + next AS reached
+    """.format(rel_filter=rel_filter) * hops
+    label_filter = " AND (n = seed OR any(l IN labels(n) WHERE l IN $labels))" if labels else ""
+    query = f"""
+    MATCH (seed:AuditEntity {{id: $seed}})
+    WITH seed, [seed] AS frontier, [seed] AS reached
+    {expand}
+    UNWIND reached AS n
+    WITH DISTINCT seed, n
+    WHERE n:AuditEntity{label_filter}
+    WITH seed, n, COUNT {{ (n)--() }} AS degree
+    ORDER BY n = seed DESC, degree DESC
+    LIMIT $max_nodes
+    WITH collect({{node: n, degree: degree}}) AS kept
+    """ + _SUBGRAPH_RETURN.format(rel_filter=rel_filter)
+
+    params = {"seed": seed, "labels": labels, "max_nodes": max_nodes, "expand_limit": MAX_EXPANDED_NODES}
+    results = await db.execute_query(query, params, name="graph_explore")
+    # 聚合总会返回一行；种子不存在时节点列表为空
+    if not results or not results[0]["nodes"]:
+        raise HTTPException(status_code=404, detail="Seed node not found")
+    return trusted(_to_graph_data(results[0]))
+
+async def _compute_clusters(db: AsyncNeo4jClient, by: str) -> dict:
+    engine = await graph_engine.get(db)
+    if by == "group":
+        if engine is not None:
+            node_rows, link_rows = await asyncio.to_thread(engine.group_clusters)
+        else:
+            node_rows = await db.execute_query(GROUP_CLUSTER_NODES_QUERY, name="graph_clusters_group_nodes")
+            link_rows = await db.execute_query(GROUP_CLUSTER_LINKS_QUERY, name="graph_clusters_group_links")
+        labels = {row["cluster"]: GROUP_LABELS.get(row["cluster"], f"Group {row['cluster']}") for row in node_rows}
+        groups = {row["cluster"]: row["cluster"] for row in node_rows}
+    else:
+        if engine is not None:
+            node_rows, link_rows = await asyncio.to_thread(engine.domain_clusters)
+        else:
+            node_rows = await db.execute_query(DOMAIN_CLUSTER_NODES_QUERY, name="graph_clusters_domain_nodes")
+            link_rows = await db.execute_query(DOMAIN_CLUSTER_LINKS_QUERY, name="graph_clusters_domain_links")
+        labels = {row["cluster"]: row["label"] for row in node_rows}
+        groups = {row["cluster"]: 1 for row in node_rows}
+
+    nodes = [
+        {
+            "id": f"cluster:{row['cluster']}",
+            "group": groups[row["cluster"]],
+            "label": labels[row["cluster"]],
+            "val": node_size(row["size"]),
+            "size": row["size"],
+        }
+        for row in node_rows
+    ]
+    links = [
+        {
+            "source": f"cluster:{row['source']}",
+            "target": f"cluster:{row['target']}",
+            "type": row["type"],
+            "weight": row["weight"],
+        }
+        for row in link_rows
+    ]
+    return {"nodes": nodes, "links": links}
+
+@router.get("/clusters", response_model=ClusterData)
+async def get_graph_clusters(
+    by: Literal["group", "domain"] = "group",
+    db: AsyncNeo4jClient = Depends(get_db),
+):
     """
-    node_results = neo4j_client.execute_query(query_nodes)
-    
-    nodes = []
-    seen_ids = set()
-    
-    for record in node_results:
-        node_data = record.get("n", {})
-        node_id = node_data.get("id")
-        
-        if node_id and node_id not in seen_ids:
-            # 为缺失字段提供默认值
-            group = node_data.get("group", 1)
-            label = node_data.get("label") or node_data.get("title") or node_id
-            val = node_data.get("val", 10) # 如果缺失，默认大小
-            
-            nodes.append({
-                "id": node_id,
-                "group": group,
-                "label": label,
-                "val": val
-            })
-            seen_ids.add(node_id)
-            
-    # 2. 获取关系 (Links)
-    # 返回已找到节点之间的关系
-    query_links = """
-    MATCH (s)-[r]->(t)
-    WHERE s.id IS NOT NULL AND t.id IS NOT NULL
-    RETURN s.id as source, t.id as target, type(r) as type
-    LIMIT 1000
+    粗粒度视图：把同一分组 (group) 或同一控制域 (ControlDomain) 的节点汇总为一个超级节点，
+    超级节点之间的链接带有聚合后的权重。
     """
-    link_results = neo4j_client.execute_query(query_links)
-    
-    links = []
-    for record in link_results:
-        source = record.get("source")
-        target = record.get("target")
-        # 确保端点存在于我们的节点列表中，以防止前端错误
-        if source in seen_ids and target in seen_ids:
-            links.append({
-                "source": source,
-                "target": target,
-                "type": record.get("type", "RELATED")
-            })
-
-    return {
-        "nodes": nodes,
-        "links": links
-    }
+    key = (by, await graph_version.current(db))
+    clusters = _cluster_cache.get(key)
+    if clusters is None:
+        clusters = await _compute_clusters(db, by)
+        _cluster_cache.set(key, clusters)
+    return trusted(clusters)
+
+@router.get("/engine")
+async def get_graph_engine_stats(db: AsyncNeo4jClient = Depends(get_db)):
+    """
+    进程内图引擎的状态: 是否启用、快照版本、节点/关系数、加载耗时与内存占用。
+    """
+    await graph_engine.get(db)
+    return graph_engine.stats()
+
+@router.get("/snapshot")
+async def get_graph_snapshot(request: Request, db: AsyncNeo4jClient = Depends(get_db)):
+    """
+    返回预计算布局的二进制图谱快照 (格式见 app/db/graph_snapshot.py)。
+    坐标、度数与边均为类型化数组，前端可直接渲染而无需再跑力导向模拟。
+    支持 ETag / If-None-Match：图谱未变化时返回 304。
+    """
+    snapshot = await snapshot_store.get(db)
+    if snapshot is None:
+        # 首个快照正在后台生成
+        return Response(status_code=503, headers={"Retry-After": "5"})
+
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/octet-stream", headers=headers)
@@ -1,7 +1,15 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Any
 from pydantic import BaseModel
-from app.db.neo4j_client import neo4j_client
+from app.api.deps import get_db
+from app.api.responses import dumps, trusted
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.graph_engine import graph_engine
+from app.db.graph_version import graph_version
+from app.db.neo4j_client import AsyncNeo4jClient
 
 router = APIRouter()
 
@@ -12,69 +20,163 @@ class RegulationClause(BaseModel):
     description: str
     children: Optional[List[Any]] = []
 
+# 按控制域排序，每个域一行 (便于流式输出)
+REGULATION_TREE_QUERY = """
+MATCH (d:ControlDomain)
+OPTIONAL MATCH (d)-[:CONTAINS]->(c:Control)
+WITH d, c
+ORDER BY d.code, c.code
+WITH d, collect({
+    id: c.id,
+    code: c.code,
+    title: c.title,
+    description: c.description,
+    children: []
+}) as controls
+RETURN {
+    id: d.id,
+    code: d.code,
+    title: d.title,
+    description: d.description,
+    children: [x IN controls WHERE x.id IS NOT NULL]
+} as domain
+ORDER BY d.code
+"""
+
+# 法规树只在 ETL 之后才会变化，按图谱版本缓存
+_tree_cache = TTLCache(maxsize=2, ttl=settings.REGULATION_CACHE_TTL)
+
 @router.get("/", response_model=List[RegulationClause])
-async def get_regulations():
+async def get_regulations(db: AsyncNeo4jClient = Depends(get_db)):
     # Fetch ControlDomains (e.g. A.5, A.9) and their Controls (e.g. A.5.1.1)
     # This assumes a structure of Standard -> ControlDomain -> Control
-    query = """
-    MATCH (d:ControlDomain)
-    OPTIONAL MATCH (d)-[:CONTAINS]->(c:Control)
-    WITH d, c
-    ORDER BY d.code, c.code
-    WITH d, collect({
-        id: c.id,
-        code: c.code,
-        title: c.title,
-        description: c.description,
-        children: []
-    }) as controls
-    RETURN {
-        id: d.id,
-        code: d.code,
-        title: d.title,
-        description: d.description,
-        children: [x IN controls WHERE x.id IS NOT NULL]
-    } as domain
+    try:
+        version = await graph_version.current(db)
+        regulations = _tree_cache.get(version)
+        if regulations is None:
+            engine = await graph_engine.get(db)
+            if engine is not None:
+                regulations = await asyncio.to_thread(engine.regulation_tree)
+            else:
+                results = await db.execute_query(REGULATION_TREE_QUERY, name="regulation_tree")
+                # results is a list of dicts, each with a 'domain' key
+                regulations = [record['domain'] for record in results]
+            _tree_cache.set(version, regulations)
+        return trusted(regulations)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/stream")
+async def stream_regulations(db: AsyncNeo4jClient = Depends(get_db)):
+    """
+    以 NDJSON 流式返回法规树，每行一个控制域，前端可以逐步渲染。
+    缓存命中或图引擎可用时直接从内存输出；否则边读边发，读完后写入缓存。
+    """
+    version = await graph_version.current(db)
+    cached = _tree_cache.get(version)
+    if cached is None:
+        engine = await graph_engine.get(db)
+        if engine is not None:
+            cached = await asyncio.to_thread(engine.regulation_tree)
+            _tree_cache.set(version, cached)
+
+    async def _lines():
+        if cached is not None:
+            for domain in cached:
+                yield dumps(domain) + b"\n"
+            return
+        domains = []
+        async for record in db.stream_query(REGULATION_TREE_QUERY, name="regulation_tree_stream"):
+            domains.append(record['domain'])
+            yield dumps(record['domain']) + b"\n"
+        _tree_cache.set(version, domains)
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+MAX_TRACE_IDS = 500
+MAX_TRACE_DEPTH = 5
+
+def _traceability_query(depth: int) -> str:
     """
+    每个分支 (风险 / 证据 / REQUIRES 链) 在各自的子查询中独立聚合，
+    避免多个 OPTIONAL MATCH 串联产生 风险 x 证据 的笛卡尔积。
+    """
+    requires = f"""
+    CALL {{
+        WITH c
+        OPTIONAL MATCH p = (c)-[:REQUIRES*1..{depth}]->(req:Control)
+        WITH req, min(length(p)) AS hops
+        RETURN collect(req {{.id, .code, .title, depth: hops}}) AS requires
+    }}
+    """ if depth > 0 else "WITH c, risks, evidence, [] AS requires"
+    return f"""
+    UNWIND $ids AS control_id
+    MATCH (c:Control {{id: control_id}})
+    CALL {{
+        WITH c
+        OPTIONAL MATCH (c)-[:MITIGATES]->(r:Risk)
+        RETURN collect(DISTINCT r {{.id, .title, .severity, .status, .description}}) AS risks
+    }}
+    CALL {{
+        WITH c
+        OPTIONAL MATCH (c)-[:EVIDENCED_BY]->(d)
+        WHERE d:Document OR d:Evidence
+        RETURN collect(DISTINCT {{id: d.id, name: coalesce(d.name, d.title), status: d.status}}) AS evidence
+    }}
+    {requires}
+    RETURN {{
+        control: c {{.id, .code, .title, .description}},
+        risks: risks,
+        evidence: [e IN evidence WHERE e.id IS NOT NULL],
+        requires: requires
+    }} AS details
+    """
+
+async def _fetch_traceability(db: AsyncNeo4jClient, ids: List[str], depth: int) -> List[dict]:
+    engine = await graph_engine.get(db)
+    if engine is not None:
+        return await asyncio.to_thread(engine.traceability, ids, depth)
+    results = await db.execute_query(_traceability_query(depth), parameters={"ids": ids}, name="regulation_traceability")
+    return [record["details"] for record in results]
+
+@router.get("/traceability")
+async def get_traceability(
+    ids: List[str] = Query(..., description="控制项 id，可重复传入多个"),
+    depth: int = Query(1, ge=0, le=MAX_TRACE_DEPTH, description="REQUIRES 依赖链的展开深度"),
+    db: AsyncNeo4jClient = Depends(get_db),
+):
+    """
+    批量获取控制项的追溯信息 (缓解的风险、证据、REQUIRES 依赖链)，一次请求完成整个法规的下钻。
+    不存在的 id 会被忽略。
+    """
+    if len(ids) > MAX_TRACE_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_TRACE_IDS} ids per request")
     try:
-        results = neo4j_client.execute_query(query)
-        # results is a list of dicts, each with a 'domain' key
-        regulations = [record['domain'] for record in results]
-        return regulations
+        return trusted(await _fetch_traceability(db, list(dict.fromkeys(ids)), depth))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/{id}/traceability")
+async def get_control_traceability(
+    id: str,
+    depth: int = Query(1, ge=0, le=MAX_TRACE_DEPTH),
+    db: AsyncNeo4jClient = Depends(get_db),
+):
+    try:
+        results = await _fetch_traceability(db, [id], depth)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not results:
+        raise HTTPException(status_code=404, detail="Regulation control not found")
+    return trusted(results[0])
+
 @router.get("/{id}/details")
-async def get_regulation_details(id: str):
-    query = """
-    MATCH (c:Control {id: $id})
-    OPTIONAL MATCH (c)-[:MITIGATES]->(r:Risk)
-    OPTIONAL MATCH (c)<-[:EVIDENCED_BY]-(d:Document)
-    RETURN {
-        control: {
-            id: c.id,
-            code: c.code,
-            title: c.title,
-            description: c.description
-        },
-        risks: collect(DISTINCT {
-            id: r.id,
-            title: r.title,
-            severity: r.severity,
-            status: r.status,
-            description: r.description
-        }),
-        evidence: collect(DISTINCT {
-            id: d.id,
-            name: d.name,
-            status: d.status
-        })
-    } as details
-    """
+async def get_regulation_details(id: str, db: AsyncNeo4jClient = Depends(get_db)):
     try:
-        results = neo4j_client.execute_query(query, parameters={"id": id})
-        if not results:
-             raise HTTPException(status_code=404, detail="Regulation control not found")
-        return results[0]['details']
+        results = await _fetch_traceability(db, [id], depth=0)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not results:
+        raise HTTPException(status_code=404, detail="Regulation control not found")
+    details = results[0]
+    return trusted({"control": details["control"], "risks": details["risks"], "evidence": details["evidence"]})
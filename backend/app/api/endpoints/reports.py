@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from typing import List
 from pydantic import BaseModel
-from app.db.neo4j_client import neo4j_client
+from app.api.deps import get_db
+from app.db.neo4j_client import AsyncNeo4jClient
 
 router = APIRouter()
 
@@ -14,14 +15,14 @@ class AuditReport(BaseModel):
     findingsCount: int
 
 @router.get("/", response_model=List[AuditReport])
-async def get_reports():
+async def get_reports(db: AsyncNeo4jClient = Depends(get_db)):
     query = """
     MATCH (r:AuditReport)
     RETURN r.id as id, r.title as title, r.date as date, r.status as status, r.summary as summary, r.findingsCount as findingsCount
     ORDER BY r.date DESC
     """
     try:
-        results = neo4j_client.execute_query(query)
+        results = await db.execute_query(query, name="reports_list")
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
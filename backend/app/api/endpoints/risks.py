@@ -1,34 +1,67 @@
-from fastapi import APIRouter
+import asyncio
+from fastapi import APIRouter, Depends, Query, Response, HTTPException
 from pydantic import BaseModel
-from typing import List
-from app.db.neo4j_client import neo4j_client
+from typing import List, Literal, Optional
+from app.api.deps import get_db
+from app.api.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, build_page_query, decode_cursor, paginate, parse_fields,
+)
+from app.api.responses import trusted
+from app.db.graph_engine import graph_engine
+from app.db.neo4j_client import AsyncNeo4jClient
 
 router = APIRouter()
 
 class RiskItem(BaseModel):
     id: str
-    title: str
-    severity: str
-    category: str
-    status: str
-    description: str
-    dateIdentified: str
-    owner: str
+    title: Optional[str] = None
+    severity: Optional[str] = None
+    category: Optional[str] = None
+    status: Optional[str] = None
+    description: Optional[str] = None
+    dateIdentified: Optional[str] = None
+    owner: Optional[str] = None
 
-@router.get("/", response_model=List[RiskItem])
-async def get_risks():
+RISK_FIELDS = list(RiskItem.model_fields)
+RISK_SORT_FIELDS = {"id", "title", "severity", "status", "category", "owner", "dateIdentified"}
+
+@router.get("/", response_model=List[RiskItem], response_model_exclude_unset=True)
+async def get_risks(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    sort: str = Query("id"),
+    order: Literal["asc", "desc"] = "asc",
+    severity: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    category: Optional[List[str]] = Query(None),
+    owner: Optional[List[str]] = Query(None),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段，例如 id,title,severity"),
+    db: AsyncNeo4jClient = Depends(get_db),
+):
     """
-    获取所有风险项列表。
+    分页获取风险项列表 (keyset 分页)。
+    支持按 severity/status/category/owner 过滤、排序以及稀疏字段选择。
     """
-    query = "MATCH (r:Risk) RETURN r"
-    results = neo4j_client.execute_query(query)
-    
-    # results 是字典列表, 例如 [{'r': {'id': 'R-001', ...}}]
-    risks = []
-    for record in results:
-        node_data = record.get("r", {})
-        # 确保所有必需字段都存在 (Pydantic 验证)
-        # 我们依赖种子数据的完整性，或者在需要时提供默认值。
-        risks.append(node_data)
-        
-    return risks
+    if sort not in RISK_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Unsupported sort field: {sort}")
+
+    filters = {"severity": severity, "status": status, "category": category, "owner": owner}
+    selected = parse_fields(fields, RISK_FIELDS, required=["id", sort])
+    engine = await graph_engine.get(db)
+    if engine is not None:
+        results = await asyncio.to_thread(
+            engine.risk_page, filters, sort, order == "desc",
+            decode_cursor(cursor) if cursor else None, selected, limit,
+        )
+        return trusted(paginate(results, sort, limit, response), response)
+
+    query, params = build_page_query(
+        label="Risk", var="r",
+        filters=filters,
+        sort=sort, descending=order == "desc", cursor=cursor,
+        fields=selected,
+        limit=limit,
+    )
+    results = await db.execute_query(query, params, name="risks_list")
+    return trusted(paginate(results, sort, limit, response), response)
@@ -0,0 +1,93 @@
+import base64
+import json
+from typing import Any, Iterable, List, Optional, Tuple
+from fastapi import HTTPException, Response
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(sort_value: Any, node_id: str) -> str:
+    raw = json.dumps([sort_value, node_id], ensure_ascii=False, default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        sort_value, node_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return sort_value, node_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str], required: Iterable[str]) -> List[str]:
+    """
+    解析逗号分隔的稀疏字段列表。id 与排序字段总是会被返回 (游标需要它们)。
+    """
+    allowed = list(allowed)
+    if not fields:
+        return allowed
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = set(requested) - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    selected = list(dict.fromkeys(list(required) + requested))
+    return [f for f in allowed if f in selected]
+
+def _after_condition(prop: str, id_prop: str, after_value: Any, descending: bool, params: dict) -> str:
+    """
+    游标之后的行。Neo4j 排序时 null 在升序末尾、降序开头，而 null 参与的比较结果为 null，
+    因此缺失值需要单独的分支，否则这些行会被跳过，最后一行为 null 时下一页直接为空。
+    """
+    if after_value is None:
+        # 游标位于 null 段: 升序时只剩 null 段内 id 更大的行；降序时还包括其后全部非 null 行
+        if descending:
+            return f"(({prop} IS NULL AND {id_prop} < $after_id) OR {prop} IS NOT NULL)"
+        return f"({prop} IS NULL AND {id_prop} > $after_id)"
+    params["after_value"] = after_value
+    op = "<" if descending else ">"
+    condition = f"{prop} {op} $after_value OR ({prop} = $after_value AND {id_prop} {op} $after_id)"
+    # 升序时 null 段排在所有非 null 值之后
+    return f"({condition})" if descending else f"({condition} OR {prop} IS NULL)"
+
+def build_page_query(label: str, var: str, filters: dict, sort: str, descending: bool,
+                     cursor: Optional[str], fields: List[str], limit: int) -> Tuple[str, dict]:
+    """
+    构造 keyset 分页查询。
+    filters 中值为列表的项会生成 `IN` 条件，只有真正传入的过滤条件才会进入 WHERE，
+    以便规划器使用 (label, property) 索引。所有属性名都必须事先经过白名单校验。
+    """
+    conditions, params = [], {"limit": limit + 1}
+    for prop, values in filters.items():
+        if values:
+            conditions.append(f"{var}.{prop} IN ${prop}")
+            params[prop] = values
+
+    op = "<" if descending else ">"
+    if cursor:
+        after_value, after_id = decode_cursor(cursor)
+        params["after_id"] = after_id
+        if sort == "id":
+            conditions.append(f"{var}.id {op} $after_id")
+        else:
+            conditions.append(_after_condition(f"{var}.{sort}", f"{var}.id", after_value, descending, params))
+
+    direction = "DESC" if descending else "ASC"
+    order_by = f"{var}.id {direction}" if sort == "id" else f"{var}.{sort} {direction}, {var}.id {direction}"
+    projection = ", ".join(f".{f}" for f in fields)
+    query = f"""
+    MATCH ({var}:{label})
+    {"WHERE " + " AND ".join(conditions) if conditions else ""}
+    RETURN {var} {{{projection}}} AS item
+    ORDER BY {order_by}
+    LIMIT $limit
+    """
+    return query, params
+
+def paginate(records: list, sort: str, limit: int, response: Response) -> list:
+    """
+    取出当前页 (查询多取一行用于判断是否还有下一页)，并在响应头中返回下一页游标。
+    """
+    items = [record["item"] for record in records[:limit]]
+    if len(records) > limit and items:
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.get(sort), last["id"])
+    return items
@@ -0,0 +1,37 @@
+from typing import Any, Optional
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+
+def _default(value: Any):
+    # neo4j.time 的 Date / DateTime / Duration 等类型
+    iso_format = getattr(value, "iso_format", None)
+    if iso_format is not None:
+        return iso_format()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    model_dump = getattr(value, "model_dump", None)
+    if model_dump is not None:
+        return model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+class FastJSONResponse(JSONResponse):
+    """用 orjson 直接把 dict / list (例如 record.data() 的结果) 序列化为字节。"""
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def trusted(content: Any, response: Optional[Response] = None):
+    """
+    返回由本服务自己构造的数据 (Cypher 投影、图引擎、缓存结果)。
+    这些数据的结构已由查询保证，直接 orjson 序列化，跳过 response_model 校验与 jsonable_encoder；
+    response_model 仍保留用于 OpenAPI 文档。response 为依赖注入的 Response，其上设置的响应头会一并带上。
+    TRUSTED_RESPONSES=false 时原样返回 content，由 FastAPI 按 response_model 校验 (便于排查与对比)。
+    """
+    if not settings.TRUSTED_RESPONSES:
+        return content
+    headers = dict(response.headers) if response is not None else None
+    return FastJSONResponse(content, headers=headers)
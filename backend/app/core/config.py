@@ -12,7 +12,37 @@ class Settings(BaseSettings):
     NEO4J_URI: str = "bolt://localhost:7687"
     NEO4J_USERNAME: str = "neo4j"
     NEO4J_PASSWORD: str = "password"
+    # 连接池设置 (异步驱动)
+    NEO4J_MAX_POOL_SIZE: int = 50
+    NEO4J_ACQUISITION_TIMEOUT: float = 30.0
     
+    # 慢查询日志: 超过该毫秒数的 Neo4j 查询记录 WARNING 日志 (0 为关闭)
+    SLOW_QUERY_LOG_MS: float = 0.0
+    
+    # 缓存设置
+    # 图谱版本号 (由 ETL 递增) 的最长检查间隔，秒
+    GRAPH_VERSION_CHECK_INTERVAL: float = 5.0
+    DASHBOARD_CACHE_TTL: float = 30.0
+    REGULATION_CACHE_TTL: float = 600.0
+    # 预计算图谱布局快照
+    GRAPH_SNAPSHOT_DIR: str = "data/snapshots"
+    GRAPH_LAYOUT_ITERATIONS: int = 50
+    # 启动时在后台加载或生成当前版本的快照
+    GRAPH_SNAPSHOT_PREPARE: bool = True
+    # 进程内只读图引擎 (CSR 邻接表)：graph / regulations / risks 接口优先从内存作答
+    # 数据源 neo4j (从图库读取快照) 或 csv (直接读取 ETL 的 CSV 目录)
+    GRAPH_ENGINE_ENABLED: bool = False
+    GRAPH_ENGINE_SOURCE: str = "neo4j"
+    GRAPH_ENGINE_CSV_DIR: str = "data"
+    
+    # 响应序列化: 对本服务自己构造的数据跳过 response_model 校验，直接用 orjson 输出
+    TRUSTED_RESPONSES: bool = True
+    # 响应压缩: 不小于该字节数的 JSON / 文本响应按 Accept-Encoding 使用 br (需安装 brotli) 或 gzip (0 为关闭)
+    RESPONSE_COMPRESSION_MIN_SIZE: int = 1024
+    # gzip 1 级对 JSON 已有约 10 倍压缩比，CPU 开销约为 6 级的三分之一
+    RESPONSE_GZIP_LEVEL: int = 1
+    RESPONSE_BROTLI_QUALITY: int = 4
+
     # LLM 设置 (Google Gemini / OpenAI / Doubao)
     GOOGLE_API_KEY: str = ""
     OPENAI_API_KEY: str = ""
@@ -23,13 +53,69 @@ class Settings(BaseSettings):
     DOUBAO_MODEL: str = "doubao-seed-1-6-250615"
     DOUBAO_BASE_URL: str = "https://ark.cn-beijing.volces.com/api/v3"
     
+    # LLM 网关: 全进程的并发调用上限、令牌桶限速 (次/秒，0 为不限速) 与突发量
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_RATE_LIMIT: float = 5.0
+    LLM_RATE_BURST: int = 10
+    # 排队中的调用超过 LLM_MAX_QUEUE，或等待超过 LLM_QUEUE_TIMEOUT 秒时直接返回 429
+    LLM_MAX_QUEUE: int = 32
+    LLM_QUEUE_TIMEOUT: float = 10.0
+    
+    # 启动后在后台预热 Agent (导入 langchain/langgraph、构建模型客户端与工作流)
+    AGENT_WARMUP: bool = True
+    # Agent 设置: 单个请求内同时执行的工具调用数上限
+    AGENT_TOOL_CONCURRENCY: int = 4
+    # query_graph 工具: 服务器端超时 (秒)、返回行数/字节上限、结果缓存
+    AGENT_QUERY_TIMEOUT: float = 10.0
+    AGENT_QUERY_MAX_ROWS: int = 200
+    AGENT_QUERY_MAX_BYTES: int = 16000
+    AGENT_QUERY_CACHE_SIZE: int = 256
+    AGENT_QUERY_CACHE_TTL: float = 600.0
+    # 意图路由: 常见问题直接执行参数化 Cypher 模板，跳过工具规划
+    AGENT_FAST_PATH_ENABLED: bool = True
+    # 多轮会话: 检查点存储 (SQLite 文件，留空则仅保存在进程内存)
+    AGENT_CHECKPOINT_DB: str = "data/agent_checkpoints.sqlite"
+    # 会话上下文超过该 token 预算 (估算值) 时压缩旧轮次
+    AGENT_CONTEXT_TOKEN_BUDGET: int = 6000
+    # 压缩时原样保留的最近消息数 (向前对齐到用户提问)
+    AGENT_CONTEXT_KEEP_MESSAGES: int = 6
+    # 历史工具输出超过该字符数时截断为摘要
+    AGENT_TOOL_OUTPUT_MAX_CHARS: int = 1500
+    
     # RAG 设置
-    EMBEDDING_MODEL: str = "models/embedding-001" 
+    # OpenAI 兼容的 /embeddings 接口 (与对话模型同走 DOUBAO_BASE_URL)，填写方舟上的 embedding 模型 / 接入点
+    EMBEDDING_MODEL: str = "doubao-embedding-text-240715"
+    # GraphRAG: 问题向量检索 top-k 节点，再展开其 1~2 跳邻域作为上下文注入
+    RAG_ENABLED: bool = True
+    RAG_TOP_K: int = 5
+    RAG_HOPS: int = 1
+    RAG_MIN_SCORE: float = 0.5
+    # 每个命中节点最多展开的关系数，以及注入上下文的总字符上限
+    RAG_NEIGHBOR_LIMIT: int = 25
+    RAG_CONTEXT_MAX_CHARS: int = 4000
+    
+    # 问答缓存设置
+    ANSWER_CACHE_SIZE: int = 512
+    ANSWER_CACHE_TTL: float = 3600.0
+    # 开启后对未精确命中的问题计算 EMBEDDING_MODEL 向量，按余弦相似度查找近似问题
+    ANSWER_CACHE_SEMANTIC: bool = False
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.92
     
     # Auth Settings
     SECRET_KEY: str = "YOUR_SUPER_SECRET_KEY_HERE_CHANGE_IN_PRODUCTION"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30 
+    # 用户存储: file (AUTH_USERS_FILE，由 app.scripts.create_user 维护) 或 memory (仅进程内，供嵌入/测试时注入)
+    AUTH_USER_STORE: str = "file"
+    AUTH_USERS_FILE: str = "data/users.json"
+    # 用户文件不存在时，启动阶段以该密码创建 admin 用户 (与旧版内置账号一致)；置空则缺少用户文件时拒绝启动
+    AUTH_BOOTSTRAP_ADMIN_PASSWORD: str = "admin"
+    # bcrypt 专用线程池大小与排队上限 (超出时登录返回 429)
+    AUTH_HASH_WORKERS: int = 2
+    AUTH_HASH_MAX_PENDING: int = 32
+    # 已验证 JWT 载荷的缓存 (秒，另受 token 自身 exp 限制)
+    AUTH_TOKEN_CACHE_SIZE: int = 1024
+    AUTH_TOKEN_CACHE_TTL: float = 60.0
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,35 @@
+import hashlib
+from functools import lru_cache
+from app.core.config import settings
+
+# 参与向量检索的节点标签；向量存放在 :AuditEntity 节点的 embedding 属性上
+EMBEDDED_LABELS = ("Risk", "Control", "Document")
+VECTOR_INDEX_NAME = "audit_entity_embedding"
+
+# 向量及其指纹属于内部字段，不应出现在返回给 LLM 或前端的结果中
+HIDDEN_PROPERTIES = ("embedding", "embeddingHash")
+
+@lru_cache()
+def get_embeddings():
+    """
+    EMBEDDING_MODEL 对应的 embedding 客户端 (OpenAI 兼容接口，走 DOUBAO_BASE_URL)。
+    问答缓存的语义匹配与 GraphRAG 检索共用同一个实例。
+    """
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings(
+        base_url=settings.DOUBAO_BASE_URL,
+        api_key=settings.ARK_API_KEY or settings.DOUBAO_API_KEY,
+        model=settings.EMBEDDING_MODEL,
+        check_embedding_ctx_length=False,
+    )
+
+def embedding_text(title, description) -> str:
+    """
+    节点用于 embedding 的文本: 标题 + 描述 (缺失的部分跳过)。
+    """
+    parts = [str(p).strip() for p in (title, description) if p is not None and str(p).strip()]
+    return "\n".join(parts)
+
+def text_hash(text: str) -> str:
+    # 指纹包含模型名，更换 EMBEDDING_MODEL 后所有节点都会重新计算
+    return hashlib.sha1(f"{settings.EMBEDDING_MODEL}\n{text}".encode("utf-8")).hexdigest()
@@ -0,0 +1,154 @@
+import bisect
+import threading
+from typing import Callable, Dict, Tuple
+
+# 进程内指标，按 Prometheus 文本格式 (0.0.4) 输出，不依赖 prometheus_client。
+# 同步 ETL 客户端会在线程池中调用，因此所有更新都加锁。
+
+# 延迟类直方图的默认桶 (秒)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签: [各桶计数 (非累计)..., +Inf 桶计数, sum]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> list:
+        lines = super().render()
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-1]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+class Gauge(_Metric):
+    """
+    读取时才取值的 gauge (例如 LLM 网关当前排队数)。
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], float]):
+        super().__init__(name, help)
+        self.fn = fn
+
+    def render(self) -> list:
+        return super().render() + [f"{self.name} {self.fn()}"]
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, fn: Callable[[], float]) -> Gauge:
+        return self._register(Gauge(name, help, fn))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# 全局实例
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status"))
+
+NEO4J_QUERY_DURATION = registry.histogram(
+    "neo4j_query_duration_seconds", "Client-side Neo4j query time, including result transfer", ("query",))
+NEO4J_RESULT_AVAILABLE_AFTER = registry.histogram(
+    "neo4j_result_available_after_seconds", "Server time until the first record was available", ("query",))
+NEO4J_RESULT_CONSUMED_AFTER = registry.histogram(
+    "neo4j_result_consumed_after_seconds", "Server time until all records were consumed", ("query",))
+NEO4J_QUERY_ROWS = registry.counter(
+    "neo4j_query_rows_total", "Rows returned by Neo4j queries", ("query",))
+NEO4J_QUERY_ERRORS = registry.counter(
+    "neo4j_query_errors_total", "Failed Neo4j queries", ("query",))
+
+AGENT_STEP_DURATION = registry.histogram(
+    "agent_step_duration_seconds", "Agent step / LangGraph node latency", ("node",))
+LLM_CALL_DURATION = registry.histogram(
+    "llm_call_duration_seconds", "LLM call latency after admission by the gateway", ("purpose",))
+LLM_QUEUE_WAIT = registry.histogram(
+    "llm_queue_wait_seconds", "Time spent waiting for an LLM gateway slot", ("purpose",))
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "LLM tokens reported by the provider", ("purpose", "kind"))
+
+def record_llm_usage(purpose: str, usage: dict):
+    """
+    累计一次 LLM 调用的 token 用量 (AIMessage.usage_metadata)。
+    """
+    if not usage:
+        return
+    LLM_TOKENS.inc(usage.get("input_tokens", 0), purpose=purpose, kind="input")
+    LLM_TOKENS.inc(usage.get("output_tokens", 0), purpose=purpose, kind="output")
@@ -1,7 +1,13 @@
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from app.core import metrics
+from app.core.cache import TTLCache
 from app.core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -12,6 +18,46 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+class PasswordHasherBusy(Exception):
+    """
+    密码哈希池排队已满 (登录洪峰)。API 层转换为 429，retry_after 为建议的重试等待秒数。
+    """
+    def __init__(self, retry_after: int = 1, reason: str = "登录请求过多，请稍后重试"):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+class PasswordHasher:
+    """
+    在专用线程池中执行 bcrypt (每次约 100~300ms CPU，计算期间释放 GIL)，
+    既不阻塞事件循环，也不占用 asyncio.to_thread 的默认线程池。
+    同时计算的数量为 workers，另有最多 max_pending 个排队，超出时直接拒绝。
+    """
+    def __init__(self, workers: int = 2, max_pending: int = 32):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.in_flight = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self.in_flight >= self.workers + self.max_pending:
+            raise PasswordHasherBusy()
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -21,3 +67,31 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
+
+# 已验证的 token 载荷，键为 token 的 SHA-256 (不在内存中保留 token 原文)
+_token_cache = TTLCache(maxsize=settings.AUTH_TOKEN_CACHE_SIZE, ttl=settings.AUTH_TOKEN_CACHE_TTL)
+
+def decode_access_token(token: str) -> dict:
+    """
+    校验签名与有效期并返回载荷，失败时抛出 JWTError。
+    验证通过的载荷缓存 AUTH_TOKEN_CACHE_TTL 秒，且不超过 token 的剩余有效期 (exp)，
+    过期的 token 不会因为缓存而继续通过。
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = _token_cache.get(key)
+    if payload is not None:
+        return dict(payload)
+
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    ttl = settings.AUTH_TOKEN_CACHE_TTL
+    if payload.get("exp") is not None:
+        ttl = min(ttl, float(payload["exp"]) - time.time())
+    if ttl > 0:
+        _token_cache.set(key, dict(payload), ttl=ttl)
+    return payload
+
+# 全局实例
+password_hasher = PasswordHasher(settings.AUTH_HASH_WORKERS, settings.AUTH_HASH_MAX_PENDING)
+
+metrics.registry.gauge("auth_password_hash_in_flight", "bcrypt hash/verify calls running or queued",
+                       lambda: password_hasher.in_flight)
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+from app.core.config import settings
+from app.core.security import password_hasher
+
+logger = logging.getLogger(__name__)
+
+# 用户记录: {"username", "full_name", "email", "hashed_password", "disabled"}。
+# 密码只在创建用户时哈希一次 (见 app.scripts.create_user)，服务进程中只做校验。
+
+class UserStore(ABC):
+    """
+    用户存储接口。其他后端 (LDAP、数据库等) 实现 get 即可，
+    通过 app.api.deps.get_user_store 的 dependency_overrides 或替换 user_store 接入。
+    """
+    @abstractmethod
+    async def get(self, username: str) -> Optional[dict]:
+        ...
+
+    async def prepare(self) -> None:
+        """服务启动时调用 (app.main 的 lifespan)，用于检查配置或初始化存储。"""
+
+class InMemoryUserStore(UserStore):
+    def __init__(self, users: Optional[Dict[str, dict]] = None):
+        self.users = dict(users or {})
+
+    async def get(self, username: str) -> Optional[dict]:
+        return self.users.get(username)
+
+    def upsert(self, user: dict) -> None:
+        self.users[user["username"]] = user
+
+class JsonFileUserStore(UserStore):
+    """
+    JSON 文件 ({username: 用户记录})。文件被修改 (例如新建用户) 后，下一次查询自动重新加载，无需重启服务。
+    文件不存在时，启动阶段按 AUTH_BOOTSTRAP_ADMIN_PASSWORD 创建 admin 用户；该项为空则拒绝启动。
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._users: Dict[str, dict] = {}
+        self._mtime: Optional[int] = None
+        self._lock = threading.RLock()
+
+    def load(self) -> Dict[str, dict]:
+        """当前的全部用户 (文件有变化时重新读取)。"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            # 启动时已检查过 (prepare)，运行中被删除则视为没有用户
+            self._users, self._mtime = {}, None
+            return self._users
+        if mtime != self._mtime:
+            with self._lock:
+                with open(self.path, encoding="utf-8") as f:
+                    self._users = json.load(f)
+                self._mtime = mtime
+        return self._users
+
+    async def get(self, username: str) -> Optional[dict]:
+        # stat / json.load 都是阻塞的文件 I/O，放到线程中执行
+        users = await asyncio.to_thread(self.load)
+        return users.get(username)
+
+    async def prepare(self) -> None:
+        if await asyncio.to_thread(os.path.exists, self.path):
+            return
+        password = settings.AUTH_BOOTSTRAP_ADMIN_PASSWORD
+        if not password:
+            raise RuntimeError(
+                f"用户文件 {self.path} 不存在，且未设置 AUTH_BOOTSTRAP_ADMIN_PASSWORD；"
+                f"请先用 app.scripts.create_user 创建用户"
+            )
+        hashed_password = await password_hasher.hash(password)
+        await asyncio.to_thread(self.upsert, {
+            "username": "admin",
+            "full_name": "Admin User",
+            "email": "admin@example.com",
+            "hashed_password": hashed_password,
+            "disabled": False,
+        })
+        logger.warning(
+            f"用户文件 {self.path} 不存在，已按 AUTH_BOOTSTRAP_ADMIN_PASSWORD 创建 admin 用户；"
+            f"请用 app.scripts.create_user 修改密码"
+        )
+
+    def upsert(self, user: dict) -> None:
+        """新增或更新用户。写入临时文件 (仅属主可读) 后原子替换，服务进程不会读到半个文件。"""
+        with self._lock:
+            users = dict(self.load())
+            users[user["username"]] = user
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+                json.dump(users, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+
+def create_user_store(kind: str, path: str) -> UserStore:
+    if kind == "file":
+        return JsonFileUserStore(path)
+    if kind == "memory":
+        return InMemoryUserStore()
+    raise ValueError(f"Unknown AUTH_USER_STORE: {kind}")
+
+# 全局实例
+user_store = create_user_store(settings.AUTH_USER_STORE, settings.AUTH_USERS_FILE)
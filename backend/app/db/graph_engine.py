@@ -0,0 +1,758 @@
+import asyncio
+import bisect
+import gc
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from app.core import metrics
+from app.core.config import settings
+from app.db.graph_snapshot import SNAPSHOT_EDGES_QUERY
+from app.db.graph_version import graph_version, version_stamp_matches
+
+logger = logging.getLogger(__name__)
+
+# 进程内只读图引擎。
+# 图谱只在 ETL 之后才会变化，因此把整张图加载为不可变的数组结构，
+# graph / regulations / risks 接口的邻域展开、过滤与聚合直接在内存中完成，不再经过 Bolt。
+#
+# 存储布局 (n 个节点, m 条关系):
+#   - 节点 id 驻留为下标 0..n-1 (pandas Index 做 id -> 下标)，标签/关系类型编码为 uint8
+#   - 出边与入边各一份 CSR: offsets (int64, n+1) + 邻居下标 (int32, m) + 关系类型 (uint8, m)
+#   - 属性按列存储: 每列为 int32 编码 + 去重后的取值表 (缺失为 -1)，过滤与排序都在编码上进行
+#
+# 内存占用 (见 CSRGraph.memory_usage，generate_synthetic_data 生成的 100 万节点 / 160 万关系实测):
+#   - 每百万条关系约 10 MB: 两个方向各 4 字节邻居 + 1 字节类型
+#   - 每百万个节点约 550 MB，绝大部分是 id 与文本属性 (title / description 各不相同) 的 Python 字符串；
+#     数值部分 (CSR offsets、标签、分组、各属性列编码) 不到 70 MB
+#   即整张合成图谱约 560 MB；构建期间的峰值 RSS 约为其两倍。
+
+ENGINE_NODES_QUERY = """
+MATCH (n:AuditEntity)
+RETURN n.id AS id,
+       [l IN labels(n) WHERE l <> 'AuditEntity'][0] AS type,
+       coalesce(n.group, 1) AS group,
+       n {.label, .title, .code, .description, .name, .severity, .status, .category, .owner, .dateIdentified} AS props
+"""
+
+# 属性列 (各接口用到的全部节点属性)
+ATTRIBUTE_COLUMNS = (
+    "label", "title", "code", "description", "name",
+    "severity", "status", "category", "owner", "dateIdentified",
+)
+
+# 前端分组，与 etl_pipeline.GROUP_MAP 一致 (导入 ETL 模块会顺带配置全局日志，因此不直接引用)
+GROUP_MAP = {"Standard": 1, "ControlDomain": 1, "Control": 2, "Document": 3, "Evidence": 3}
+RISK_GROUP = 4
+_CHUNK_ROWS = 100_000
+# 加载失败后，同一图谱版本至少间隔这么多秒才重试
+_RETRY_SECONDS = 60.0
+
+def _sort_key(value):
+    # 同一列混有数字和字符串时先数字后字符串
+    return (isinstance(value, str), value)
+
+class _Column:
+    """
+    一个属性列: codes[i] 为节点 i 的取值在 values 中的下标 (-1 为缺失)。
+    rank[code] 为取值的排序名次，用于排序与 keyset 游标比较。
+    """
+    def __init__(self, data):
+        import numpy as np
+        import pandas as pd
+
+        codes, uniques = pd.factorize(pd.Series(data, dtype=object), use_na_sentinel=True)
+        self.codes = codes.astype(np.int32)
+        self.values = list(uniques)
+        self.sorted_values = sorted(self.values, key=_sort_key)
+        position = {value: i for i, value in enumerate(self.sorted_values)}
+        self.rank = np.array([position[v] for v in self.values], dtype=np.int32)
+        # 末尾追加缺失值的名次，codes 为 -1 时正好取到它
+        self._ranks_with_null = np.append(self.rank, len(self.values)).astype(np.int32)
+        self._lookup = {value: code for code, value in enumerate(self.values)}
+        self._values_with_null = self.values + [None]
+
+    def take(self, nodes: list) -> list:
+        """批量取值 (缺失为 None)。"""
+        values = self._values_with_null
+        return [values[c] for c in self.codes[nodes].tolist()]
+
+    def get(self, node: int):
+        code = self.codes[node]
+        return self.values[code] if code >= 0 else None
+
+    def code_of(self, value) -> int:
+        return self._lookup.get(value, -1)
+
+    def ranks(self, nodes):
+        """节点取值的名次；缺失值排在最后 (与 Neo4j 升序时 null 在后一致)。"""
+        return self._ranks_with_null[self.codes[nodes]]
+
+    @property
+    def null_rank(self) -> int:
+        """缺失值的名次 (排在所有取值之后)。"""
+        return len(self.values)
+
+    def rank_of(self, value) -> float:
+        """任意取值在排序中的位置；不在列中的取值落在相邻名次之间。"""
+        try:
+            i = bisect.bisect_left(self.sorted_values, _sort_key(value), key=_sort_key)
+        except TypeError:
+            return -0.5
+        if i < len(self.sorted_values) and self.sorted_values[i] == value:
+            return float(i)
+        return i - 0.5
+
+    def nbytes(self) -> int:
+        return (self.codes.nbytes + self.rank.nbytes + self._ranks_with_null.nbytes
+                + sum(sys.getsizeof(v) for v in self.values))
+
+class CSRGraph:
+    """
+    不可变的图谱快照。各查询方法返回与对应 Cypher 查询相同结构的记录，
+    因此接口层只需在 "从引擎取" 与 "从 Neo4j 取" 之间切换数据来源。
+    """
+    def __init__(self, version: int, ids, types, type_names: List[str], groups, columns: Dict[str, _Column],
+                 sources, targets, rel_types, rel_type_names: List[str]):
+        import numpy as np
+        import pandas as pd
+
+        self.version = version
+        self.ids = ids
+        self.index = pd.Index(ids)
+        self.types = types
+        self.type_names = type_names
+        self.groups = groups
+        self.columns = columns
+        self.rel_type_names = rel_type_names
+        n = len(ids)
+        self.node_count = n
+        self.edge_count = len(sources)
+
+        self.out_offsets, self.out_targets, self.out_types = _csr(n, sources, targets, rel_types)
+        self.in_offsets, self.in_sources, self.in_types = _csr(n, targets, sources, rel_types)
+        self.degree = np.diff(self.out_offsets) + np.diff(self.in_offsets)
+        id_order = np.argsort(np.array(ids, dtype=object), kind="stable")
+        self.id_rank = np.empty(n, dtype=np.int32)
+        self.id_rank[id_order] = np.arange(n, dtype=np.int32)
+        self._sorted_ids = [ids[i] for i in id_order]
+        self._risk_orders: Dict[str, object] = {}
+        self._memory: Optional[dict] = None
+
+    # --- 基础操作 ---
+
+    def node(self, node_id: str) -> int:
+        i = self.index.get_indexer([node_id])[0]
+        return int(i)
+
+    def type_code(self, name: str) -> int:
+        """标签的编码；图谱中没有该标签时为 -1 (注意 -1 同时是无标签节点的编码，不能直接比较)。"""
+        return self.type_names.index(name) if name in self.type_names else -1
+
+    def has_type(self, nodes, names):
+        """节点是否带有 names 中的某个标签；不存在的标签不匹配任何节点。"""
+        import numpy as np
+
+        codes = [code for code in map(self.type_code, names) if code >= 0]
+        return np.isin(self.types[nodes], codes)
+
+    def rel_code(self, name: str) -> int:
+        return self.rel_type_names.index(name) if name in self.rel_type_names else -1
+
+    def value(self, node: int, column: str):
+        if column == "id":
+            return self.ids[node]
+        return self.columns[column].get(node)
+
+    def project(self, node: int, fields) -> dict:
+        return {f: self.value(node, f) for f in fields}
+
+    def project_many(self, nodes, fields) -> List[dict]:
+        """按列批量取值，等价于 [project(i, fields) for i in nodes]，但避免逐个标量下标。"""
+        nodes = list(nodes)
+        columns = []
+        for f in fields:
+            if f == "id":
+                columns.append([self.ids[i] for i in nodes])
+            else:
+                columns.append(self.columns[f].take(nodes))
+        return [dict(zip(fields, row)) for row in zip(*columns)] if columns else [{} for _ in nodes]
+
+    def nodes_of_type(self, name: str):
+        import numpy as np
+
+        code = self.type_code(name)
+        if code < 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(self.types == code)
+
+    def neighbors(self, nodes, rel_types=None, direction: str = "both"):
+        """
+        一组节点的邻居 (可重复)。rel_types 为关系类型名列表 (None 为全部)；
+        返回 (邻居下标, 对应的起点下标) 两个数组。
+        """
+        import numpy as np
+
+        nodes = np.asarray(nodes, dtype=np.int64)
+        codes = None if rel_types is None else [self.rel_code(t) for t in rel_types]
+        found, origins = [], []
+        parts = []
+        if direction in ("out", "both"):
+            parts.append((self.out_offsets, self.out_targets, self.out_types))
+        if direction in ("in", "both"):
+            parts.append((self.in_offsets, self.in_sources, self.in_types))
+        for offsets, neighbors, types in parts:
+            positions, origin = _gather(offsets, nodes)
+            if codes is not None:
+                positions, origin = _filter_types(types, positions, origin, codes)
+            found.append(neighbors[positions])
+            origins.append(origin)
+        return np.concatenate(found).astype(np.int64), np.concatenate(origins)
+
+    # --- graph 接口 ---
+
+    def _subgraph(self, kept, rel_types=None) -> dict:
+        """保留节点及其之间的关系，结构同 graph.py 中的 _SUBGRAPH_RETURN。"""
+        import numpy as np
+
+        kept = np.asarray(kept, dtype=np.int64)
+        members = np.zeros(self.node_count, dtype=bool)
+        members[kept] = True
+        positions, origin = _gather(self.out_offsets, kept)
+        if rel_types is not None:
+            positions, origin = _filter_types(self.out_types, positions, origin, [self.rel_code(t) for t in rel_types])
+        targets = self.out_targets[positions]
+        inside = members[targets]
+        label = self.columns["label"]
+        title = self.columns["title"]
+        return {
+            "nodes": [
+                {
+                    "id": self.ids[i],
+                    "group": int(self.groups[i]),
+                    "label": label.get(i) or title.get(i) or self.ids[i],
+                    "degree": int(self.degree[i]),
+                }
+                for i in kept
+            ],
+            "links": [
+                {"source": self.ids[s], "target": self.ids[t], "type": self.rel_type_names[c]}
+                for s, t, c in zip(kept[origin[inside]], targets[inside], self.out_types[positions[inside]])
+            ],
+        }
+
+    def overview(self, limit: int) -> dict:
+        import numpy as np
+
+        return self._subgraph(np.arange(min(limit, self.node_count)))
+
+    def explore(self, seed: str, hops: int, labels: Optional[List[str]], rel_types: Optional[List[str]],
+                max_nodes: int) -> Optional[dict]:
+        """
+        种子节点的 k 跳无向邻域 (BFS)，按标签过滤后按度数保留 max_nodes 个节点。
+        种子不存在时返回 None。
+        """
+        import numpy as np
+
+        start = self.node(seed)
+        if start < 0:
+            return None
+        visited = np.zeros(self.node_count, dtype=bool)
+        visited[start] = True
+        frontier = np.array([start], dtype=np.int64)
+        for _ in range(hops):
+            found, _ = self.neighbors(frontier, rel_types)
+            found = np.unique(found)
+            frontier = found[~visited[found]]
+            if not len(frontier):
+                break
+            visited[frontier] = True
+
+        reached = np.flatnonzero(visited)
+        if labels:
+            if "AuditEntity" not in labels:
+                reached = reached[self.has_type(reached, labels) | (reached == start)]
+        # 种子优先，其余按度数降序
+        order = np.lexsort((-self.degree[reached], reached != start))
+        return self._subgraph(reached[order][:max_nodes], rel_types)
+
+    def group_clusters(self) -> Tuple[list, list]:
+        import numpy as np
+
+        clusters, sizes = np.unique(self.groups, return_counts=True)
+        node_rows = [{"cluster": int(c), "size": int(s)} for c, s in zip(clusters, sizes)]
+        sources = np.repeat(np.arange(self.node_count), np.diff(self.out_offsets))
+        gs, gt = self.groups[sources], self.groups[self.out_targets]
+        differ = gs != gt
+        counts = Counter(zip(gs[differ].tolist(), gt[differ].tolist(), self.out_types[differ].tolist()))
+        link_rows = [
+            {"source": s, "target": t, "type": self.rel_type_names[c], "weight": w}
+            for (s, t, c), w in counts.items()
+        ]
+        return node_rows, link_rows
+
+    def domain_clusters(self) -> Tuple[list, list]:
+        """
+        控制域聚合: 域的大小 = 域内控制数 + 这些控制缓解/引用的实体数；
+        两个域之间的边权 = 同时关联到两个域内控制的实体数。
+        """
+        import numpy as np
+
+        domains = self.nodes_of_type("ControlDomain")
+        controls, origin = self.neighbors(domains, ["CONTAINS"], "out")
+        is_control = self.has_type(controls, ["Control"])
+        controls, control_domain = controls[is_control], domains[origin[is_control]]
+
+        entities, via = self.neighbors(controls, ["MITIGATES", "EVIDENCED_BY"])
+        pairs = _unique_pairs(control_domain[via], entities, self.node_count)
+
+        # 每个域的 (去重后的) 控制数 + 关联实体数
+        members = _unique_pairs(control_domain, controls, self.node_count)
+        size = np.bincount(members[0], minlength=self.node_count) + np.bincount(pairs[0], minlength=self.node_count)
+        node_rows = [
+            {
+                "cluster": self.ids[d],
+                "label": self.value(d, "title") or self.value(d, "code") or self.ids[d],
+                "size": int(size[d]),
+            }
+            for d in domains
+        ]
+
+        # 按实体分组 (组内按域 id 排序)，同一组内两两组合即为共享该实体的域对；
+        # 组大小相同的实体一起用 triu_indices 展开，避免逐实体的 Python 循环
+        entities, owners = pairs[1], pairs[0]
+        order = np.lexsort((self.id_rank[owners], entities))
+        entities, owners = entities[order], owners[order]
+        starts = np.flatnonzero(np.r_[True, entities[1:] != entities[:-1]]) if len(entities) else np.zeros(0, dtype=np.int64)
+        sizes = np.diff(np.r_[starts, len(entities)])
+        firsts, seconds = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+        for size in np.unique(sizes[sizes >= 2]).tolist():
+            i, j = np.triu_indices(size, 1)
+            group_starts = starts[sizes == size][:, None]
+            firsts.append(owners[group_starts + i].ravel())
+            seconds.append(owners[group_starts + j].ravel())
+        first, second = np.concatenate(firsts), np.concatenate(seconds)
+        keys, weights = np.unique(first * self.node_count + second, return_counts=True)
+        link_rows = [
+            {"source": self.ids[k // self.node_count], "target": self.ids[k % self.node_count], "type": "SHARES", "weight": w}
+            for k, w in zip(keys.tolist(), weights.tolist())
+        ]
+        return node_rows, link_rows
+
+    # --- regulations 接口 ---
+
+    def _sorted_by(self, nodes, column: str):
+        import numpy as np
+
+        nodes = np.asarray(nodes, dtype=np.int64)
+        return nodes[np.lexsort((self.id_rank[nodes], self.columns[column].ranks(nodes)))]
+
+    def regulation_tree(self) -> List[dict]:
+        import numpy as np
+
+        domains = self._sorted_by(self.nodes_of_type("ControlDomain"), "code")
+        children, origin = self.neighbors(domains, ["CONTAINS"], "out")
+        is_control = self.has_type(children, ["Control"])
+        children, origin = children[is_control], origin[is_control]
+        # 先按所属域、再按 code / id 排序，一次切分出每个域的子节点
+        pairs = _unique_pairs(origin, children, self.node_count)
+        origin, children = pairs
+        order = np.lexsort((self.id_rank[children], self.columns["code"].ranks(children), origin))
+        origin, children = origin[order], children[order]
+        bounds = np.searchsorted(origin, np.arange(len(domains) + 1))
+        fields = ("id", "code", "title", "description")
+        rows = self.project_many(children.tolist(), fields)
+        for row in rows:
+            row["children"] = []
+        return [
+            {**domain, "children": rows[bounds[k]:bounds[k + 1]]}
+            for k, domain in enumerate(self.project_many(domains.tolist(), fields))
+        ]
+
+    def traceability(self, ids: List[str], depth: int) -> List[dict]:
+        """结构同 regulations.py 中的 _traceability_query；不存在或不是 Control 的 id 被忽略。"""
+        import numpy as np
+
+        results = []
+        for node_id in ids:
+            c = self.node(node_id)
+            if c < 0 or not self.has_type([c], ["Control"])[0]:
+                continue
+            risks, _ = self.neighbors([c], ["MITIGATES"], "out")
+            risks = np.unique(risks[self.has_type(risks, ["Risk"])])
+            evidence, _ = self.neighbors([c], ["EVIDENCED_BY"], "out")
+            evidence = np.unique(evidence[self.has_type(evidence, ["Document", "Evidence"])])
+
+            requires = []
+            seen = set()
+            frontier = np.array([c], dtype=np.int64)
+            for hop in range(1, depth + 1):
+                found, _ = self.neighbors(frontier, ["REQUIRES"], "out")
+                found = [int(n) for n in np.unique(found[self.has_type(found, ["Control"])]) if int(n) not in seen]
+                if not found:
+                    break
+                seen.update(found)
+                requires.extend({**self.project(n, ("id", "code", "title")), "depth": hop} for n in found)
+                frontier = np.array(found, dtype=np.int64)
+
+            results.append({
+                "control": self.project(c, ("id", "code", "title", "description")),
+                "risks": self.project_many(risks.tolist(), ("id", "title", "severity", "status", "description")),
+                "evidence": [
+                    {"id": self.ids[e], "name": self.value(e, "name") or self.value(e, "title"),
+                     "status": self.value(e, "status")}
+                    for e in evidence
+                ],
+                "requires": requires,
+            })
+        return results
+
+    # --- risks 接口 ---
+
+    def _risk_order(self, sort: str):
+        # 每个排序字段的升序排列只计算一次 (快照不可变)
+        order = self._risk_orders.get(sort)
+        if order is None:
+            import numpy as np
+
+            risks = self.nodes_of_type("Risk")
+            ranks = self.id_rank[risks] if sort == "id" else self.columns[sort].ranks(risks)
+            order = risks[np.lexsort((self.id_rank[risks], ranks))]
+            self._risk_orders[sort] = order
+        return order
+
+    def risk_page(self, filters: dict, sort: str, descending: bool, cursor: Optional[tuple],
+                  fields: List[str], limit: int) -> List[dict]:
+        """
+        与 app.api.pagination.build_page_query 等价的 keyset 分页: 返回最多 limit + 1 条
+        {"item": {...}} 记录 (多出的一条供 paginate 判断是否有下一页)。
+        """
+        import numpy as np
+
+        order = self._risk_order(sort)
+        if descending:
+            order = order[::-1]
+        mask = np.ones(len(order), dtype=bool)
+        for prop, values in filters.items():
+            if values:
+                column = self.columns[prop]
+                # 不在图谱中的取值编码为 -1，与缺失值相同，必须去掉 (IN 不匹配 null)
+                codes = [code for code in map(column.code_of, values) if code >= 0]
+                if not codes:
+                    return []
+                mask &= np.isin(column.codes[order], codes)
+
+        if cursor is not None:
+            after_value, after_id = cursor
+            id_rank = self.id_rank[order]
+            after_id_rank = _position(self._sorted_ids, after_id)
+            if sort == "id":
+                ranks, after_rank = id_rank, after_id_rank
+            else:
+                # 缺失值的名次最大: 与 Neo4j 一致，升序时排在最后、降序时排在最前
+                column = self.columns[sort]
+                ranks = column.ranks(order)
+                after_rank = column.null_rank if after_value is None else column.rank_of(after_value)
+            if descending:
+                mask &= (ranks < after_rank) | ((ranks == after_rank) & (id_rank < after_id_rank))
+            else:
+                mask &= (ranks > after_rank) | ((ranks == after_rank) & (id_rank > after_id_rank))
+
+        page = order[np.flatnonzero(mask)[:limit + 1]]
+        return [{"item": item} for item in self.project_many(page.tolist(), fields)]
+
+    # --- 统计 ---
+
+    def memory_usage(self) -> dict:
+        if self._memory is not None:
+            return self._memory
+        arrays = (self.out_offsets, self.out_targets, self.out_types, self.in_offsets, self.in_sources,
+                  self.in_types, self.degree, self.types, self.groups, self.id_rank)
+        edges = sum(a.nbytes for a in (self.out_targets, self.out_types, self.in_sources, self.in_types))
+        ids = sum(sys.getsizeof(i) for i in self.ids) + self.index.memory_usage(deep=False)
+        total = sum(a.nbytes for a in arrays) + ids + sum(c.nbytes() for c in self.columns.values())
+        self._memory = {
+            "total_bytes": int(total),
+            "edge_bytes": int(edges),
+            "bytes_per_million_edges": int(edges / self.edge_count * 1_000_000) if self.edge_count else None,
+            "bytes_per_million_nodes": int((total - edges) / self.node_count * 1_000_000) if self.node_count else None,
+        }
+        return self._memory
+
+def _position(sorted_values: list, value) -> float:
+    i = bisect.bisect_left(sorted_values, value)
+    if i < len(sorted_values) and sorted_values[i] == value:
+        return float(i)
+    return i - 0.5
+
+def _unique_pairs(first, second, n: int):
+    """去重后的 (first, second) 对 (2 x k 数组，按 first、second 排序)；second 取值需小于 n。"""
+    import numpy as np
+
+    keys = np.unique(np.asarray(first, dtype=np.int64) * n + np.asarray(second, dtype=np.int64))
+    return np.stack([keys // n, keys % n])
+
+def _csr(n: int, sources, targets, types):
+    import numpy as np
+
+    order = np.argsort(sources, kind="stable")
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+    return offsets, targets[order].astype(np.int32), types[order].astype(np.uint8)
+
+def _gather(offsets, nodes):
+    """
+    把若干节点的 CSR 区间拼接起来: 返回 (边在邻接数组中的位置, 每条边对应 nodes 中的下标)。
+    """
+    import numpy as np
+
+    starts = offsets[nodes]
+    lengths = offsets[nodes + 1] - starts
+    total = int(lengths.sum())
+    origin = np.repeat(np.arange(len(nodes)), lengths)
+    positions = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths) + np.arange(total)
+    return positions.astype(np.int64), origin
+
+def _filter_types(types, positions, origin, codes):
+    import numpy as np
+
+    keep = np.isin(types[positions], codes)
+    return positions[keep], origin[keep]
+
+class GraphBuilder:
+    """
+    分批接收节点与关系，最后构建 CSRGraph。必须先加入全部节点，再加入关系
+    (关系端点在加入时即映射为节点下标，指向不存在节点的关系被丢弃，与 MATCH 语义一致)。
+    """
+    def __init__(self):
+        self._ids: list = []
+        self._types: list = []
+        self._groups: list = []
+        self._props: Dict[str, list] = {name: [] for name in ATTRIBUTE_COLUMNS}
+        self._index = None
+        self._edges: list = []
+        self._rel_types: Dict[str, int] = {}
+
+    def add_nodes(self, ids: list, types: list, groups: list, props: Dict[str, list]):
+        count = len(ids)
+        self._ids.extend(ids)
+        self._types.extend(types)
+        self._groups.extend(groups)
+        for name in ATTRIBUTE_COLUMNS:
+            values = props.get(name)
+            self._props[name].extend(values if values is not None else [None] * count)
+
+    def _freeze_nodes(self):
+        import numpy as np
+        import pandas as pd
+
+        index = pd.Index(self._ids)
+        if not index.is_unique:
+            keep = ~index.duplicated()
+            logger.warning(f"图引擎: 忽略 {int((~keep).sum())} 个重复的节点 id")
+            positions = np.flatnonzero(keep)
+            self._ids = [self._ids[i] for i in positions]
+            self._types = [self._types[i] for i in positions]
+            self._groups = [self._groups[i] for i in positions]
+            self._props = {name: [values[i] for i in positions] for name, values in self._props.items()}
+            index = pd.Index(self._ids)
+        self._index = index
+
+    def add_edges(self, sources: list, targets: list, types: list):
+        import numpy as np
+
+        if self._index is None:
+            self._freeze_nodes()
+        s = self._index.get_indexer(sources)
+        t = self._index.get_indexer(targets)
+        codes = np.array([self._rel_types.setdefault(name, len(self._rel_types)) for name in types], dtype=np.uint8)
+        valid = (s >= 0) & (t >= 0)
+        self._edges.append((s[valid].astype(np.int64), t[valid].astype(np.int64), codes[valid]))
+
+    def build(self, version: int) -> CSRGraph:
+        import numpy as np
+        import pandas as pd
+
+        if self._index is None:
+            self._freeze_nodes()
+        if self._edges:
+            sources = np.concatenate([e[0] for e in self._edges])
+            targets = np.concatenate([e[1] for e in self._edges])
+            rel_types = np.concatenate([e[2] for e in self._edges])
+        else:
+            sources = targets = np.zeros(0, dtype=np.int64)
+            rel_types = np.zeros(0, dtype=np.uint8)
+
+        # 同一 (起点, 终点, 类型) 只保留一条，与 ETL 的 MERGE 一致
+        n = max(len(self._ids), 1)
+        key = (sources * n + targets) * 256 + rel_types
+        _, first = np.unique(key, return_index=True)
+        first.sort()
+        sources, targets, rel_types = sources[first], targets[first], rel_types[first]
+
+        type_codes, type_names = pd.factorize(pd.Series(self._types, dtype=object), use_na_sentinel=True)
+        return CSRGraph(
+            version=version,
+            ids=self._ids,
+            types=type_codes.astype(np.int16),
+            type_names=list(type_names),
+            groups=np.array([g if g is not None else 1 for g in self._groups], dtype=np.uint8),
+            columns={name: _Column(values) for name, values in self._props.items()},
+            sources=sources,
+            targets=targets,
+            rel_types=rel_types,
+            rel_type_names=sorted(self._rel_types, key=self._rel_types.get),
+        )
+
+def load_from_csv(directory: str, version: int) -> CSRGraph:
+    """
+    直接从 ETL 的 CSV (risks.csv / controls.csv / relationships.csv) 构建，
+    属性与 etl_pipeline 写入 Neo4j 的一致 (label = title 或 code，Risk 的分组为 4)。
+    """
+    import pandas as pd
+
+    builder = GraphBuilder()
+    risks = pd.read_csv(os.path.join(directory, "risks.csv"), dtype=str, keep_default_na=False, na_values=[""])
+    risks = risks.astype(object).where(risks.notna(), None)
+    builder.add_nodes(
+        risks["id"].tolist(), ["Risk"] * len(risks), [RISK_GROUP] * len(risks),
+        {name: risks[name].tolist() for name in ATTRIBUTE_COLUMNS if name in risks}
+        | {"label": risks["title"].tolist()},
+    )
+    del risks
+
+    entities = pd.read_csv(os.path.join(directory, "controls.csv"), dtype=str, keep_default_na=False, na_values=[""])
+    entities = entities.astype(object).where(entities.notna(), None)
+    builder.add_nodes(
+        entities["id"].tolist(), entities["type"].tolist(),
+        [GROUP_MAP.get(t, 3) for t in entities["type"]],
+        {name: entities[name].tolist() for name in ATTRIBUTE_COLUMNS if name in entities}
+        | {"label": [t if t is not None else c for t, c in zip(entities["title"], entities["code"])]},
+    )
+    del entities
+
+    with pd.read_csv(os.path.join(directory, "relationships.csv"), dtype=str, chunksize=_CHUNK_ROWS) as reader:
+        for chunk in reader:
+            builder.add_edges(chunk["source"].tolist(), chunk["target"].tolist(), chunk["type"].tolist())
+    return builder.build(version)
+
+def _build_from_rows(nodes: list, edges: list, version: int) -> CSRGraph:
+    builder = GraphBuilder()
+    for i in range(0, len(nodes), _CHUNK_ROWS):
+        chunk = nodes[i:i + _CHUNK_ROWS]
+        builder.add_nodes(
+            [row[0] for row in chunk], [row[1] for row in chunk], [row[2] for row in chunk],
+            {name: [(row[3] or {}).get(name) for row in chunk] for name in ATTRIBUTE_COLUMNS},
+        )
+    del nodes[:]
+    for i in range(0, len(edges), _CHUNK_ROWS):
+        builder.add_edges(*zip(*edges[i:i + _CHUNK_ROWS]))
+    del edges[:]
+    return builder.build(version)
+
+async def load_from_neo4j(db, version: int) -> CSRGraph:
+    """
+    事件循环上只接收行 (存为元组)，GraphBuilder 的索引构建、id 映射与 CSR 构建全部在线程中完成，
+    大图加载期间不阻塞其他请求。
+    """
+    nodes, edges = [], []
+    async for row in db.stream_query(ENGINE_NODES_QUERY, name="graph_engine_nodes"):
+        nodes.append((row["id"], row["type"], row["group"], row["props"]))
+    async for row in db.stream_query(SNAPSHOT_EDGES_QUERY, name="graph_engine_edges"):
+        edges.append((row["source"], row["target"], row["type"]))
+    return await asyncio.to_thread(_build_from_rows, nodes, edges, version)
+
+class GraphEngine:
+    """
+    持有当前版本的 CSRGraph。get() 只在快照与当前图谱版本一致时返回它；
+    未启用、首次加载中或 ETL 之后重建中时返回 None，接口退回 Neo4j 查询，
+    因此内存中的数据永远不会比图库旧。
+    """
+    def __init__(self, enabled: bool, source: str, csv_dir: str):
+        self.enabled = enabled
+        self.source = source
+        self.csv_dir = csv_dir
+        self.graph: Optional[CSRGraph] = None
+        self.load_seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        # 加载失败后暂停重试 (避免每个请求都触发一次失败的加载)
+        self._failed_version: Optional[int] = None
+        self._failed_at = 0.0
+
+    async def load(self, db, version: int) -> CSRGraph:
+        started = time.perf_counter()
+        try:
+            if self.source == "csv":
+                # 本地 CSV 不一定是图库当前加载的那一份: 只有 ETL 写下的版本戳与当前版本一致时才使用
+                if not await asyncio.to_thread(version_stamp_matches, self.csv_dir, version):
+                    raise RuntimeError(
+                        f"{self.csv_dir} 中的 CSV 与图谱版本 {version} 不一致 (缺少或过期的版本戳，需由 ETL 生成)"
+                    )
+                graph = await asyncio.to_thread(load_from_csv, self.csv_dir, version)
+            else:
+                graph = await load_from_neo4j(db, version)
+        except Exception:
+            self._failed_version, self._failed_at = version, time.monotonic()
+            raise
+        self._swap(graph)
+        self.load_seconds = time.perf_counter() - started
+        memory = graph.memory_usage()
+        logger.info(
+            f"图引擎 v{version} 已加载 ({self.source}): {graph.node_count} 节点, {graph.edge_count} 关系, "
+            f"约 {memory['total_bytes'] / 1024 / 1024:.1f} MB, 用时 {self.load_seconds:.2f}s"
+        )
+        return graph
+
+    def _swap(self, graph: CSRGraph) -> None:
+        """
+        换上新快照。快照只读且对象数以百万计，冻结后完整 GC 不再反复扫描它。
+        只在首次加载 (服务启动) 时 gc.freeze 一次，不做强制回收: freeze 本身开销很小，
+        而完整回收会在事件循环上停顿数百毫秒。之后的替换只换引用，
+        旧快照没有循环引用，即使在冻结的代中也会随引用计数归零而释放。
+        """
+        first = self.graph is None
+        self.graph = graph
+        if first:
+            gc.freeze()
+
+    async def get(self, db) -> Optional[CSRGraph]:
+        if not self.enabled:
+            return None
+        version = await graph_version.current(db)
+        if self.graph is not None and self.graph.version == version:
+            return self.graph
+        if version == self._failed_version and time.monotonic() - self._failed_at < _RETRY_SECONDS:
+            return None
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.load(db, version))
+            self._task.add_done_callback(_log_task_error)
+        return None
+
+    def stats(self) -> dict:
+        graph = self.graph
+        return {
+            "enabled": self.enabled,
+            "source": self.source,
+            "loading": self._task is not None and not self._task.done(),
+            "version": graph.version if graph else None,
+            "nodes": graph.node_count if graph else 0,
+            "edges": graph.edge_count if graph else 0,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "memory": graph.memory_usage() if graph else None,
+        }
+
+def _log_task_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"图引擎加载失败，继续使用 Neo4j: {task.exception()}")
+
+# 全局实例
+graph_engine = GraphEngine(settings.GRAPH_ENGINE_ENABLED, settings.GRAPH_ENGINE_SOURCE, settings.GRAPH_ENGINE_CSV_DIR)
+
+metrics.registry.gauge("graph_engine_nodes", "Nodes in the in-memory graph engine",
+                       lambda: graph_engine.graph.node_count if graph_engine.graph else 0)
+metrics.registry.gauge("graph_engine_edges", "Relationships in the in-memory graph engine",
+                       lambda: graph_engine.graph.edge_count if graph_engine.graph else 0)
+metrics.registry.gauge("graph_engine_memory_bytes", "Estimated memory held by the in-memory graph engine",
+                       lambda: graph_engine.graph.memory_usage()["total_bytes"] if graph_engine.graph else 0)
@@ -0,0 +1,300 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import struct
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+from app.core.config import settings
+from app.db.graph_version import graph_version
+
+logger = logging.getLogger(__name__)
+
+# 快照二进制格式 (小端序):
+#   magic b"AGS1" | uint32 头部长度 | UTF-8 JSON 头部 | 各数据段 (按 4 字节对齐)
+# 头部的 sections 列出每段的 name/dtype/offset/length (offset 相对于文件起始)，
+# 前端可以直接用 Float32Array/Uint32Array 等视图读取，无需逐条解析 JSON。
+SNAPSHOT_MAGIC = b"AGS1"
+_SNAPSHOT_FILE_RE = re.compile(r"graph-(\d+)\.bin")
+
+SNAPSHOT_NODES_QUERY = """
+MATCH (n:AuditEntity)
+RETURN n.id AS id, coalesce(n.group, 1) AS group, coalesce(n.label, n.title, n.id) AS label
+"""
+
+SNAPSHOT_EDGES_QUERY = """
+MATCH (a:AuditEntity)-[r]->(b:AuditEntity)
+RETURN a.id AS source, b.id AS target, type(r) AS type
+"""
+
+# 排斥力按随机采样近似计算，每轮复杂度 O(N * 采样数 + E)
+_REPULSION_SAMPLE = 64
+_CHUNK_ROWS = 65536
+_GRAVITY = 0.1
+
+def node_size(degree: int) -> int:
+    """按度数的平方根缩放节点大小 (前端 val)，保持与旧版默认值 10 相近的量级。"""
+    return min(30, 4 + int(round(3 * math.sqrt(degree or 0))))
+
+def compute_layout(node_count: int, sources, targets, iterations: int = 50, seed: int = 42):
+    """
+    Fruchterman-Reingold 力导向布局 (numpy 向量化)。
+    返回归一化到 [-1, 1] 的 float32 坐标数组，形状为 (node_count, 2)。
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    if node_count == 0:
+        return np.zeros((0, 2), dtype=np.float32)
+
+    pos = rng.uniform(-1.0, 1.0, (node_count, 2)) * math.sqrt(node_count)
+    temperature = math.sqrt(node_count) / 10 + 1.0
+    cooling = 0.95
+
+    for _ in range(iterations):
+        disp = np.zeros_like(pos)
+
+        # 排斥力: 与随机采样的节点之间，按采样比例放大
+        sample = min(node_count, _REPULSION_SAMPLE)
+        idx = rng.choice(node_count, sample, replace=False)
+        scale = node_count / sample
+        anchors = pos[idx]
+        for start in range(0, node_count, _CHUNK_ROWS):
+            delta = pos[start:start + _CHUNK_ROWS, None, :] - anchors[None, :, :]
+            dist2 = np.maximum((delta ** 2).sum(axis=2), 1e-4)
+            disp[start:start + _CHUNK_ROWS] += (delta / dist2[..., None]).sum(axis=1) * scale
+
+        # 吸引力: 沿边，与距离平方成正比
+        if len(sources):
+            delta = pos[sources] - pos[targets]
+            dist = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-4)
+            force = delta * dist[:, None]
+            np.subtract.at(disp, sources, force)
+            np.add.at(disp, targets, force)
+
+        # 向心引力，防止孤立节点/小连通分量无限远离
+        disp -= pos * _GRAVITY
+
+        length = np.maximum(np.sqrt((disp ** 2).sum(axis=1)), 1e-9)
+        pos += disp / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature *= cooling
+
+    # 以 99 分位数归一化，避免孤立节点把其余节点压缩到中心
+    pos -= np.median(pos, axis=0)
+    extent = float(np.percentile(np.abs(pos), 99)) or 1.0
+    return np.clip(pos / extent, -1.0, 1.0).astype(np.float32)
+
+@dataclass
+class GraphSnapshot:
+    version: int
+    etag: str
+    body: bytes
+    node_count: int
+    edge_count: int
+
+def encode_snapshot(version: int, ids: List[str], labels: List[str], groups, xy, degrees, sizes,
+                    sources, targets, edge_types, edge_type_names: List[str]) -> bytes:
+    import numpy as np
+
+    sections = [
+        ("x", np.ascontiguousarray(xy[:, 0], dtype="<f4")),
+        ("y", np.ascontiguousarray(xy[:, 1], dtype="<f4")),
+        ("degree", np.asarray(degrees, dtype="<u4")),
+        ("size", np.asarray(sizes, dtype="u1")),
+        ("group", np.asarray(groups, dtype="u1")),
+        ("edge_source", np.asarray(sources, dtype="<u4")),
+        ("edge_target", np.asarray(targets, dtype="<u4")),
+        ("edge_type", np.asarray(edge_types, dtype="<u2")),
+        # 字符串列以 \n 分隔的 UTF-8 文本存储
+        ("ids", np.frombuffer("\n".join(ids).encode("utf-8"), dtype="u1")),
+        ("labels", np.frombuffer("\n".join(l.replace("\n", " ") for l in labels).encode("utf-8"), dtype="u1")),
+    ]
+
+    def _header(offsets):
+        return json.dumps({
+            "version": version,
+            "node_count": len(ids),
+            "edge_count": len(sources),
+            "edge_types": edge_type_names,
+            "sections": [
+                {"name": name, "dtype": array.dtype.str, "offset": offset, "length": int(array.size)}
+                for (name, array), offset in zip(sections, offsets)
+            ],
+        }).encode("utf-8")
+
+    def _layout(header_len):
+        offset = _align(8 + header_len)
+        offsets = []
+        for _, array in sections:
+            offsets.append(offset)
+            offset = _align(offset + array.nbytes)
+        return offsets
+
+    # 头部里包含偏移量，偏移量又依赖头部长度：迭代到稳定
+    offsets = _layout(0)
+    header = _header(offsets)
+    while True:
+        new_offsets = _layout(len(header))
+        new_header = _header(new_offsets)
+        if new_offsets == offsets and len(new_header) == len(header):
+            break
+        offsets, header = new_offsets, new_header
+
+    out = bytearray(SNAPSHOT_MAGIC + struct.pack("<I", len(header)) + header)
+    for (_, array), offset in zip(sections, offsets):
+        out.extend(b"\0" * (offset - len(out)))
+        out.extend(array.tobytes())
+    return bytes(out)
+
+def _align(offset: int) -> int:
+    return (offset + 3) & ~3
+
+def build_snapshot(nodes: list, edges: list, version: int, iterations: int) -> GraphSnapshot:
+    """
+    由节点/边记录计算布局与度数并编码为快照 (CPU 密集，应在线程中运行)。
+    """
+    import numpy as np
+
+    ids = [n["id"] for n in nodes]
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    edges = [e for e in edges if e["source"] in index and e["target"] in index]
+
+    edge_type_names = sorted({e["type"] for e in edges})
+    type_codes = {name: i for i, name in enumerate(edge_type_names)}
+    sources = np.fromiter((index[e["source"]] for e in edges), dtype=np.int64, count=len(edges))
+    targets = np.fromiter((index[e["target"]] for e in edges), dtype=np.int64, count=len(edges))
+    edge_types = [type_codes[e["type"]] for e in edges]
+
+    degrees = np.bincount(np.concatenate([sources, targets]), minlength=len(ids)) if len(ids) else np.zeros(0)
+    sizes = [node_size(int(d)) for d in degrees]
+    xy = compute_layout(len(ids), sources, targets, iterations=iterations)
+
+    body = encode_snapshot(
+        version, ids, [str(n["label"]) for n in nodes], [int(n["group"] or 1) for n in nodes],
+        xy, degrees, sizes, sources, targets, edge_types, edge_type_names,
+    )
+    return GraphSnapshot(version=version, etag=f'"g{version}"', body=body,
+                         node_count=len(ids), edge_count=len(edges))
+
+class SnapshotStore:
+    """
+    保存最新的图谱快照，并在图谱版本变化时在后台重建。
+    重建期间继续提供旧快照；快照同时写入磁盘，进程重启后无需重新计算，
+    新版本写入后删除旧版本的文件。服务启动时由 lifespan 调用 prepare 预先加载或生成。
+    """
+    def __init__(self, directory: str, iterations: int):
+        self.directory = directory
+        self.iterations = iterations
+        self.latest: Optional[GraphSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _path(self, version: int) -> str:
+        return os.path.join(self.directory, f"graph-{version}.bin")
+
+    def _load_from_disk(self, version: int) -> Optional[GraphSnapshot]:
+        path = self._path(version)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            body = f.read()
+        header_len = struct.unpack("<I", body[4:8])[0]
+        header = json.loads(body[8:8 + header_len])
+        return GraphSnapshot(version=version, etag=f'"g{version}"', body=body,
+                             node_count=header["node_count"], edge_count=header["edge_count"])
+
+    def _versions_on_disk(self) -> List[int]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(int(m.group(1)) for m in map(_SNAPSHOT_FILE_RE.fullmatch, names) if m)
+
+    def _load_newest_from_disk(self) -> Optional[GraphSnapshot]:
+        versions = self._versions_on_disk()
+        return self._load_from_disk(versions[-1]) if versions else None
+
+    def _save_to_disk(self, snapshot: GraphSnapshot) -> None:
+        # 每个写入者使用独立的临时文件 (多个 uvicorn worker 可能同时生成同一版本)，写完后原子替换
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = tempfile.NamedTemporaryFile(dir=self.directory, prefix=f"graph-{snapshot.version}.",
+                                          suffix=".tmp", delete=False)
+        try:
+            with tmp:
+                tmp.write(snapshot.body)
+            os.replace(tmp.name, self._path(snapshot.version))
+        except BaseException:
+            os.remove(tmp.name)
+            raise
+        self._prune(snapshot.version)
+
+    def _prune(self, keep: int) -> None:
+        """删除其他版本的快照文件 (每个版本一个文件，不清理的话随 ETL 次数无限增长)。"""
+        for version in self._versions_on_disk():
+            if version != keep:
+                try:
+                    os.remove(self._path(version))
+                except FileNotFoundError:
+                    pass
+
+    async def rebuild(self, db, version: int) -> GraphSnapshot:
+        started = time.perf_counter()
+        nodes = await db.execute_query(SNAPSHOT_NODES_QUERY, name="snapshot_nodes")
+        edges = await db.execute_query(SNAPSHOT_EDGES_QUERY, name="snapshot_edges")
+        snapshot = await asyncio.to_thread(build_snapshot, nodes, edges, version, self.iterations)
+        await asyncio.to_thread(self._save_to_disk, snapshot)
+        self.latest = snapshot
+        logger.info(
+            f"图谱快照 v{version} 已生成: {snapshot.node_count} 节点, {snapshot.edge_count} 边, "
+            f"{len(snapshot.body)} 字节, 用时 {time.perf_counter() - started:.2f}s"
+        )
+        return snapshot
+
+    async def get(self, db) -> Optional[GraphSnapshot]:
+        """
+        返回当前可用的快照；若图谱版本已变化则在后台启动重建。
+        """
+        version = await graph_version.current(db)
+        if self.latest is None or self.latest.version != version:
+            cached = await asyncio.to_thread(self._load_from_disk, version)
+            if cached is not None:
+                self.latest = cached
+                await asyncio.to_thread(self._prune, version)
+            else:
+                if self.latest is None:
+                    # 进程刚启动: 重建期间先提供磁盘上最近的旧版本
+                    self.latest = await asyncio.to_thread(self._load_newest_from_disk)
+                if self._task is None or self._task.done():
+                    self._task = asyncio.create_task(self.rebuild(db, version))
+                    self._task.add_done_callback(_log_task_error)
+        return self.latest
+
+    async def prepare(self, db) -> None:
+        """启动时加载当前版本的快照，磁盘上没有时立即开始生成，而不是等到第一个请求。"""
+        await self.get(db)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match 是否命中 etag: 支持逗号分隔的多个值、弱校验 (W/ 前缀) 与 "*"。
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def _log_task_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"图谱快照生成失败: {task.exception()}")
+
+# 全局实例
+snapshot_store = SnapshotStore(settings.GRAPH_SNAPSHOT_DIR, settings.GRAPH_LAYOUT_ITERATIONS)
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import os
+import time
+import logging
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 图谱版本号保存在单个 GraphMeta 节点上，每次 ETL 完成后更新。
+# 使用毫秒时间戳而不是自增计数，这样即使整库清空重建，版本号也不会回退。
+# API 进程内的缓存以该版本号作为键的一部分，因此 ETL 跑完即自动失效。
+# (GraphMeta 故意不带 id 属性与 AuditEntity 标签，避免出现在图谱可视化中；
+#  节点计数等统计应限定 :AuditEntity，见 dashboard 的 DASHBOARD_STATS_QUERY)
+READ_VERSION_QUERY = """
+OPTIONAL MATCH (m:GraphMeta {name: 'graph'})
+RETURN coalesce(m.version, 0) AS version
+"""
+
+BUMP_VERSION_QUERY = """
+MERGE (m:GraphMeta {name: 'graph'})
+SET m.version = timestamp(), m.updatedAt = datetime()
+RETURN m.version AS version
+"""
+
+def bump_graph_version(client) -> int:
+    """
+    由 ETL 在加载完成后调用 (同步客户端)，使所有 API 缓存失效。
+    """
+    version = client.execute_query(BUMP_VERSION_QUERY, name="graph_version_bump")[0]["version"]
+    logger.info(f"Graph version bumped to {version}")
+    return version
+
+# ETL 在版本号递增后，在数据目录写入本次加载所用 CSV 的版本戳。
+# 进程内图引擎以 csv 为数据源时据此确认本地 CSV 正是当前图谱版本所加载的那一份。
+VERSION_STAMP_FILE = "graph_version.json"
+
+def _file_signature(path: str) -> dict:
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def write_version_stamp(directory: str, version: int, files) -> str:
+    stamp = {"version": version, "files": {name: _file_signature(os.path.join(directory, name)) for name in files}}
+    path = os.path.join(directory, VERSION_STAMP_FILE)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(stamp, f, indent=2)
+    return path
+
+def version_stamp_matches(directory: str, version: int) -> bool:
+    """目录中的版本戳是否对应 version，且其中记录的 CSV 此后未被修改。"""
+    try:
+        with open(os.path.join(directory, VERSION_STAMP_FILE), encoding="utf-8") as f:
+            stamp = json.load(f)
+        return stamp.get("version") == version and all(
+            _file_signature(os.path.join(directory, name)) == signature
+            for name, signature in stamp.get("files", {}).items()
+        )
+    except (OSError, ValueError):
+        return False
+
+class GraphVersionTracker:
+    """
+    在 API 进程中跟踪当前图谱版本。
+    版本号本身最多每 check_interval 秒向 Neo4j 查询一次。
+    """
+    def __init__(self, check_interval: float = 5.0):
+        self.check_interval = check_interval
+        self.version = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def current(self, db) -> int:
+        if self.version is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return self.version
+        async with self._lock:
+            if self.version is None or time.monotonic() - self._checked_at >= self.check_interval:
+                results = await db.execute_query(READ_VERSION_QUERY, name="graph_version")
+                self.version = results[0]["version"] if results else 0
+                self._checked_at = time.monotonic()
+        return self.version
+
+    def invalidate(self) -> None:
+        self._checked_at = 0.0
+
+# 全局实例
+graph_version = GraphVersionTracker(settings.GRAPH_VERSION_CHECK_INTERVAL)
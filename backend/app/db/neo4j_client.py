@@ -1,9 +1,40 @@
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, AsyncGraphDatabase, READ_ACCESS, unit_of_work
 from app.core.config import settings
+from app.core import metrics
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# 未命名查询统一归到这个标签下，避免动态生成的 Cypher 撑爆指标基数
+UNNAMED_QUERY = "unnamed"
+
+def _record_query(name: str, query: str, parameters: dict, started: float, rows: int, summary=None, failed: bool = False):
+    """
+    查询计时钩子: 按稳定的查询名记录客户端耗时、返回行数，以及服务器端的
+    result_available_after / result_consumed_after；超过 SLOW_QUERY_LOG_MS 时写慢查询日志。
+    """
+    name = name or UNNAMED_QUERY
+    elapsed = time.perf_counter() - started
+    metrics.NEO4J_QUERY_DURATION.observe(elapsed, query=name)
+    if failed:
+        metrics.NEO4J_QUERY_ERRORS.inc(query=name)
+        return
+    metrics.NEO4J_QUERY_ROWS.inc(rows, query=name)
+    available = getattr(summary, "result_available_after", None)
+    consumed = getattr(summary, "result_consumed_after", None)
+    if available is not None:
+        metrics.NEO4J_RESULT_AVAILABLE_AFTER.observe(available / 1000, query=name)
+    if consumed is not None:
+        metrics.NEO4J_RESULT_CONSUMED_AFTER.observe(consumed / 1000, query=name)
+
+    if settings.SLOW_QUERY_LOG_MS and elapsed * 1000 >= settings.SLOW_QUERY_LOG_MS:
+        logger.warning(
+            f"慢查询 [{name}] {elapsed * 1000:.1f}ms, rows={rows}, "
+            f"available_after={available}ms, consumed_after={consumed}ms, "
+            f"params={sorted((parameters or {}).keys())}: {' '.join(query.split())[:500]}"
+        )
+
 class Neo4jClient:
     def __init__(self):
         self.uri = settings.NEO4J_URI
@@ -25,17 +56,142 @@ class Neo4jClient:
             self.driver.close()
             logger.info("已关闭 Neo4j 连接")
 
-    def execute_query(self, query: str, parameters: dict = None):
+    def execute_query(self, query: str, parameters: dict = None, name: str = None):
         if not self.driver:
             self.connect()
         
+        started = time.perf_counter()
         try:
             with self.driver.session() as session:
                 result = session.run(query, parameters or {})
-                return [record.data() for record in result]
+                rows = [record.data() for record in result]
+                _record_query(name, query, parameters, started, len(rows), result.consume())
+                return rows
         except Exception as e:
+            _record_query(name, query, parameters, started, 0, failed=True)
             logger.error(f"查询执行失败: {e}")
             raise e
 
+    def execute_write(self, query: str, parameters: dict = None, name: str = None):
+        """
+        在显式写事务中执行语句 (失败时由驱动自动重试)，返回结果摘要。
+        """
+        if not self.driver:
+            self.connect()
+
+        def _work(tx):
+            return tx.run(query, parameters or {}).consume()
+
+        started = time.perf_counter()
+        try:
+            with self.driver.session() as session:
+                summary = session.execute_write(_work)
+                _record_query(name, query, parameters, started, 0, summary)
+                return summary
+        except Exception as e:
+            _record_query(name, query, parameters, started, 0, failed=True)
+            logger.error(f"写事务执行失败: {e}")
+            raise e
+
+class AsyncNeo4jClient:
+    """
+    基于 AsyncGraphDatabase 的异步客户端，供 async 端点使用。
+    驱动在应用 lifespan 中打开/关闭，所有请求共享同一个连接池。
+    """
+    def __init__(self):
+        self.uri = settings.NEO4J_URI
+        self.username = settings.NEO4J_USERNAME
+        self.password = settings.NEO4J_PASSWORD
+        self.max_pool_size = settings.NEO4J_MAX_POOL_SIZE
+        self.acquisition_timeout = settings.NEO4J_ACQUISITION_TIMEOUT
+        self.driver = None
+
+    async def connect(self):
+        if not self.driver:
+            try:
+                self.driver = AsyncGraphDatabase.driver(
+                    self.uri,
+                    auth=(self.username, self.password),
+                    max_connection_pool_size=self.max_pool_size,
+                    connection_acquisition_timeout=self.acquisition_timeout,
+                )
+                logger.info(f"已创建 Neo4j 异步连接池 (max_pool_size={self.max_pool_size})")
+            except Exception as e:
+                logger.error(f"连接 Neo4j 失败: {e}")
+                raise e
+
+    async def close(self):
+        if self.driver:
+            await self.driver.close()
+            self.driver = None
+            logger.info("已关闭 Neo4j 异步连接池")
+
+    async def execute_query(self, query: str, parameters: dict = None, name: str = None):
+        """
+        执行查询并返回全部记录。name 为稳定的查询名，用作指标标签与慢查询日志。
+        """
+        if not self.driver:
+            await self.connect()
+
+        started = time.perf_counter()
+        try:
+            async with self.driver.session() as session:
+                result = await session.run(query, parameters or {})
+                rows = [record.data() async for record in result]
+                _record_query(name, query, parameters, started, len(rows), await result.consume())
+                return rows
+        except Exception as e:
+            _record_query(name, query, parameters, started, 0, failed=True)
+            logger.error(f"查询执行失败: {e}")
+            raise e
+
+    async def execute_read(self, query: str, parameters: dict = None, timeout: float = None,
+                           max_rows: int = None, name: str = None):
+        """
+        在只读事务中执行查询 (服务器拒绝任何写操作)。
+        timeout 为服务器端事务超时 (秒)；最多读取 max_rows 行，其余结果直接丢弃。
+        返回 (rows, truncated)。
+        """
+        if not self.driver:
+            await self.connect()
+
+        @unit_of_work(timeout=timeout)
+        async def _work(tx):
+            result = await tx.run(query, parameters or {})
+            rows = []
+            async for record in result:
+                if max_rows is not None and len(rows) >= max_rows:
+                    # 截断时不再消费剩余结果，也就没有服务器端的完成时间
+                    return rows, True, None
+                rows.append(record.data())
+            return rows, False, await result.consume()
+
+        started = time.perf_counter()
+        try:
+            async with self.driver.session(default_access_mode=READ_ACCESS) as session:
+                rows, truncated, summary = await session.execute_read(_work)
+        except Exception:
+            _record_query(name, query, parameters, started, 0, failed=True)
+            raise
+        _record_query(name, query, parameters, started, len(rows), summary)
+        return rows, truncated
+
+    async def stream_query(self, query: str, parameters: dict = None, name: str = None):
+        """
+        逐条产出查询结果 (异步生成器)，用于流式响应，避免先把整个结果集读入内存。
+        """
+        if not self.driver:
+            await self.connect()
+
+        started = time.perf_counter()
+        rows = 0
+        async with self.driver.session() as session:
+            result = await session.run(query, parameters or {})
+            async for record in result:
+                rows += 1
+                yield record.data()
+            _record_query(name, query, parameters, started, rows, await result.consume())
+
 # 全局实例
 neo4j_client = Neo4jClient()
+async_neo4j_client = AsyncNeo4jClient()
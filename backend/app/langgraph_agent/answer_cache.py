@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import re
+import unicodedata
+from typing import List, Optional, Tuple
+import numpy as np
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.embeddings import get_embeddings
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION_RE = re.compile(r"[\s\W_]+", re.UNICODE)
+# 向量矩阵超过该行数时在线程中做相似度计算，避免阻塞事件循环
+THREAD_THRESHOLD = 4096
+
+def normalize_question(question: str) -> str:
+    """
+    归一化问题文本：全角转半角、小写、去掉全部标点与空白
+    (中英文混排时空格位置不固定，因此不保留词间空格)。
+    "列出所有 Open 的高风险？" 与 "列出所有open的高风险" 归一化后相同。
+    """
+    text = unicodedata.normalize("NFKC", question).lower()
+    return _PUNCTUATION_RE.sub("", text)
+
+def _normalize(vector: List[float]) -> Optional[np.ndarray]:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else None
+
+def _best_match(matrix: np.ndarray, vector: np.ndarray) -> Tuple[int, float]:
+    # 行向量均已归一化，一次矩阵乘法即得到全部余弦相似度
+    scores = matrix @ vector
+    index = int(np.argmax(scores))
+    return index, float(scores[index])
+
+class AnswerCache:
+    """
+    审计助手的问答缓存。
+    键为 (归一化问题, 图谱版本)，ETL 递增版本号后旧答案自然失效。
+    先做精确匹配；开启语义模式时，再用 embedding 余弦相似度在同一版本的条目中查找近似问题。
+    同一版本条目的归一化向量堆叠为矩阵 (新增条目后按需重建)，查找时只做一次矩阵乘法。
+    """
+    def __init__(self, maxsize: int, ttl: float, semantic: bool = False, threshold: float = 0.92):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.semantic = semantic
+        self.threshold = threshold
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        # 版本号 -> (条目键列表, 向量矩阵)；store 后标记失效
+        self._index: dict = {}
+
+    async def _embed(self, text: str) -> Optional[np.ndarray]:
+        try:
+            return _normalize(await get_embeddings().aembed_query(text))
+        except Exception as e:
+            # embedding 服务不可用时退化为仅精确匹配
+            logger.warning(f"问答缓存 embedding 失败: {e}")
+            return None
+
+    def _matrix(self, version: int) -> Tuple[list, Optional[np.ndarray]]:
+        index = self._index.get(version)
+        if index is None:
+            keys, vectors = [], []
+            for key, entry in self.entries.items():
+                if key[1] == version and entry["vector"] is not None:
+                    keys.append(key)
+                    vectors.append(entry["vector"])
+            index = (keys, np.vstack(vectors) if vectors else None)
+            # 旧版本的条目不会再被查找，只保留当前版本的矩阵
+            self._index = {version: index}
+        return index
+
+    async def _semantic_lookup(self, vector: np.ndarray, version: int) -> Optional[dict]:
+        keys, matrix = self._matrix(version)
+        if matrix is None:
+            return None
+        if len(keys) > THREAD_THRESHOLD:
+            row, score = await asyncio.to_thread(_best_match, matrix, vector)
+        else:
+            row, score = _best_match(matrix, vector)
+        if score < self.threshold:
+            return None
+        # 矩阵构建后条目可能已过期或被淘汰
+        return self.entries.get(keys[row])
+
+    async def lookup(self, question: str, version: int) -> Tuple[Optional[dict], Optional[np.ndarray]]:
+        """
+        返回 (缓存的答案, 问题向量)。未命中时把问题向量传给 store，避免同一问题再做一次 embedding。
+        """
+        normalized = normalize_question(question)
+        entry = self.entries.get((normalized, version))
+        if entry is not None:
+            self.exact_hits += 1
+            return entry["answer"], entry["vector"]
+
+        vector = None
+        if self.semantic:
+            vector = await self._embed(normalized)
+            if vector is not None:
+                entry = await self._semantic_lookup(vector, version)
+                if entry is not None:
+                    self.semantic_hits += 1
+                    return entry["answer"], vector
+
+        self.misses += 1
+        return None, vector
+
+    async def store(self, question: str, version: int, answer: dict, vector: Optional[np.ndarray] = None) -> None:
+        normalized = normalize_question(question)
+        if self.semantic and vector is None:
+            vector = await self._embed(normalized)
+        self.entries.set((normalized, version), {"answer": answer, "vector": vector if self.semantic else None})
+        self._index.pop(version, None)
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "size": len(self.entries),
+            "lookups": lookups,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
+
+# 全局实例
+answer_cache = AnswerCache(
+    maxsize=settings.ANSWER_CACHE_SIZE,
+    ttl=settings.ANSWER_CACHE_TTL,
+    semantic=settings.ANSWER_CACHE_SEMANTIC,
+    threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+)
@@ -1,37 +1,49 @@
+from functools import lru_cache
 from typing import Annotated, Literal, List
 from typing_extensions import TypedDict
+import asyncio
 import json
+import logging
+import time
 
-from langchain_openai import ChatOpenAI
 from langchain_core.tools import tool
-from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, ToolMessage
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage, HumanMessage, ToolMessage
 from langgraph.graph import StateGraph, END, START
 from langgraph.graph.message import add_messages
 
 # 由于导入失败，手动实现 ToolNode 和 tools_condition
 class BasicToolNode:
-    def __init__(self, tools: list) -> None:
+    """
+    异步工具节点：同一轮中模型发出的多个工具调用通过 asyncio.gather 并发执行，
+    并由 max_concurrency 限制单个请求内的并发数。
+    """
+    def __init__(self, tools: list, max_concurrency: int = 4) -> None:
         self.tools_by_name = {tool.name: tool for tool in tools}
+        self.max_concurrency = max_concurrency
 
-    def __call__(self, inputs: dict):
+    async def __call__(self, inputs: dict):
         if messages := inputs.get("messages", []):
             message = messages[-1]
         else:
             raise ValueError("No message found in input")
 
-        outputs = []
-        for tool_call in message.tool_calls:
-            tool_result = self.tools_by_name[tool_call["name"]].invoke(
-                tool_call["args"]
-            )
-            outputs.append(
-                ToolMessage(
-                    content=json.dumps(tool_result),
-                    name=tool_call["name"],
-                    tool_call_id=tool_call["id"],
+        # 每次调用单独创建信号量，限制的是当前请求而不是整个进程
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _run(tool_call):
+            async with semaphore:
+                tool_result = await self.tools_by_name[tool_call["name"]].ainvoke(
+                    tool_call["args"]
                 )
+            return ToolMessage(
+                content=json.dumps(tool_result),
+                name=tool_call["name"],
+                tool_call_id=tool_call["id"],
             )
-        return {"messages": outputs}
+
+        # gather 保持结果顺序与 tool_calls 一致
+        outputs = await asyncio.gather(*(_run(call) for call in message.tool_calls))
+        return {"messages": list(outputs)}
 
 def tools_condition(state):
     if isinstance(state, list):
@@ -48,11 +60,21 @@ def tools_condition(state):
     return END
 
 from app.core.config import settings
-from app.db.neo4j_client import neo4j_client
+from app.core.metrics import AGENT_STEP_DURATION, record_llm_usage
+from app.db.neo4j_client import async_neo4j_client
+from app.db.graph_version import graph_version
+from app.langgraph_agent.answer_cache import answer_cache, normalize_question
+from app.langgraph_agent.llm_gateway import LLMOverloaded, llm_gateway, question_flights
+from app.langgraph_agent.memory import GRAPH_CONTEXT_NAME, compact_messages, conversation_memory
+from app.langgraph_agent.query_executor import EMPTY_RESULT, run_guarded_query
+from app.langgraph_agent.retriever import graph_retriever
+from app.langgraph_agent.templates import intent_router
+
+logger = logging.getLogger(__name__)
 
 # 1. 定义工具
 @tool
-def query_graph(query: str) -> str:
+async def query_graph(query: str) -> str:
     """
     在审计知识图谱上执行只读 Cypher 查询。
     使用此工具查找风险、控制、文档及其关系。
@@ -68,48 +90,71 @@ def query_graph(query: str) -> str:
       - (:Standard)-[:CONTAINS]->(:Control) (标准 包含 控制)
       - (:Control)-[:EVIDENCED_BY]->(:Document) (控制 由...证明)
       - (:Control)-[:REQUIRES]->(:Control) (控制 需要 控制)
+    - 以上节点都带有 AuditEntity 标签；统计全部节点时用 MATCH (n:AuditEntity)，
+      不要用 MATCH (n) (会包含内部的 GraphMeta 节点)
     
     示例:
     - "查找所有高风险": MATCH (r:Risk) WHERE r.severity = 'High' RETURN r.title
     - "哪些控制措施缓解了风险 R-001?": MATCH (c:Control)-[:MITIGATES]->(r:Risk {id: 'R-001'}) RETURN c.label
     """
     try:
-        # 安全检查：简单的只读检查
-        if "DELETE" in query.upper() or "CREATE" in query.upper() or "MERGE" in query.upper() or "SET" in query.upper():
-            return "错误: 仅允许只读查询 (MATCH/RETURN)。"
-            
-        results = neo4j_client.execute_query(query)
-        return str(results)
+        # 在只读事务中执行，带超时、行数/字节上限与结果缓存
+        return await run_guarded_query(query)
     except Exception as e:
         return f"查询错误: {str(e)}"
 
 tools = [query_graph]
 
-# 2. 设置 LLM
-llm = ChatOpenAI(
-    base_url=settings.DOUBAO_BASE_URL,
-    api_key=settings.ARK_API_KEY or settings.DOUBAO_API_KEY,
-    model=settings.DOUBAO_MODEL,
-    temperature=0
-).bind_tools(tools)
+# 2. 设置 LLM (首次使用时构建；chat_model 不绑定工具，用于会话摘要)
+@lru_cache()
+def get_chat_model():
+    # langchain_openai 导入较慢，只在真正需要模型时加载
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        base_url=settings.DOUBAO_BASE_URL,
+        api_key=settings.ARK_API_KEY or settings.DOUBAO_API_KEY,
+        model=settings.DOUBAO_MODEL,
+        temperature=0,
+        # 流式调用也返回 token 用量 (最后一个 chunk 的 usage_metadata)
+        stream_usage=True,
+    )
+
+@lru_cache()
+def get_llm():
+    return get_chat_model().bind_tools(tools)
 
 # 3. 定义图状态
 class AgentState(TypedDict):
     messages: Annotated[List[BaseMessage], add_messages]
 
 # 4. 定义节点
-def agent_node(state: AgentState):
+async def _summarize(messages: list):
+    async with llm_gateway.slot("summary"):
+        response = await get_chat_model().ainvoke(messages)
+    record_llm_usage("summary", response.usage_metadata)
+    return response
+
+async def compact_node(state: AgentState):
+    # 多轮会话超出 token 预算时压缩旧轮次与大段工具输出
+    return {"messages": await compact_messages(state["messages"], _summarize)}
+
+async def agent_node(state: AgentState):
     messages = state["messages"]
-    response = llm.invoke(messages)
+    # 所有 LLM 调用经过网关: 并发上限 + 令牌桶限速 + 有界排队
+    async with llm_gateway.slot("agent"):
+        response = await get_llm().ainvoke(messages)
+    record_llm_usage("agent", response.usage_metadata)
     return {"messages": [response]}
 
 # 5. 构建图
 workflow = StateGraph(AgentState)
 
+workflow.add_node("compact", compact_node)
 workflow.add_node("agent", agent_node)
-workflow.add_node("tools", BasicToolNode(tools))
+workflow.add_node("tools", BasicToolNode(tools, max_concurrency=settings.AGENT_TOOL_CONCURRENCY))
 
-workflow.add_edge(START, "agent")
+workflow.add_edge(START, "compact")
+workflow.add_edge("compact", "agent")
 workflow.add_conditional_edges(
     "agent",
     tools_condition,
@@ -117,14 +162,33 @@ workflow.add_conditional_edges(
 )
 workflow.add_edge("tools", "agent")
 
-agent_app = workflow.compile()
+@lru_cache()
+def get_agent_app():
+    # 单轮问答使用的无检查点图，首次使用时编译
+    return workflow.compile()
 
-# 6. API 调用的辅助函数
-async def run_agent(user_input: str, context: dict = None):
+# 带检查点的会话图: 检查点存储打开后才确定，按需编译
+_session_app = None
+
+async def get_session_app():
+    global _session_app
+    await conversation_memory.open()
+    saver = conversation_memory.saver
+    if _session_app is None or _session_app.checkpointer is not saver:
+        _session_app = workflow.compile(checkpointer=saver)
+    return _session_app
+
+async def warm_up():
     """
-    运行 Agent 的入口点 (供 API 使用)
+    预热 Agent: 构建模型客户端、编译工作流并打开会话检查点存储，
+    让第一个对话请求不必承担这些开销 (由 app.main 在后台调用)。
     """
-    system_prompt = """你是一个智能审计助手。
+    get_llm()
+    get_agent_app()
+    await get_session_app()
+
+# 6. API 调用的辅助函数
+SYSTEM_PROMPT = """你是一个智能审计助手。
     你的目标是利用知识图谱帮助审计员分析风险、控制和文档。
     
     - 始终使用 'query_graph' 工具来检索事实。不要编造信息。
@@ -132,22 +196,265 @@ async def run_agent(user_input: str, context: dict = None):
     - 如果用户询问合规性，请检查 Control 和 Evidence。
     - 提供简洁、专业的回答。
     """
-    
-    initial_messages = [
-        SystemMessage(content=system_prompt),
+
+# 需要上报耗时的图节点 (compact 仅在实际压缩时上报)
+GRAPH_NODES = {"compact", "agent", "tools"}
+
+# 单次调用的最大步数，防止无限循环 (compact 占用一步)
+RECURSION_LIMIT = 11
+
+# 工具输出在事件流中的预览长度
+TOOL_OUTPUT_PREVIEW_CHARS = 500
+
+# 模板快速路径: 查询结果已确定，只需一次简短的总结调用
+FAST_PATH_PROMPT = """你是一个智能审计助手。
+    下面是针对用户问题从审计知识图谱中查询到的结果 (JSON)。
+    - 只依据这些数据回答，不要编造信息。
+    - 结果为空时，明确说明图谱中没有找到相关数据。
+    - 提供简洁、专业的回答。
+    """
+
+def _initial_messages(user_input: str) -> list:
+    return [
+        SystemMessage(content=SYSTEM_PROMPT),
         HumanMessage(content=user_input)
     ]
-    
-    # 运行图
-    # config={"recursion_limit": 10} 防止无限循环
-    final_state = await agent_app.ainvoke(
-        {"messages": initial_messages},
-        config={"recursion_limit": 10}
-    )
-    
-    # 提取最后一条消息内容
-    last_message = final_state["messages"][-1]
-    return {
-        "response": last_message.content,
-        "full_messages": [m.content for m in final_state["messages"]]
+
+async def _save_turn(app, config: dict, history: list, turn: list):
+    """
+    把未经过图执行的一轮问答 (缓存命中 / 模板快速路径) 写入会话检查点，后续追问仍有上下文。
+    """
+    head = [] if history else [SystemMessage(content=SYSTEM_PROMPT)]
+    await app.aupdate_state(config, {"messages": [*head, *turn]}, as_node="agent")
+
+def _step_detail(node: str, output) -> str:
+    messages = (output or {}).get("messages", []) if isinstance(output, dict) else []
+    if node == "compact":
+        return "压缩会话历史"
+    if node == "agent":
+        tool_calls = [call["name"] for m in messages for call in getattr(m, "tool_calls", [])]
+        return f"请求调用工具: {', '.join(tool_calls)}" if tool_calls else "生成最终回答"
+    names = [getattr(m, "name", None) for m in messages]
+    return f"执行工具: {', '.join(n for n in names if n)}"
+
+def _preview(output) -> str:
+    text = getattr(output, "content", output)
+    text = text if isinstance(text, str) else str(text)
+    if len(text) > TOOL_OUTPUT_PREVIEW_CHARS:
+        return text[:TOOL_OUTPUT_PREVIEW_CHARS] + "..."
+    return text
+
+async def _answer_events(app, config: dict, history: list, user_input: str, version: int, session_id: str = None,
+                         query_vector=None):
+    """
+    未命中缓存时的实际作答: 模板快速路径，或 GraphRAG 检索 + LangGraph 循环。
+    事件格式同 stream_agent。query_vector 为缓存查找时算出的问题向量，写入缓存时复用。
+    """
+    started = {}
+    steps = []
+    final_state = None
+
+    route = intent_router.route(user_input) if settings.AGENT_FAST_PATH_ENABLED else None
+    if route is not None:
+        tokens = []
+        try:
+            step_started = time.perf_counter()
+            data = await run_guarded_query(route.query, route.parameters, name=f"template_{route.template.name}")
+            if data == EMPTY_RESULT:
+                # 实体不存在或条件过窄时模板答不了，交给 Agent 自行探索，而不是把空结果总结成回答
+                raise LookupError(f"查询模板 {route.template.name} 没有返回结果")
+            step = {"node": "template", "status": "completed", "detail": f"执行查询模板: {route.template.name}",
+                    "duration_ms": round((time.perf_counter() - step_started) * 1000, 1)}
+            steps.append(step)
+            yield {"event": "step", **step}
+
+            step_started = time.perf_counter()
+            async with llm_gateway.slot("fast_path"):
+                async for chunk in get_chat_model().astream([
+                    SystemMessage(content=FAST_PATH_PROMPT),
+                    HumanMessage(content=f"问题: {user_input}\n\n查询结果 ({route.template.description}):\n{data}"),
+                ]):
+                    record_llm_usage("fast_path", chunk.usage_metadata)
+                    if chunk.content:
+                        tokens.append(chunk.content)
+                        yield {"event": "token", "content": chunk.content}
+            step = {"node": "summarize", "status": "completed", "detail": "生成最终回答",
+                    "duration_ms": round((time.perf_counter() - step_started) * 1000, 1)}
+            steps.append(step)
+            yield {"event": "step", **step}
+        except LLMOverloaded:
+            raise
+        except Exception as e:
+            # 已经输出 token 时无法再无缝切换，直接报错；否则退回完整 Agent
+            if tokens:
+                raise
+            logger.warning(f"模板快速路径失败，退回 Agent: {e}")
+            intent_router.record_fallback()
+            steps = []
+            route = None
+
+    if route is not None:
+        turn = [
+            SystemMessage(content=f"查询模板 {route.template.name} 的结果:\n{data}", name=GRAPH_CONTEXT_NAME),
+            HumanMessage(content=user_input),
+            AIMessage(content="".join(tokens)),
+        ]
+        if session_id:
+            await _save_turn(app, config, history, turn)
+        answer = {
+            "response": turn[-1].content,
+            "steps": steps,
+            "full_messages": [m.content for m in turn],
+        }
+        if answer["response"] and not history:
+            await answer_cache.store(user_input, version, answer, query_vector)
+        yield {"event": "done", **answer, "cached": False, "fast_path": route.template.name}
+        return
+
+    inputs = [HumanMessage(content=user_input)] if history else _initial_messages(user_input)
+    if settings.RAG_ENABLED:
+        # GraphRAG: 检索相关节点及邻域，作为系统上下文放在用户问题之前
+        retrieve_started = time.perf_counter()
+        context_text, hits = await graph_retriever.context(user_input, async_neo4j_client)
+        if context_text:
+            inputs.insert(-1, SystemMessage(content=context_text, name=GRAPH_CONTEXT_NAME))
+        step = {"node": "retrieve", "status": "completed", "detail": f"检索到 {hits} 个相关节点",
+                "duration_ms": round((time.perf_counter() - retrieve_started) * 1000, 1)}
+        steps.append(step)
+        yield {"event": "step", **step}
+
+    async for event in app.astream_events({"messages": inputs}, config=config, version="v2"):
+        kind = event["event"]
+        name = event.get("name")
+        run_id = event.get("run_id")
+        data = event.get("data", {})
+
+        # 只转发 agent 节点的 token，compact 节点生成摘要的输出不发给用户
+        if kind == "on_chat_model_stream" and event.get("metadata", {}).get("langgraph_node") == "agent":
+            content = data["chunk"].content
+            if content:
+                yield {"event": "token", "content": content}
+
+        elif kind == "on_tool_start":
+            started[run_id] = time.perf_counter()
+            args = data.get("input") or {}
+            payload = {"event": "tool_start", "name": name, "input": args}
+            if name == "query_graph" and isinstance(args, dict):
+                payload["cypher"] = args.get("query")
+            yield payload
+
+        elif kind == "on_tool_end":
+            duration = (time.perf_counter() - started.pop(run_id, time.perf_counter())) * 1000
+            yield {"event": "tool_end", "name": name, "output": _preview(data.get("output")),
+                   "duration_ms": round(duration, 1)}
+
+        elif kind == "on_chain_start" and name in GRAPH_NODES and event.get("metadata", {}).get("langgraph_node") == name:
+            started[run_id] = time.perf_counter()
+
+        elif kind == "on_chain_end" and run_id in started and name in GRAPH_NODES:
+            duration = (time.perf_counter() - started.pop(run_id)) * 1000
+            if name == "compact" and not (data.get("output") or {}).get("messages"):
+                continue
+            step = {"node": name, "status": "completed", "detail": _step_detail(name, data.get("output")),
+                    "duration_ms": round(duration, 1)}
+            steps.append(step)
+            yield {"event": "step", **step}
+
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            final_state = data.get("output")
+
+    messages = (final_state or {}).get("messages", [])
+    answer = {
+        "response": messages[-1].content if messages else "",
+        "steps": steps,
+        "full_messages": [m.content for m in messages],
     }
+    if answer["response"] and not history:
+        await answer_cache.store(user_input, version, answer, query_vector)
+    yield {"event": "done", **answer, "cached": False}
+
+async def stream_agent(user_input: str, context: dict = None, session_id: str = None):
+    """
+    以事件流的形式运行 Agent (基于 astream_events)。
+    依次产出:
+    - {"event": "token", "content": ...}            LLM 输出的增量 token
+    - {"event": "tool_start", "name", "input", "cypher"}  工具开始 (cypher 为 query_graph 执行的语句)
+    - {"event": "tool_end", "name", "output", "duration_ms"}
+    - {"event": "step", "node", "status", "detail", "duration_ms"}  每个图节点完成
+    - {"event": "done", "response", "steps", "full_messages", "cached"}
+    传入 session_id 时，对话状态保存在检查点中，每轮只发送新的用户消息。
+    重复的问题 (同一图谱版本) 直接从问答缓存返回 done 事件，不调用 LLM；
+    已有历史的会话不走缓存，因为追问的含义依赖上下文。
+    意图路由识别出的常见问题执行参数化模板查询，再经一次总结调用作答 (done 中带 fast_path)。
+    """
+    app = get_agent_app()
+    config = {"recursion_limit": RECURSION_LIMIT}
+    history = []
+    if session_id:
+        app = await get_session_app()
+        config["configurable"] = {"thread_id": session_id}
+        history = (await app.aget_state(config)).values.get("messages", [])
+
+    lookup_started = time.perf_counter()
+    version = await graph_version.current(async_neo4j_client)
+    cached, query_vector = (None, None) if history else await answer_cache.lookup(user_input, version)
+    if cached is not None:
+        if session_id:
+            await _save_turn(app, config, history, [HumanMessage(content=user_input), AIMessage(content=cached["response"])])
+        duration = (time.perf_counter() - lookup_started) * 1000
+        _observe_steps([{"node": "cache", "duration_ms": duration}])
+        yield {
+            **cached,
+            "event": "done",
+            "steps": [{"node": "cache", "status": "completed", "detail": "命中问答缓存", "duration_ms": round(duration, 1)}],
+            "cached": True,
+        }
+        return
+
+    # 相同问题的并发请求只执行一次，其余请求等待 leader 的结果
+    flight_key = None if history else (normalize_question(user_input), version)
+    if flight_key is not None:
+        pending = question_flights.join(flight_key)
+        if pending is not None:
+            answer = await asyncio.shield(pending)
+            if session_id:
+                await _save_turn(app, config, history, [HumanMessage(content=user_input), AIMessage(content=answer["response"])])
+            duration = (time.perf_counter() - lookup_started) * 1000
+            _observe_steps([{"node": "coalesced", "duration_ms": duration}])
+            yield {
+                **answer,
+                "event": "done",
+                "steps": [{"node": "coalesced", "status": "completed", "detail": "合并到进行中的相同问题", "duration_ms": round(duration, 1)}],
+                "cached": False,
+                "coalesced": True,
+            }
+            return
+
+    try:
+        async for event in _answer_events(app, config, history, user_input, version, session_id, query_vector):
+            if event["event"] == "step":
+                _observe_steps([event])
+            # 先唤醒等待者再交出 done 事件: 调用方拿到 done 后可能不再迭代生成器
+            if event["event"] == "done" and flight_key is not None:
+                question_flights.resolve(flight_key, {k: event[k] for k in ("response", "steps", "full_messages")})
+            yield event
+    except BaseException as e:
+        if flight_key is not None:
+            question_flights.resolve(flight_key, error=e if isinstance(e, Exception) else RuntimeError("合并的请求已中断"))
+        raise
+
+def _observe_steps(steps: list):
+    for step in steps:
+        AGENT_STEP_DURATION.observe(step["duration_ms"] / 1000, node=step["node"])
+
+async def run_agent(user_input: str, context: dict = None, session_id: str = None):
+    """
+    运行 Agent 的入口点 (供 API 使用)
+    """
+    async for event in stream_agent(user_input, context, session_id):
+        if event["event"] == "done":
+            return {
+                "response": event["response"],
+                "steps": event["steps"],
+                "full_messages": event["full_messages"]
+            }
@@ -0,0 +1,177 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Hashable, Optional
+from app.core.config import settings
+from app.core import metrics
+
+class LLMOverloaded(Exception):
+    """
+    LLM 网关过载: 排队已满或在 LLM_QUEUE_TIMEOUT 内拿不到并发槽位/令牌。
+    API 层转换为 429，retry_after 为建议的重试等待秒数。
+    """
+    def __init__(self, retry_after: float, reason: str = "LLM 服务繁忙，请稍后重试"):
+        super().__init__(reason)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class TokenBucket:
+    """
+    令牌桶限速: 每秒补充 rate 个令牌，最多累积 capacity 个。
+    reserve() 预占一个令牌并返回需要等待的秒数 (令牌可以透支，等待时间随排队线性增长)。
+    """
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def reserve(self) -> float:
+        wait = self.wait_time()
+        self.tokens -= 1
+        return wait
+
+    def cancel(self):
+        # 退还未使用的预占令牌
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+class SingleFlight:
+    """
+    合并相同键的并发调用: 第一个调用者 (leader) 执行，其余调用者等待它的结果。
+    """
+    def __init__(self):
+        self._inflight = {}
+        self.coalesced = 0
+
+    def join(self, key: Hashable) -> Optional[asyncio.Future]:
+        """
+        已有相同键的调用在进行时返回其 future (调用方 await 它即可)；
+        否则把当前调用登记为 leader 并返回 None，leader 结束后必须调用 resolve()。
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return future
+        self._inflight[key] = asyncio.get_running_loop().create_future()
+        return None
+
+    def resolve(self, key: Hashable, result=None, error: BaseException = None):
+        future = self._inflight.pop(key, None)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+            # 没有跟随者时避免 "exception was never retrieved" 警告
+            future.exception()
+        else:
+            future.set_result(result)
+
+class LLMGateway:
+    """
+    所有对 LLM 的调用都经过的网关:
+    - 并发上限 (max_concurrency 个同时进行的调用)
+    - 令牌桶限速 (rate 次/秒，允许 burst 次突发；rate <= 0 时不限速)
+    - 有界排队: 等待中的调用超过 max_queue，或 queue_timeout 内拿不到槽位/令牌时
+      立即抛出 LLMOverloaded，而不是让请求无限堆积
+    """
+    def __init__(self, max_concurrency: int, rate: float, burst: int, max_queue: int, queue_timeout: float):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.bucket = TokenBucket(rate, burst) if rate > 0 else None
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+        self.active = 0
+        self.calls = 0
+        self.rejected = 0
+
+    def retry_after(self) -> float:
+        # 粗略估计: 当前排队的调用按限速消化所需的时间
+        if self.bucket is None:
+            return 1.0
+        return self.bucket.wait_time() + self.waiting / self.bucket.rate
+
+    def check_admission(self):
+        """
+        在开始处理请求 (例如开始 SSE 流) 之前检查排队是否已满，满时直接拒绝。
+        """
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise LLMOverloaded(self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self, purpose: str = "agent"):
+        """
+        获取一个调用槽位；purpose 用作排队等待与调用耗时指标的标签。
+        """
+        self.check_admission()
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        self.waiting += 1
+        try:
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise LLMOverloaded(self.retry_after())
+
+            # 不限速 (bucket 为 None) 时 wait 恒为 0，即使槽位等到了截止时间附近也不拒绝
+            wait = self.bucket.reserve() if self.bucket is not None else 0.0
+            if wait > 0 and wait > deadline - time.monotonic():
+                if self.bucket is not None:
+                    self.bucket.cancel()
+                self.semaphore.release()
+                self.rejected += 1
+                raise LLMOverloaded(wait)
+            if wait > 0:
+                try:
+                    await asyncio.sleep(wait)
+                except BaseException:
+                    # 等待令牌期间被取消 (客户端断开) 时归还槽位
+                    self.semaphore.release()
+                    raise
+        finally:
+            self.waiting -= 1
+
+        admitted = time.monotonic()
+        metrics.LLM_QUEUE_WAIT.observe(admitted - started, purpose=purpose)
+        self.active += 1
+        self.calls += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.semaphore.release()
+            metrics.LLM_CALL_DURATION.observe(time.monotonic() - admitted, purpose=purpose)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "waiting": self.waiting,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "rate_limit": self.bucket.rate if self.bucket is not None else None,
+        }
+
+# 全局实例
+llm_gateway = LLMGateway(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    rate=settings.LLM_RATE_LIMIT,
+    burst=settings.LLM_RATE_BURST,
+    max_queue=settings.LLM_MAX_QUEUE,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT,
+)
+metrics.registry.gauge("llm_gateway_active", "LLM calls currently in flight", lambda: llm_gateway.active)
+metrics.registry.gauge("llm_gateway_waiting", "LLM calls waiting for a gateway slot", lambda: llm_gateway.waiting)
+# 相同问题的并发请求合并 (键为归一化问题 + 图谱版本)
+question_flights = SingleFlight()
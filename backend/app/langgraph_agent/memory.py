@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+from typing import List
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 中英文混排时约 2 个字符 / token，比默认的 4 更接近豆包的实际计数
+CHARS_PER_TOKEN = 2.0
+
+# 历史摘要消息的名字，用于在下一次压缩时识别并滚动合并
+SUMMARY_NAME = "conversation_summary"
+# GraphRAG 检索上下文消息的名字，紧挨在对应的用户提问之前
+GRAPH_CONTEXT_NAME = "graph_context"
+
+SUMMARY_PROMPT = """你负责压缩审计助手的对话历史。
+    请将下面的历史对话总结为简洁的要点，保留:
+    - 用户关心的风险、控制、文档的 ID 与名称
+    - 已查询到的关键事实与数字
+    - 尚未解决的问题
+    只输出摘要正文，不要寒暄。
+    """
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    return count_tokens_approximately(messages, chars_per_token=CHARS_PER_TOKEN)
+
+def _text(message: BaseMessage) -> str:
+    content = message.content
+    return content if isinstance(content, str) else str(content)
+
+def _truncate(text: str, max_chars: int) -> str:
+    return f"{text[:max_chars]}...[已截断，原长 {len(text)} 字符]"
+
+def _is_summary(message: BaseMessage) -> bool:
+    return isinstance(message, SystemMessage) and message.name == SUMMARY_NAME
+
+def _split_point(messages: List[BaseMessage], keep: int) -> int:
+    """
+    保留最近 keep 条消息，并把切分点向前对齐到一条用户提问 (连同它的检索上下文)，
+    避免保留部分以孤立的 ToolMessage 开头 (OpenAI 接口会拒绝)。
+    """
+    cut = max(len(messages) - keep, 0)
+    while cut > 0 and not isinstance(messages[cut], HumanMessage):
+        cut -= 1
+    while cut > 0 and isinstance(messages[cut - 1], SystemMessage) and messages[cut - 1].name == GRAPH_CONTEXT_NAME:
+        cut -= 1
+    return cut
+
+def _transcript(messages: List[BaseMessage], tool_max_chars: int) -> str:
+    lines = []
+    for m in messages:
+        if _is_summary(m):
+            lines.append(f"[此前摘要] {_text(m)}")
+        elif isinstance(m, HumanMessage):
+            lines.append(f"用户: {_text(m)}")
+        elif isinstance(m, AIMessage):
+            calls = "; ".join(f"{c['name']}({c['args']})" for c in m.tool_calls)
+            if calls:
+                lines.append(f"助手调用工具: {calls}")
+            if _text(m):
+                lines.append(f"助手: {_text(m)}")
+        elif isinstance(m, ToolMessage):
+            text = _text(m)
+            if len(text) > tool_max_chars:
+                text = _truncate(text, tool_max_chars)
+            lines.append(f"工具 {m.name} 返回: {text}")
+    return "\n".join(lines)
+
+async def compact_messages(
+    messages: List[BaseMessage],
+    summarize,
+    budget: int = settings.AGENT_CONTEXT_TOKEN_BUDGET,
+    keep: int = settings.AGENT_CONTEXT_KEEP_MESSAGES,
+    tool_max_chars: int = settings.AGENT_TOOL_OUTPUT_MAX_CHARS,
+) -> List[BaseMessage]:
+    """
+    会话上下文超出 token 预算时压缩旧轮次，返回交给 add_messages 的更新:
+    1. 先把历史中过大的工具输出截断 (按消息 id 原位替换)；
+    2. 仍超出预算时，用 summarize (异步函数: 消息列表 -> AIMessage) 把较早的轮次 (含此前的摘要) 总结为一条摘要消息，
+       重写为 [系统提示, 摘要, 最近的消息]。
+    最近 keep 条消息 (当前这一轮) 始终原样保留。未超出预算时返回空列表。
+    """
+    if estimate_tokens(messages) <= budget:
+        return []
+
+    cut = _split_point(messages, keep)
+    if cut == 0:
+        return []
+
+    replaced = {}
+    for m in messages[:cut]:
+        if isinstance(m, ToolMessage) and len(_text(m)) > tool_max_chars:
+            replaced[m.id] = ToolMessage(
+                id=m.id,
+                content=_truncate(_text(m), tool_max_chars),
+                name=m.name,
+                tool_call_id=m.tool_call_id,
+            )
+    compacted = [replaced.get(m.id, m) for m in messages]
+    if estimate_tokens(compacted) <= budget:
+        return list(replaced.values())
+
+    # 只有系统提示 (无 name) 原样保留；此前的摘要滚动并入新摘要，旧轮次的检索上下文直接丢弃
+    head, old = [], []
+    for m in compacted[:cut]:
+        (head if isinstance(m, SystemMessage) and m.name is None else old).append(m)
+    if not old:
+        # 保留部分之前只有系统提示，没有可总结的轮次
+        return list(replaced.values())
+    try:
+        summary = await summarize([
+            SystemMessage(content=SUMMARY_PROMPT),
+            HumanMessage(content=_transcript(old, tool_max_chars)),
+        ])
+    except Exception as e:
+        # 摘要失败时不影响本轮回答，仅保留工具输出截断的结果
+        logger.warning(f"会话摘要失败: {e}")
+        return list(replaced.values())
+
+    logger.info(f"会话上下文压缩: {len(old)} 条历史消息 -> 摘要 (预算 {budget} tokens)")
+    return [
+        RemoveMessage(id=REMOVE_ALL_MESSAGES),
+        *head,
+        SystemMessage(content=_text(summary), name=SUMMARY_NAME),
+        *compacted[cut:],
+    ]
+
+class ConversationMemory:
+    """
+    多轮会话的检查点存储。
+    配置了 AGENT_CHECKPOINT_DB 时使用 SQLite (服务重启后会话仍可继续)，
+    否则使用进程内存。在预热或第一次会话请求时打开，由应用 lifespan 关闭。
+    """
+    def __init__(self, path: str = ""):
+        self.path = path
+        self.saver = InMemorySaver()
+        self._conn = None
+        self._opened = False
+        self._lock = None
+
+    async def open(self):
+        """
+        打开检查点存储；可重复调用，只有第一次生效 (预热任务与首个会话请求可能同时调用)。
+        """
+        if self._opened or not self.path:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._opened:
+                return
+            import aiosqlite
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = await aiosqlite.connect(self.path)
+            self.saver = AsyncSqliteSaver(self._conn)
+            await self.saver.setup()
+            self._opened = True
+
+    async def close(self):
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+            self.saver = InMemorySaver()
+        self._opened = False
+
+    async def delete(self, session_id: str):
+        await self.open()
+        await self.saver.adelete_thread(session_id)
+
+conversation_memory = ConversationMemory(settings.AGENT_CHECKPOINT_DB)
@@ -0,0 +1,85 @@
+import json
+import logging
+import re
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.graph_version import graph_version
+from app.db.neo4j_client import async_neo4j_client
+from app.core.embeddings import HIDDEN_PROPERTIES
+
+logger = logging.getLogger(__name__)
+
+# 字符串字面量、反引号标识符与注释 (行注释连同其换行) 原样保留，其余的连续空白折叠为一个空格
+_QUERY_TOKEN_RE = re.compile(
+    r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`(?:[^`]|``)*`|//[^\n]*\n?|/\*.*?\*/)|\s+""",
+    re.DOTALL,
+)
+
+# 查询没有返回任何行时 run_guarded_query 的结果
+EMPTY_RESULT = "[]"
+
+# 按 (归一化查询文本, 参数, 图谱版本) 缓存，同一会话中重复的子查询不再访问数据库
+_query_cache = TTLCache(maxsize=settings.AGENT_QUERY_CACHE_SIZE, ttl=settings.AGENT_QUERY_CACHE_TTL)
+
+def normalize_query(query: str) -> str:
+    # 只折叠字面量之外的空白、去掉结尾分号；不改大小写，以免改变字符串字面量
+    return _QUERY_TOKEN_RE.sub(lambda m: m.group(1) or " ", query).strip().rstrip(";").strip()
+
+def _strip_hidden(value):
+    # Agent 可能直接 RETURN 整个节点，去掉其中的向量属性
+    if isinstance(value, dict):
+        return {k: _strip_hidden(v) for k, v in value.items() if k not in HIDDEN_PROPERTIES}
+    if isinstance(value, list):
+        return [_strip_hidden(v) for v in value]
+    return value
+
+def _format_rows(rows: list, truncated: bool, max_bytes: int) -> str:
+    """
+    把结果序列化为 JSON 文本，超过字节上限时只保留能放下的前若干行，并附上截断说明。
+    """
+    lines, size = [], 2
+    for row in rows:
+        line = json.dumps(_strip_hidden(row), ensure_ascii=False, default=str)
+        if size + len(line.encode("utf-8")) + 1 > max_bytes:
+            truncated = True
+            break
+        lines.append(line)
+        size += len(line.encode("utf-8")) + 1
+
+    text = "[" + ",".join(lines) + "]"
+    if truncated:
+        text += (
+            f"\n(结果已截断: 仅显示前 {len(lines)} 行。"
+            f"请使用 LIMIT、聚合 (count/collect) 或只返回需要的属性来缩小结果。)"
+        )
+    return text
+
+async def run_guarded_query(query: str, parameters: dict = None, name: str = "agent_cypher") -> str:
+    """
+    Agent 生成的 Cypher (以及意图路由的模板查询) 的受控执行层:
+    - 只读事务 (由服务器拒绝写操作，取代关键字检查)
+    - 服务器端超时 AGENT_QUERY_TIMEOUT
+    - 行数 / 字节上限，超出时返回截断摘要而不是整个结果
+    - 按图谱版本的 LRU 结果缓存 (键包含绑定参数)
+    name 为指标中的查询名: 模型自由生成的 Cypher 统一记为 agent_cypher。
+    """
+    normalized = normalize_query(query)
+    version = await graph_version.current(async_neo4j_client)
+    key = (normalized, json.dumps(parameters or {}, sort_keys=True, default=str), version)
+
+    cached = _query_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # 归一化文本只用于缓存键: 执行时保留原文，折叠空白会让 // 注释吞掉后面的子句，
+    # 也会改变字符串字面量中的换行与连续空格
+    rows, truncated = await async_neo4j_client.execute_read(
+        query.strip().rstrip(";"),
+        parameters,
+        timeout=settings.AGENT_QUERY_TIMEOUT,
+        max_rows=settings.AGENT_QUERY_MAX_ROWS,
+        name=name,
+    )
+    text = _format_rows(rows, truncated, settings.AGENT_QUERY_MAX_BYTES)
+    _query_cache.set(key, text)
+    return text
@@ -0,0 +1,135 @@
+import logging
+from typing import List, Optional, Tuple
+from app.core.config import settings
+from app.core.embeddings import VECTOR_INDEX_NAME, get_embeddings
+from app.db.graph_version import graph_version
+
+logger = logging.getLogger(__name__)
+
+INDEX_STATE_QUERY = "SHOW INDEXES YIELD name, state WHERE name = $name RETURN state"
+
+# 向量检索 top-k 节点，并在同一个查询中展开其邻域关系 (每个节点最多 $neighbor_limit 条)
+RETRIEVAL_QUERY = """
+CALL db.index.vector.queryNodes($index, $k, $vector) YIELD node, score
+WHERE score >= $min_score
+RETURN node.id AS id,
+       [l IN labels(node) WHERE l <> 'AuditEntity'][0] AS type,
+       coalesce(node.title, node.label, node.id) AS title,
+       node.description AS description,
+       node.severity AS severity,
+       node.status AS status,
+       score,
+       COLLECT {{
+           MATCH p = (node)-[*1..{hops}]-(:AuditEntity)
+           UNWIND relationships(p) AS r
+           WITH DISTINCT r
+           LIMIT $neighbor_limit
+           WITH startNode(r) AS a, r, endNode(r) AS b
+           RETURN {{source: a.id, source_title: coalesce(a.title, a.label, a.id), type: type(r),
+                    target: b.id, target_title: coalesce(b.title, b.label, b.id)}}
+       }} AS facts
+ORDER BY score DESC
+"""
+
+CONTEXT_HEADER = """以下是根据用户问题从审计知识图谱中检索到的相关节点及其邻域 (按相似度降序)。
+如果这些信息足以回答，请直接回答，不必再调用 query_graph；信息不足时再用工具补充查询。"""
+
+class GraphRetriever:
+    """
+    GraphRAG 检索层: 问题 embedding -> Neo4j 向量索引 top-k -> 1~2 跳邻域展开，
+    格式化为一段上下文在调用模型前注入，使多数问题一次模型调用即可回答。
+    向量索引由 ETL 维护 (见 app/scripts/etl_pipeline.py 的 refresh_embeddings)；
+    索引不存在或 embedding 服务不可用时返回 None，Agent 退化为纯 text-to-Cypher。
+    """
+    def __init__(self, top_k: int, hops: int, min_score: float, neighbor_limit: int, max_chars: int):
+        self.top_k = top_k
+        # 可变长度路径的跳数无法参数化，限制在 1~2 之间后拼入查询
+        self.hops = min(max(int(hops), 1), 2)
+        self.min_score = min_score
+        self.neighbor_limit = neighbor_limit
+        self.max_chars = max_chars
+        self.query = RETRIEVAL_QUERY.format(hops=self.hops)
+        self._ready = False
+        self._ready_version = None
+
+    async def _index_ready(self, db) -> bool:
+        # 每个图谱版本只检查一次索引状态
+        version = await graph_version.current(db)
+        if version != self._ready_version:
+            rows = await db.execute_query(INDEX_STATE_QUERY, {"name": VECTOR_INDEX_NAME}, name="rag_index_state")
+            self._ready = bool(rows) and rows[0]["state"] == "ONLINE"
+            self._ready_version = version
+        return self._ready
+
+    async def retrieve(self, question: str, db) -> List[dict]:
+        if not await self._index_ready(db):
+            return []
+        vector = await get_embeddings().aembed_query(question)
+        rows, _ = await db.execute_read(
+            self.query,
+            {
+                "index": VECTOR_INDEX_NAME,
+                "k": self.top_k,
+                "vector": vector,
+                "min_score": self.min_score,
+                "neighbor_limit": self.neighbor_limit,
+            },
+            timeout=settings.AGENT_QUERY_TIMEOUT,
+            name="rag_retrieve",
+        )
+        return rows
+
+    def format_context(self, rows: List[dict]) -> str:
+        lines = [CONTEXT_HEADER, "", "## 相关节点"]
+        for row in rows:
+            attrs = [f"{k}={row[k]}" for k in ("severity", "status") if row.get(k)]
+            attrs.append(f"相似度 {row['score']:.2f}")
+            line = f"- [{row['type']}] {row['id']} {row['title']} ({', '.join(attrs)})"
+            if row.get("description"):
+                line += f": {row['description']}"
+            lines.append(line)
+
+        seen = set()
+        facts = []
+        for row in rows:
+            for fact in row.get("facts") or []:
+                key = (fact["source"], fact["type"], fact["target"])
+                if key not in seen:
+                    seen.add(key)
+                    facts.append(
+                        f"- {fact['source']} ({fact['source_title']}) -[{fact['type']}]-> "
+                        f"{fact['target']} ({fact['target_title']})"
+                    )
+        if facts:
+            lines += ["", "## 关系", *facts]
+
+        # 超出字符上限时按行截断 (节点在前，关系在后)
+        kept, size = [], 0
+        for line in lines:
+            if size + len(line) + 1 > self.max_chars:
+                break
+            kept.append(line)
+            size += len(line) + 1
+        return "\n".join(kept)
+
+    async def context(self, question: str, db) -> Tuple[Optional[str], int]:
+        """
+        返回 (注入模型的上下文文本, 命中节点数)；没有可用结果时文本为 None。
+        """
+        try:
+            rows = await self.retrieve(question, db)
+        except Exception as e:
+            logger.warning(f"GraphRAG 检索失败，退化为工具查询: {e}")
+            return None, 0
+        if not rows:
+            return None, 0
+        return self.format_context(rows), len(rows)
+
+# 全局实例
+graph_retriever = GraphRetriever(
+    top_k=settings.RAG_TOP_K,
+    hops=settings.RAG_HOPS,
+    min_score=settings.RAG_MIN_SCORE,
+    neighbor_limit=settings.RAG_NEIGHBOR_LIMIT,
+    max_chars=settings.RAG_CONTEXT_MAX_CHARS,
+)
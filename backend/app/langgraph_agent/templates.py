@@ -0,0 +1,299 @@
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional, Pattern, Tuple
+from app.core.config import settings
+
+# 参数化 Cypher 模板库与意图路由。
+# 常见问题 (按严重程度/状态列出风险、风险的缓解控制、控制的证据、REQUIRES 依赖链等)
+# 直接执行模板查询，跳过 LLM 的工具规划；查询文本固定、只绑定参数，
+# Neo4j 的执行计划缓存对每个模板只编译一次。
+
+# 实体 ID: R-001, A.9.1.1, ISO-A.5, DOC-001, LOG-005, ISO27001
+_ENTITY_ID_RE = re.compile(r"(?<![A-Za-z0-9.\-])([A-Z][A-Z0-9]*(?:[-.][A-Z0-9]+)+|[A-Z]{2,}\d+)(?![A-Za-z0-9\-])")
+_RISK_ID_RE = re.compile(r"(?<![A-Za-z0-9])[Rr]-(\d+)(?![A-Za-z0-9])")
+
+def _en(word: str) -> str:
+    # 中文字符也属于 \w，中英混排 ("所有open的") 时 \b 不成立，改用 ASCII 字母边界
+    return rf"(?<![a-z])(?:{word})(?![a-z])"
+
+_SEVERITY_PATTERNS = [
+    (re.compile(_en("critical") + r"|严重(?:等级|级)?(?:的)?风险"), "Critical"),
+    (re.compile(_en("high") + r"|高(?:危|等级|级)?(?:的)?风险"), "High"),
+    (re.compile(_en("medium") + r"|中(?:危|等级|级)(?:的)?风险|中风险"), "Medium"),
+    (re.compile(_en("low") + r"|低(?:危|等级|级)?(?:的)?风险"), "Low"),
+]
+_STATUS_PATTERNS = [
+    (re.compile(_en("open") + r"|未解决|未关闭|待处理|开放"), "Open"),
+    (re.compile(_en("mitigated") + r"|已缓解"), "Mitigated"),
+    (re.compile(_en("closed") + r"|已关闭"), "Closed"),
+]
+
+# 针对单个实体的 "详情" 类问题 (RISK_OVERVIEW / ENTITY_OVERVIEW 需要明确命中这些词，
+# 不能只因为问题里出现了一个像 ID 的词就走模板)
+_DETAIL_WORDS = r"详情|详细|信息|情况|介绍|概况|是什么|是啥|关联|相关|关系|"
+_DETAIL_EN = _en(r"details?|about|what\s+is|describe|overview|related|info(?:rmation)?")
+
+# 需要推理/建议的开放式问题不走模板，交给完整的 Agent
+_OPEN_ENDED_RE = re.compile(r"为什么|如何|怎么|怎样|建议|比较|对比|分析|评估|" + _en(r"why|how(?!\s+many)|should"))
+
+@dataclass(frozen=True)
+class CypherTemplate:
+    name: str
+    description: str
+    query: str
+    # 问题需命中的意图关键词
+    intent: Pattern
+    # 必需的槽位: risk_id / entity_id / filters (severity 或 status)
+    requires: Tuple[str, ...] = ()
+    # 存在这些槽位时不匹配 (例如问题里带了具体 ID 时不做列表查询)
+    excludes: Tuple[str, ...] = ()
+    # 可选的过滤条件 (槽位, 属性表达式)，只把问题中给出的槽位拼进 query 的 {where}，
+    # 不写成 ($x IS NULL OR ...)，以便规划器使用属性索引；每种组合的查询文本仍然固定
+    filters: Tuple[Tuple[str, str], ...] = ()
+
+    def render(self, slots: dict) -> str:
+        if not self.filters:
+            return self.query
+        conditions = [f"{expression} = ${slot}" for slot, expression in self.filters if slots.get(slot) is not None]
+        return self.query.format(where=f"WHERE {' AND '.join(conditions)}" if conditions else "")
+
+RISKS_BY_FILTER = CypherTemplate(
+    name="risks_by_filter",
+    description="按严重程度/状态列出风险",
+    intent=re.compile(
+        r"(列出|列举|哪些|所有|全部|查看|显示|查询|有什么).*风险|风险.*(哪些|有什么|列表|清单)|"
+        + _en(r"list|show|which|all") + r".*" + _en("risks?")
+    ),
+    excludes=("risk_id", "entity_id"),
+    filters=(("severity", "r.severity"), ("status", "r.status")),
+    query="""
+    MATCH (r:Risk)
+    {where}
+    RETURN r.id AS id, r.title AS title, r.severity AS severity, r.status AS status, r.owner AS owner
+    ORDER BY r.id
+    LIMIT $limit
+    """,
+)
+
+RISK_COUNTS = CypherTemplate(
+    name="risk_counts",
+    description="按严重程度与状态统计风险数量",
+    intent=re.compile(r"(多少|几个|数量|统计|分布|count|how many).*(风险|risk)|风险.*(多少|几个|数量|统计|分布)"),
+    excludes=("risk_id", "entity_id"),
+    query="""
+    MATCH (r:Risk)
+    RETURN r.severity AS severity, r.status AS status, count(*) AS count
+    ORDER BY severity, status
+    """,
+)
+
+UNMITIGATED_RISKS = CypherTemplate(
+    name="unmitigated_risks",
+    description="没有任何控制缓解的风险",
+    intent=re.compile(r"(没有|无|未被|缺少|缺乏).{0,6}(控制|缓解)|unmitigated|without (a )?controls?"),
+    excludes=("risk_id", "entity_id"),
+    query="""
+    MATCH (r:Risk)
+    WHERE NOT EXISTS { MATCH (:Control)-[:MITIGATES]->(r) }
+      AND ($severity IS NULL OR r.severity = $severity)
+      AND ($status IS NULL OR r.status = $status)
+    RETURN r.id AS id, r.title AS title, r.severity AS severity, r.status AS status, r.owner AS owner
+    ORDER BY r.id
+    LIMIT $limit
+    """,
+)
+
+RISK_OVERVIEW = CypherTemplate(
+    name="risk_overview",
+    description="单个风险的详情及缓解它的控制",
+    intent=re.compile(_DETAIL_WORDS + r"缓解|控制|" + _DETAIL_EN + "|" + _en(r"mitigat\w*|controls?")),
+    requires=("risk_id",),
+    query="""
+    MATCH (r:Risk {id: $risk_id})
+    OPTIONAL MATCH (c:Control)-[:MITIGATES]->(r)
+    RETURN r {.id, .title, .severity, .status, .category, .owner, .description, .dateIdentified} AS risk,
+           collect(c {.id, .title, .code}) AS mitigating_controls
+    """,
+)
+
+CONTROL_EVIDENCE = CypherTemplate(
+    name="control_evidence",
+    description="控制的证据文档",
+    intent=re.compile(r"证据|证明|文档|" + _en(r"evidence|documents?")),
+    requires=("entity_id",),
+    query="""
+    MATCH (c:AuditEntity {id: $entity_id})
+    OPTIONAL MATCH (c)-[:EVIDENCED_BY]->(d)
+    RETURN c.id AS id, coalesce(c.title, c.label) AS title,
+           collect(d {.id, .title, .name, .type, .status}) AS evidence
+    """,
+)
+
+CONTROL_REQUIRES = CypherTemplate(
+    name="control_requires",
+    description="控制的 REQUIRES 依赖链 (最多 3 跳)",
+    intent=re.compile(r"依赖|前置|前提|需要|" + _en(r"requires?|depends?|dependencies")),
+    requires=("entity_id",),
+    query="""
+    MATCH (c:AuditEntity {id: $entity_id})
+    OPTIONAL MATCH p = (c)-[:REQUIRES*1..3]->(req)
+    RETURN c.id AS id, coalesce(c.title, c.label) AS title,
+           collect(DISTINCT req {.id, .title, .code, depth: length(p)}) AS requires
+    """,
+)
+
+CONTROL_RISKS = CypherTemplate(
+    name="control_risks",
+    description="控制缓解的风险",
+    intent=re.compile(r"风险|缓解|" + _en(r"risks?|mitigates?")),
+    requires=("entity_id",),
+    query="""
+    MATCH (c:AuditEntity {id: $entity_id})
+    OPTIONAL MATCH (c)-[:MITIGATES]->(r:Risk)
+    RETURN c.id AS id, coalesce(c.title, c.label) AS title,
+           collect(r {.id, .title, .severity, .status}) AS risks
+    """,
+)
+
+STANDARD_CONTROLS = CypherTemplate(
+    name="standard_controls",
+    description="标准/控制域包含的控制",
+    intent=re.compile(r"包含|下属|控制项|哪些控制|" + _en(r"contains?|controls")),
+    requires=("entity_id",),
+    query="""
+    MATCH (s:AuditEntity {id: $entity_id})
+    OPTIONAL MATCH (s)-[:CONTAINS*1..2]->(c:Control)
+    RETURN s.id AS id, coalesce(s.title, s.label) AS title,
+           collect(DISTINCT c {.id, .title, .code}) AS controls
+    """,
+)
+
+ENTITY_OVERVIEW = CypherTemplate(
+    name="entity_overview",
+    description="任意实体的详情及直接关联",
+    intent=re.compile(_DETAIL_WORDS.rstrip("|") + "|" + _DETAIL_EN),
+    requires=("entity_id",),
+    query="""
+    MATCH (n:AuditEntity {id: $entity_id})
+    RETURN n.id AS id, [l IN labels(n) WHERE l <> 'AuditEntity'][0] AS type,
+           coalesce(n.title, n.label) AS title, n.description AS description,
+           COLLECT {
+               MATCH (n)-[r]-(m:AuditEntity)
+               RETURN {direction: CASE WHEN startNode(r) = n THEN 'out' ELSE 'in' END,
+                       type: type(r), id: m.id, title: coalesce(m.title, m.label)}
+               LIMIT $limit
+           } AS related
+    """,
+)
+
+# 匹配顺序: 越具体的模板越靠前
+TEMPLATES = [
+    RISK_OVERVIEW,
+    CONTROL_EVIDENCE,
+    CONTROL_REQUIRES,
+    CONTROL_RISKS,
+    STANDARD_CONTROLS,
+    ENTITY_OVERVIEW,
+    UNMITIGATED_RISKS,
+    RISK_COUNTS,
+    RISKS_BY_FILTER,
+]
+
+def mentioned_ids(question: str) -> set:
+    """问题中出现的全部实体 ID (风险 ID 统一为 R-xxx)。"""
+    text = unicodedata.normalize("NFKC", question)
+    ids = {f"R-{m.group(1)}" for m in _RISK_ID_RE.finditer(text)}
+    for m in _ENTITY_ID_RE.finditer(text):
+        risk = _RISK_ID_RE.fullmatch(m.group(1))
+        ids.add(f"R-{risk.group(1)}" if risk else m.group(1))
+    return ids
+
+def extract_slots(question: str) -> dict:
+    """
+    从问题中抽取模板参数: risk_id、entity_id (非风险的实体 ID)、severity、status。
+    """
+    text = unicodedata.normalize("NFKC", question)
+    lowered = text.lower()
+    slots = {"risk_id": None, "entity_id": None, "severity": None, "status": None}
+
+    risk = _RISK_ID_RE.search(text)
+    if risk:
+        slots["risk_id"] = f"R-{risk.group(1)}"
+    else:
+        entity = _ENTITY_ID_RE.search(text)
+        if entity:
+            slots["entity_id"] = entity.group(1)
+
+    for pattern, value in _SEVERITY_PATTERNS:
+        if pattern.search(lowered):
+            slots["severity"] = value
+            break
+    for pattern, value in _STATUS_PATTERNS:
+        if pattern.search(lowered):
+            slots["status"] = value
+            break
+    return slots
+
+@dataclass
+class Route:
+    template: CypherTemplate
+    parameters: dict = field(default_factory=dict)
+    # 按参数渲染后的查询文本 (见 CypherTemplate.render)
+    query: str = ""
+
+class IntentRouter:
+    """
+    基于规则的意图路由 (不调用 LLM)。
+    识别出的问题走模板快速路径，其余交给完整的 LangGraph 循环；
+    统计进入路由的请求中走快速路径的比例。
+    """
+    def __init__(self, templates: list, limit: int):
+        self.templates = templates
+        self.limit = limit
+        self.requests = 0
+        self.fallbacks = 0
+        self.by_template = Counter()
+
+    def match(self, question: str) -> Optional[Route]:
+        text = unicodedata.normalize("NFKC", question).lower()
+        if _OPEN_ENDED_RE.search(text):
+            return None
+        # 涉及多个实体的问题 (比较、关系) 模板只能回答其中一个，交给完整的 Agent
+        if len(mentioned_ids(question)) > 1:
+            return None
+        slots = extract_slots(question)
+        filters = slots["severity"] or slots["status"]
+        for template in self.templates:
+            if any(slots.get(name) for name in template.excludes):
+                continue
+            if any(not (filters if name == "filters" else slots.get(name)) for name in template.requires):
+                continue
+            if template.intent.search(text):
+                return Route(template, {**slots, "limit": self.limit}, template.render(slots))
+        return None
+
+    def route(self, question: str) -> Optional[Route]:
+        self.requests += 1
+        route = self.match(question)
+        if route is not None:
+            self.by_template[route.template.name] += 1
+        return route
+
+    def record_fallback(self):
+        # 模板执行失败或没有返回结果、退回完整 Agent 的次数
+        self.fallbacks += 1
+
+    def stats(self) -> dict:
+        fast_path = sum(self.by_template.values()) - self.fallbacks
+        return {
+            "requests": self.requests,
+            "fast_path": fast_path,
+            "fallbacks": self.fallbacks,
+            "fast_path_share": fast_path / self.requests if self.requests else 0.0,
+            "templates": dict(self.by_template),
+        }
+
+# 全局实例
+intent_router = IntentRouter(TEMPLATES, limit=settings.AGENT_QUERY_MAX_ROWS)
@@ -1,8 +1,118 @@
+import asyncio
+import importlib
+import logging
+import sys
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.api.endpoints import dashboard, risks, documents, graph, chat, auth, regulations, reports
+from app.db.graph_engine import graph_engine
+from app.db.graph_snapshot import snapshot_store
+from app.db.neo4j_client import async_neo4j_client
+from app.core.config import settings
+from app.core import metrics
+from app.core.compression import CompressionMiddleware
+from app.core.users import user_store
 
-app = FastAPI(title="AuditGraph API")
+logger = logging.getLogger(__name__)
+
+async def _warm_up_agent():
+    # 在线程中导入 langchain / langgraph (耗时数秒)，期间事件循环照常处理请求
+    try:
+        graph = await asyncio.to_thread(importlib.import_module, "app.langgraph_agent.graph")
+        await graph.warm_up()
+    except Exception as e:
+        logger.warning(f"Agent 预热失败，将在第一次对话时重试: {e}")
+
+async def _load_graph_engine():
+    try:
+        await graph_engine.get(async_neo4j_client)
+    except Exception as e:
+        logger.warning(f"图引擎启动加载失败，将在下次请求时重试: {e}")
+
+async def _prepare_graph_snapshot():
+    try:
+        await snapshot_store.prepare(async_neo4j_client)
+    except Exception as e:
+        logger.warning(f"图谱快照启动准备失败，将在下次请求时重试: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动时创建共享的 Neo4j 异步连接池，关闭时释放。
+    # Agent 不在导入时构建，而是在后台预热 (AGENT_WARMUP=false 时推迟到第一次对话)
+    # 用户存储不可用 (例如缺少用户文件) 时直接启动失败，而不是让每次登录都失败
+    await user_store.prepare()
+    await async_neo4j_client.connect()
+    warm_up = asyncio.create_task(_warm_up_agent()) if settings.AGENT_WARMUP else None
+    # 图引擎首次加载同样在后台进行，加载完成前各接口照常查询 Neo4j
+    if settings.GRAPH_ENGINE_ENABLED:
+        asyncio.create_task(_load_graph_engine())
+    # 预计算布局快照同理: 启动即加载或生成，第一个 /api/graph/snapshot 请求不必等待
+    if settings.GRAPH_SNAPSHOT_PREPARE:
+        asyncio.create_task(_prepare_graph_snapshot())
+    yield
+    if warm_up is not None and not warm_up.done():
+        warm_up.cancel()
+    # 只有加载过 Agent 时才需要关闭会话检查点存储
+    memory = sys.modules.get("app.langgraph_agent.memory")
+    if memory is not None:
+        await memory.conversation_memory.close()
+    await async_neo4j_client.close()
+
+def _route_template(scope) -> str:
+    """
+    请求对应的路由模板 (/api/chat/sessions/{session_id})，用作指标标签。
+    取匹配到的路由的 path，而不是把路径参数的取值替换回参数名 (取值与固定路径段相同时会替换错)；
+    未匹配任何路由的请求统一归类，避免标签基数失控。
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    # 较新的 FastAPI 中 include_router 的路由 path 不含前缀: 前缀即实际路径中路由本身匹配部分之前的那段
+    regex = getattr(route, "path_regex", None)
+    path = scope["path"]
+    if regex is not None and not regex.match(path):
+        for i, char in enumerate(path):
+            if char == "/" and regex.match(path[i:]):
+                return path[:i] + template
+    return template
+
+class MetricsMiddleware:
+    """
+    纯 ASGI 中间件: 按路由模板 (如 /api/graph/explore/{seed}) 记录请求耗时直方图。
+    流式响应的耗时包含整个响应体的发送时间。
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=_route_template(scope),
+                status=status,
+            )
+
+app = FastAPI(title="AuditGraph API", lifespan=lifespan)
 
 # Configure CORS
 origins = [
@@ -11,13 +121,21 @@ origins = [
     "*"
 ]
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.RESPONSE_COMPRESSION_MIN_SIZE,
+    gzip_level=settings.RESPONSE_GZIP_LEVEL,
+    brotli_quality=settings.RESPONSE_BROTLI_QUALITY,
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Include Routers
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
@@ -26,7 +144,14 @@ app.include_router(documents.router, prefix="/api/documents", tags=["Documents"]
 app.include_router(graph.router, prefix="/api/graph", tags=["Graph"])
 app.include_router(chat.router, prefix="/api/chat", tags=["Chat"])
 app.include_router(auth.router, prefix="/api/auth", tags=["Auth"])
+app.include_router(regulations.router, prefix="/api/regulations", tags=["Regulations"])
+app.include_router(reports.router, prefix="/api/reports", tags=["Reports"])
 
 @app.get("/")
 async def root():
     return {"message": "AuditGraph Backend is Running"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    # Prometheus 文本格式
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
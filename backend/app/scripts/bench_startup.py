@@ -0,0 +1,107 @@
+"""
+Cold-start benchmark for the API process.
+
+Each run starts a fresh `uvicorn app.main:app` subprocess and polls a cheap
+endpoint until it answers. It records:
+  - import_s:        time to import app.main in a fresh interpreter
+  - first_request_s: process spawn -> first successful response
+
+    python -m app.scripts.bench_startup --runs 5 --output data/bench/startup.json
+
+Neo4j does not need to be reachable: the driver pool is created lazily and
+GET / touches neither the database nor the agent.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_import() -> float:
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=BACKEND_DIR, env=_env())
+    return float(output.decode().strip().splitlines()[-1])
+
+def measure_first_request(path: str, timeout: float) -> float:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=_env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited early: {process.stderr.read().decode(errors='replace')}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.01)
+        raise TimeoutError(f"No response from {url} within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+def _env() -> dict:
+    env = dict(os.environ)
+    # The settings module only needs a placeholder key to import
+    env.setdefault("ARK_API_KEY", "benchmark")
+    return env
+
+def _summary(samples: list) -> dict:
+    return {
+        "runs": len(samples),
+        "median": round(statistics.median(samples), 4),
+        "min": round(min(samples), 4),
+        "max": round(max(samples), 4),
+        "samples": [round(s, 4) for s in samples],
+    }
+
+def run_benchmark(runs: int, path: str, timeout: float) -> dict:
+    imports = [measure_import() for _ in range(runs)]
+    first_requests = [measure_first_request(path, timeout) for _ in range(runs)]
+    return {
+        "benchmark": "startup",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "path": path,
+        "import_s": _summary(imports),
+        "first_request_s": _summary(first_requests),
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure API cold-start time to first served request.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold starts to measure (default: 5).")
+    parser.add_argument("--path", default="/", help="Endpoint polled until the server answers (default: /).")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Give up on a run after this many seconds.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_benchmark(args.runs, args.path, args.timeout)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
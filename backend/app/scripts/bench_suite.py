@@ -0,0 +1,518 @@
+"""
+Reproducible benchmark suite on a synthetic audit graph.
+
+One run:
+  1. generates (or reuses) a synthetic dataset with generate_synthetic_data
+  2. times run_etl end to end on it (bulk mode)
+  3. load-tests the main endpoints in-process through the ASGI app:
+     dashboard stats, graph overview, risk listing, regulation tree and chat
+     (chat talks to a local fake_llm_server, never to the real provider)
+  4. writes a JSON report, and optionally compares it with a previous one
+
+    python -m app.scripts.bench_suite --nodes 100000 --output data/bench/suite.json
+    python -m app.scripts.bench_suite --nodes 100000 --baseline data/bench/suite.json
+
+Backends:
+  --backend standin (default) needs no database. Endpoint queries are answered
+      by name from the generated CSVs, and the ETL writes are counted instead
+      of sent, so the numbers cover the API / loader code paths (parsing,
+      batching, caching, serialization) and are meant for comparing versions
+      of this code, not for sizing Neo4j. Keep it to about 1M nodes, since the
+      stand-in holds the dataset in memory.
+  --backend neo4j runs against NEO4J_URI from the settings.
+      WARNING: the ETL step wipes that database first.
+
+With --baseline, p95 latency, throughput, CPU per request and ETL time are
+compared against the earlier report, and the process exits with status 1 when
+any of them regressed by more than --tolerance. The process also exits with
+status 1 when a benchmarked endpoint sent a query the stand-in cannot answer.
+
+Settings come from the environment, so the same two runs measure a switch,
+e.g. the validated vs. trusted response path, or response compression:
+
+    TRUSTED_RESPONSES=false python -m app.scripts.bench_suite --skip-etl --output data/bench/validated.json
+    python -m app.scripts.bench_suite --skip-etl --baseline data/bench/validated.json
+    python -m app.scripts.bench_suite --skip-etl --accept-encoding br --baseline data/bench/validated.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import Counter
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
+sys.path.append(BACKEND_DIR)
+
+from app.scripts.generate_synthetic_data import DEFAULT_OUTPUT_DIR, generate
+
+# ORDER BY and projection of the keyset query built by app.api.pagination.build_page_query
+_ORDER_BY_RE = re.compile(r"ORDER BY r\.(\w+) (ASC|DESC)")
+_PROJECTION_RE = re.compile(r"RETURN r \{([^}]*)\}")
+
+# name -> (method, path, JSON body for the i-th request or None)
+ENDPOINTS = {
+    "dashboard_stats": ("GET", "/api/dashboard/stats", None),
+    "graph_overview": ("GET", "/api/graph/?limit=500", None),
+    "risks_page": ("GET", "/api/risks/?limit=50&severity=High", None),
+    # Large payloads, where serialization and compression dominate the query
+    "risks_large": ("GET", "/api/risks/?limit=1000", None),
+    "graph_large": ("GET", "/api/graph/?limit=2000", None),
+    "regulations": ("GET", "/api/regulations/", None),
+    # Alternates a template question (fast path) and an open question (full agent);
+    # every question is distinct so the answer cache and coalescing do not kick in
+    "chat": ("POST", "/api/chat/", lambda i: {
+        "message": f"风险 R-{i:08d} 由哪些控制缓解？" if i % 2 == 0 else f"请评估第 {i} 个审计项目的整体合规态势"
+    }),
+}
+
+class StandInGraph:
+    """
+    In-process replacement for AsyncNeo4jClient that answers the benchmarked
+    API queries by their stable query name (see the name= arguments in
+    app/api/endpoints and the template_* names of the chat fast path) from the
+    generated CSVs. Unknown queries return no rows and are counted in the
+    report; the run fails when any benchmarked endpoint hit one.
+    """
+    def __init__(self, data_dir: str):
+        import pandas as pd
+
+        self.risks = pd.read_csv(os.path.join(data_dir, 'risks.csv')).sort_values('id', ignore_index=True)
+        # Missing values as None, like absent properties in Neo4j
+        self.risks = self.risks.astype(object).where(self.risks.notna(), None)
+        # (sort, descending) -> (rows in that order, id -> position)
+        self._orders = {}
+        entities = pd.read_csv(os.path.join(data_dir, 'controls.csv'))
+        relationships = pd.read_csv(os.path.join(data_dir, 'relationships.csv'))
+        self.unhandled = Counter()
+
+        buckets = self.risks.groupby(['severity', 'status']).size()
+        self.dashboard = [{
+            "total_nodes": len(self.risks) + len(entities),
+            "total_documents": int((entities['type'] == 'Document').sum()),
+            "buckets": [{"severity": s, "status": st, "count": int(c)} for (s, st), c in buckets.items()],
+        }]
+
+        # Graph overview: the first nodes in storage order, their degree and the links among them
+        head = entities.head(2000)
+        head = pd.concat([
+            head[['id', 'title']].assign(group=head['group_id']),
+            self.risks.head(2000 - len(head))[['id', 'title']].assign(group=4),
+        ], ignore_index=True)
+        ends = pd.concat([relationships['source'], relationships['target']])
+        degree = ends[ends.isin(head['id'])].value_counts()
+        self.overview_nodes = [
+            {"id": row.id, "group": int(row.group), "label": row.title, "degree": int(degree.get(row.id, 0))}
+            for row in head.itertuples()
+        ]
+        position = {node["id"]: i for i, node in enumerate(self.overview_nodes)}
+        inner = relationships[relationships['source'].isin(position) & relationships['target'].isin(position)]
+        self.overview_links = [
+            (max(position[row.source], position[row.target]),
+             {"source": row.source, "target": row.target, "type": row.type})
+            for row in inner.itertuples()
+        ]
+
+        # Regulation tree: ControlDomain -CONTAINS-> Control
+        by_id = entities.set_index('id')
+        domains = entities[entities['type'] == 'ControlDomain'].sort_values('code')
+        contains = relationships[(relationships['type'] == 'CONTAINS') & relationships['source'].isin(domains['id'])]
+        contains = contains.join(by_id[['code', 'title', 'description']], on='target').sort_values('code')
+        children = {
+            source: [{"id": r.target, "code": r.code, "title": r.title, "description": r.description, "children": []}
+                     for r in group.itertuples()]
+            for source, group in contains.groupby('source', sort=False)
+        }
+        self.tree = [
+            {"domain": {"id": d.id, "code": d.code, "title": d.title, "description": d.description,
+                        "children": children.get(d.id, [])}}
+            for d in domains.itertuples()
+        ]
+
+        # Chat fast path (risk_overview template): Control -MITIGATES-> Risk
+        mitigates = relationships[relationships['type'] == 'MITIGATES']
+        mitigates = mitigates.join(by_id[['title', 'code']], on='source')
+        self.mitigating = {
+            target: [{"id": r.source, "title": r.title, "code": r.code} for r in group.itertuples()]
+            for target, group in mitigates.groupby('target', sort=False)
+        }
+        self.risk_by_id = self.risks.set_index('id', drop=False)
+
+        # name -> handler(params, query text)
+        self._handlers = {
+            "graph_version": lambda params, query: [{"version": 1}],
+            # No vector index in the stand-in: GraphRAG retrieval is skipped
+            "rag_index_state": lambda params, query: [],
+            "dashboard_stats": lambda params, query: self.dashboard,
+            "graph_overview": lambda params, query: self._overview(params),
+            "risks_list": self._risks_page,
+            "regulation_tree": lambda params, query: self.tree,
+            "regulation_tree_stream": lambda params, query: self.tree,
+            "template_risk_overview": lambda params, query: self._risk_overview(params),
+        }
+
+    def _overview(self, params: dict) -> list:
+        limit = params.get("limit", 500)
+        return [{
+            "nodes": self.overview_nodes[:limit],
+            "links": [link for last, link in self.overview_links if last < limit],
+        }]
+
+    def _order(self, sort: str, descending: bool) -> tuple:
+        key = (sort, descending)
+        if key not in self._orders:
+            if sort == "id":
+                ordered = self.risks.iloc[::-1] if descending else self.risks
+            else:
+                # Neo4j puts nulls last ascending and first descending
+                ordered = self.risks.sort_values([sort, 'id'], ascending=not descending,
+                                                 na_position='first' if descending else 'last', kind='stable')
+            ordered = ordered.reset_index(drop=True)
+            self._orders[key] = (ordered, {node_id: i for i, node_id in enumerate(ordered['id'])})
+        return self._orders[key]
+
+    def _risks_page(self, params: dict, query: str) -> list:
+        # Keyset page with optional IN filters, sort order and projection as built by app.api.pagination
+        order = _ORDER_BY_RE.search(query)
+        sort, descending = (order.group(1), order.group(2) == "DESC") if order else ("id", False)
+        ordered, position = self._order(sort, descending)
+        projection = _PROJECTION_RE.search(query)
+        fields = [f.strip().lstrip('.') for f in projection.group(1).split(',')] if projection else list(ordered)
+
+        # The cursor's id is the last row of the previous page, so the page resumes right after it
+        start = position[params["after_id"]] + 1 if "after_id" in params else 0
+        limit = params["limit"]
+        filters = {k: params[k] for k in ("severity", "status", "category", "owner") if k in params}
+        rows = []
+        window = max(limit * 8, 256)
+        while len(rows) < limit and start < len(ordered):
+            chunk = ordered.iloc[start:start + window]
+            for column, values in filters.items():
+                chunk = chunk[chunk[column].isin(values)]
+            rows.extend(chunk[fields].head(limit - len(rows)).to_dict('records'))
+            start += window
+        return [{"item": row} for row in rows]
+
+    def _risk_overview(self, params: dict) -> list:
+        risk_id = params["risk_id"]
+        if risk_id not in self.risk_by_id.index:
+            return []
+        risk = self.risk_by_id.loc[risk_id]
+        fields = ("id", "title", "severity", "status", "category", "owner", "description", "dateIdentified")
+        return [{"risk": {f: risk[f] for f in fields}, "mitigating_controls": self.mitigating.get(risk_id, [])}]
+
+    def _answer(self, name: str, params: dict, query: str) -> list:
+        handler = self._handlers.get(name)
+        if handler is None:
+            self.unhandled[name or "unnamed"] += 1
+            return []
+        return handler(params or {}, query)
+
+    async def connect(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def execute_query(self, query: str, parameters: dict = None, name: str = None):
+        return self._answer(name, parameters, query)
+
+    async def execute_read(self, query: str, parameters: dict = None, timeout: float = None,
+                           max_rows: int = None, name: str = None):
+        rows = self._answer(name, parameters, query)
+        if max_rows is not None and len(rows) > max_rows:
+            return rows[:max_rows], True
+        return rows, False
+
+    async def stream_query(self, query: str, parameters: dict = None, name: str = None):
+        for row in self._answer(name, parameters, query):
+            yield row
+
+    def install(self, client):
+        """Route the shared AsyncNeo4jClient instance through the stand-in."""
+        for method in ("connect", "close", "execute_query", "execute_read", "stream_query"):
+            setattr(client, method, getattr(self, method))
+
+class RecordingWriter:
+    """
+    Stand-in for the synchronous ETL client: write batches are counted, not
+    sent, so the ETL timing covers CSV parsing and batch building only.
+    """
+    def __init__(self):
+        self.rows_written = 0
+        self.statements = 0
+
+    def execute_query(self, query: str, parameters: dict = None, name: str = None):
+        self.statements += 1
+        return [{"version": 1}] if name == "graph_version_bump" else []
+
+    def execute_write(self, query: str, parameters: dict = None, name: str = None):
+        self.statements += 1
+        self.rows_written += len((parameters or {}).get("rows") or (parameters or {}).get("ids") or ())
+
+    def install(self, client):
+        for method in ("execute_query", "execute_write"):
+            setattr(client, method, getattr(self, method))
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_fake_llm(latency: float, tokens_per_second: float):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.scripts.fake_llm_server", "--port", str(port),
+         "--latency", str(latency), "--tokens-per-second", str(tokens_per_second)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=1):
+                return process, f"http://127.0.0.1:{port}/v1"
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise TimeoutError("fake_llm_server did not start")
+
+def prepare_dataset(nodes: int, seed: int, skew: float, data_dir: str = None) -> tuple:
+    """Return (data_dir, dataset summary); regenerates only when the parameters changed."""
+    if data_dir:
+        return data_dir, {"output_dir": os.path.abspath(data_dir), "generated": False}
+    data_dir = os.path.join(DEFAULT_OUTPUT_DIR, f"n{nodes}-s{seed}-k{skew:g}")
+    summary_path = os.path.join(data_dir, 'dataset.json')
+    if os.path.exists(summary_path):
+        with open(summary_path, encoding='utf-8') as f:
+            return data_dir, {**json.load(f), "generated": False}
+    return data_dir, {**generate(nodes, data_dir, seed, skew), "generated": True}
+
+def run_etl_benchmark(data_dir: str, backend: str, batch_size: int, workers: int) -> dict:
+    from app.scripts import etl_pipeline
+
+    etl_pipeline.DATA_DIR = data_dir
+    writer = None
+    if backend == "standin":
+        writer = RecordingWriter()
+        writer.install(etl_pipeline.neo4j_client)
+
+    started = time.perf_counter()
+    etl_pipeline.run_etl(bulk=True, batch_size=batch_size, workers=workers, embeddings=False)
+    elapsed = time.perf_counter() - started
+
+    report = {"mode": "bulk", "batch_size": batch_size, "workers": workers, "seconds": round(elapsed, 3)}
+    if writer is not None:
+        report["rows_written"] = writer.rows_written
+        report["rows_per_sec"] = round(writer.rows_written / elapsed) if elapsed > 0 else None
+    return report
+
+def _percentile(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+async def load_test(client, method: str, path: str, body, requests: int, concurrency: int, warmup: int) -> dict:
+    async def _send(i: int):
+        return await client.request(method, path, json=body(i) if body else None)
+
+    # The first request pays for cold caches; report it separately
+    started = time.perf_counter()
+    first = await _send(0)
+    cold_ms = (time.perf_counter() - started) * 1000
+    for i in range(1, warmup):
+        await _send(i)
+
+    latencies, statuses = [], Counter([first.status_code])
+    sizes = []
+    counter = iter(range(warmup, warmup + requests))
+
+    async def _worker():
+        for i in counter:
+            t = time.perf_counter()
+            try:
+                response = await _send(i)
+                statuses[response.status_code] += 1
+                sizes.append(response.num_bytes_downloaded)
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    wall_started = time.perf_counter()
+    cpu_started = time.process_time()
+    await asyncio.gather(*(_worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_started
+    cpu = time.process_time() - cpu_started
+
+    return {
+        "path": path,
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": sum(n for status, n in statuses.items() if not (isinstance(status, int) and status < 400)),
+        "status_codes": {str(status): n for status, n in sorted(statuses.items(), key=str)},
+        "throughput_rps": round(len(latencies) / wall, 1) if wall > 0 else None,
+        "cold_ms": round(cold_ms, 2),
+        # Process CPU (all threads) per request; the in-process client is included,
+        # so compare it between runs rather than reading it as server cost alone
+        "cpu_ms_per_request": round(cpu * 1000 / len(latencies), 3) if latencies else None,
+        "response_bytes": round(statistics.fmean(sizes)) if sizes else None,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 2),
+            "p50": round(_percentile(latencies, 0.50), 2),
+            "p95": round(_percentile(latencies, 0.95), 2),
+            "p99": round(_percentile(latencies, 0.99), 2),
+            "max": round(max(latencies), 2),
+        },
+    }
+
+async def run_endpoint_benchmarks(data_dir: str, backend: str, endpoints: list, requests: int,
+                                  chat_requests: int, concurrency: int, warmup: int,
+                                  accept_encoding: str = "identity") -> tuple:
+    import httpx
+    import app.main as api
+    from app.db import neo4j_client
+
+    standin = None
+    if backend == "standin":
+        standin = StandInGraph(data_dir)
+        standin.install(neo4j_client.async_neo4j_client)
+
+    results = {}
+    async with api.app.router.lifespan_context(api.app):
+        transport = httpx.ASGITransport(app=api.app)
+        # httpx asks for gzip by default; make the negotiated encoding explicit
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120,
+                                     headers={"Accept-Encoding": accept_encoding}) as client:
+            for name in endpoints:
+                method, path, body = ENDPOINTS[name]
+                count = chat_requests if name == "chat" else requests
+                results[name] = await load_test(client, method, path, body, count, concurrency, warmup)
+                print(f"{name}: p95 {results[name]['latency_ms']['p95']} ms, "
+                      f"{results[name]['throughput_rps']} req/s, "
+                      f"{results[name]['cpu_ms_per_request']} CPU ms/req", file=sys.stderr)
+
+    unhandled = dict(standin.unhandled) if standin is not None else {}
+    return results, unhandled
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """List the metrics that got worse than the baseline by more than `tolerance` (a fraction)."""
+    regressions = []
+
+    def _check(label: str, current, previous, higher_is_worse: bool = True):
+        if not current or not previous:
+            return
+        change = (current - previous) / previous if higher_is_worse else (previous - current) / previous
+        if change > tolerance:
+            regressions.append(f"{label}: {previous} -> {current} ({change:+.0%})")
+
+    _check("etl.seconds", report.get("etl", {}).get("seconds"), baseline.get("etl", {}).get("seconds"))
+    for name, result in report.get("endpoints", {}).items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if previous is None:
+            continue
+        _check(f"{name}.p95_ms", result["latency_ms"]["p95"], previous["latency_ms"]["p95"])
+        _check(f"{name}.throughput_rps", result["throughput_rps"], previous["throughput_rps"], higher_is_worse=False)
+        _check(f"{name}.cpu_ms_per_request", result.get("cpu_ms_per_request"), previous.get("cpu_ms_per_request"))
+    return regressions
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(args) -> dict:
+    data_dir, dataset = prepare_dataset(args.nodes, args.seed, args.skew, args.data_dir)
+
+    fake_llm = None
+    endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    if "chat" in endpoints:
+        fake_llm, base_url = start_fake_llm(args.llm_latency, args.llm_tokens_per_second)
+        os.environ["DOUBAO_BASE_URL"] = base_url
+    # Settings are read at import time, so configure before importing app modules
+    os.environ.setdefault("ARK_API_KEY", "benchmark")
+    os.environ["AGENT_WARMUP"] = "false"
+    # The snapshot endpoint is not benchmarked; skip the startup layout build
+    os.environ["GRAPH_SNAPSHOT_PREPARE"] = "false"
+    # Login is not benchmarked; do not seed a user file in the working tree
+    os.environ.setdefault("AUTH_USER_STORE", "memory")
+
+    try:
+        etl = None if args.skip_etl else run_etl_benchmark(data_dir, args.backend, args.batch_size, args.etl_workers)
+        results, unhandled = asyncio.run(run_endpoint_benchmarks(
+            data_dir, args.backend, endpoints, args.requests, args.chat_requests, args.concurrency, args.warmup,
+            args.accept_encoding))
+    finally:
+        if fake_llm is not None:
+            fake_llm.terminate()
+            fake_llm.wait(timeout=10)
+
+    from app.scripts.etl_pipeline import _peak_rss_mb
+    peak_rss = _peak_rss_mb()
+    return {
+        "benchmark": "suite",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "backend": args.backend,
+        "accept_encoding": args.accept_encoding,
+        "trusted_responses": os.environ.get("TRUSTED_RESPONSES", "true"),
+        "dataset": dataset,
+        "etl": etl,
+        "endpoints": results,
+        "unhandled_queries": unhandled,
+        "peak_rss_mb": round(peak_rss, 1) if peak_rss is not None else None,
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ETL and endpoint benchmarks on a synthetic audit graph.")
+    parser.add_argument("--backend", choices=["standin", "neo4j"], default="standin",
+                        help="standin: in-process stand-in, no database; neo4j: NEO4J_URI (wiped by the ETL step).")
+    parser.add_argument("--nodes", type=int, default=10_000, help="Synthetic graph size (default: 10000).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skew", type=float, default=3.0, help="Degree skew passed to the generator.")
+    parser.add_argument("--data-dir", help="Use existing CSVs from this directory instead of generating.")
+    parser.add_argument("--skip-etl", action="store_true", help="Only run the endpoint load tests.")
+    parser.add_argument("--batch-size", type=int, default=5000, help="ETL rows per write transaction.")
+    parser.add_argument("--etl-workers", type=int, default=1, help="ETL loader threads (see etl_pipeline --workers).")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS),
+                        help=f"Comma-separated subset of: {', '.join(ENDPOINTS)}.")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint (default: 200).")
+    parser.add_argument("--chat-requests", type=int, default=40, help="Measured chat requests (default: 40).")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent in-flight requests (default: 8).")
+    parser.add_argument("--accept-encoding", default="identity",
+                        help="Accept-Encoding sent with every request, e.g. gzip or br (default: identity).")
+    parser.add_argument("--warmup", type=int, default=3, help="Unmeasured requests per endpoint before timing.")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Fake LLM time to first token in seconds.")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=500.0, help="Fake LLM streaming speed.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    parser.add_argument("--baseline", help="Earlier report to compare against; exit 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression against the baseline (default: 0.2).")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    # One INFO line per benchmark request would drown the progress output
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    report = run_suite(args)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if report["unhandled_queries"]:
+        # The stand-in answered these with no rows, so the numbers would not reflect the real code path
+        print(f"Unhandled stand-in queries: {report['unhandled_queries']}", file=sys.stderr)
+    if report.get("regressions") or report["unhandled_queries"]:
+        sys.exit(1)
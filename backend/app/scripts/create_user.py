@@ -0,0 +1,72 @@
+"""
+Create or update a login user in the file-based user store (AUTH_USERS_FILE).
+
+The password is bcrypt-hashed here, once, at provisioning time; the API only
+ever verifies hashes. A running server picks up the change on the next login.
+
+    python -m app.scripts.create_user admin --full-name "Admin User" --email admin@example.com
+    python -m app.scripts.create_user admin --disable
+
+The password is prompted for unless --password is given (handy in scripts,
+but it ends up in the shell history).
+"""
+import argparse
+import getpass
+import os
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
+sys.path.append(BACKEND_DIR)
+
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.core.users import JsonFileUserStore
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Create or update a user in the AuditGraph user file.")
+    parser.add_argument("username")
+    parser.add_argument("--password", help="Password to set (prompted for when omitted).")
+    parser.add_argument("--full-name", help="Display name.")
+    parser.add_argument("--email")
+    parser.add_argument("--disable", action="store_true", help="Keep the user but block logins.")
+    parser.add_argument("--keep-password", action="store_true",
+                        help="Only update the other fields of an existing user.")
+    parser.add_argument("--file", default=settings.AUTH_USERS_FILE,
+                        help=f"User file (default: AUTH_USERS_FILE = {settings.AUTH_USERS_FILE}).")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    store = JsonFileUserStore(args.file)
+    existing = store.load().get(args.username)
+
+    if args.keep_password:
+        if existing is None:
+            print(f"User {args.username} does not exist; --keep-password needs an existing user.", file=sys.stderr)
+            return 1
+        hashed_password = existing["hashed_password"]
+    else:
+        password = args.password
+        if password is None:
+            password = getpass.getpass(f"Password for {args.username}: ")
+            if password != getpass.getpass("Repeat password: "):
+                print("Passwords do not match.", file=sys.stderr)
+                return 1
+        if not password:
+            print("Password must not be empty.", file=sys.stderr)
+            return 1
+        hashed_password = get_password_hash(password)
+
+    existing = existing or {}
+    store.upsert({
+        "username": args.username,
+        "full_name": args.full_name if args.full_name is not None else existing.get("full_name"),
+        "email": args.email if args.email is not None else existing.get("email"),
+        "hashed_password": hashed_password,
+        "disabled": args.disable,
+    })
+    print(f"{'Updated' if existing else 'Created'} user {args.username} in {os.path.abspath(args.file)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
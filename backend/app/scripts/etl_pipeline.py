@@ -1,18 +1,56 @@
 import pandas as pd
+import argparse
+import hashlib
+import json
+import re
 import sys
 import os
+import tempfile
+import threading
+import time
+import uuid
+import zlib
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Callable, Optional
 
 # Add backend to path so we can import app modules
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
 
 from app.db.neo4j_client import neo4j_client
+from app.db.graph_version import bump_graph_version, write_version_stamp
+from app.core.config import settings
+from app.core.embeddings import EMBEDDED_LABELS, VECTOR_INDEX_NAME, embedding_text, get_embeddings, text_hash
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), '../../data')
+MANIFEST_DIR = os.path.join(DATA_DIR, 'manifests')
+CSV_FILES = ('risks.csv', 'controls.csv', 'relationships.csv')
+
+# 批量模式下每个 UNWIND 事务包含的行数
+DEFAULT_BATCH_SIZE = 5000
+
+# 节点类型 -> 前端分组
+GROUP_MAP = {
+    'Standard': 1,
+    'ControlDomain': 1,
+    'Control': 2,
+    'Document': 3,
+    'Evidence': 3
+}
+
+# 列表接口用于过滤/排序的属性索引 (见 app/api/endpoints/risks.py, documents.py)
+PROPERTY_INDEXES = {
+    'Risk': ['severity', 'status', 'category', 'owner', 'dateIdentified', 'title'],
+    'Document': ['type', 'status', 'uploadDate', 'name'],
+}
+
+# 动态标签/关系类型只能是合法的 Cypher 标识符，防止注入
+_IDENTIFIER_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
 
 def load_risks():
     csv_path = os.path.join(DATA_DIR, 'risks.csv')
@@ -29,6 +67,7 @@ def load_risks():
     UNWIND $risks AS r
     MERGE (n:Risk {id: r.id})
     SET n += r, n.label = r.title, n.group = 4
+    SET n:AuditEntity
     """
     
     try:
@@ -49,15 +88,7 @@ def load_controls_and_entities():
     
     for node in nodes:
         label = node['type']
-        # Default group mapping
-        group_map = {
-            'Standard': 1,
-            'ControlDomain': 1,
-            'Control': 2,
-            'Document': 3,
-            'Evidence': 3
-        }
-        node['group_id'] = group_map.get(label, 3)
+        node['group_id'] = GROUP_MAP.get(label, 3)
         
         # Cypher query with dynamic label
         query = f"""
@@ -99,18 +130,720 @@ def load_relationships():
 
     logger.info(f"Processed {len(rels)} relationships.")
 
-def run_etl():
+# --- Bulk mode: streamed CSV chunks, grouped UNWIND batches in explicit write transactions ---
+
+RISK_BATCH_QUERY = """
+UNWIND $rows AS r
+MERGE (n:Risk {id: r.id})
+SET n += r, n.label = r.title, n.group = 4
+SET n:AuditEntity
+"""
+
+def _check_identifier(name: str) -> str:
+    if not isinstance(name, str) or not _IDENTIFIER_RE.match(name):
+        raise ValueError(f"Invalid label or relationship type: {name!r}")
+    return name
+
+# Incremental upserts replace the node's properties with the CSV row, so columns
+# dropped from the CSV disappear too; the embedding written by refresh_embeddings
+# is carried over (it is re-embedded only if the text changed).
+RISK_REPLACE_QUERY = """
+UNWIND $rows AS r
+MERGE (n:Risk {id: r.id})
+WITH n, r, n {.embedding, .embeddingHash} AS kept
+SET n = r, n += kept, n.label = r.title, n.group = 4
+SET n:AuditEntity
+"""
+
+def _entity_batch_query(label: str, replace: bool = False) -> str:
+    if replace:
+        set_props = "WITH n, row, n {.embedding, .embeddingHash} AS kept\n    SET n = row.props, n += kept,"
+    else:
+        set_props = "SET n += row.props,"
+    return f"""
+    UNWIND $rows AS row
+    MERGE (n:{_check_identifier(label)} {{id: row.id}})
+    {set_props} n.label = CASE WHEN row.title IS NOT NULL THEN row.title ELSE row.code END, n.group = row.group_id
+    SET n:AuditEntity
+    """
+
+def _relationship_batch_query(rel_type: str) -> str:
+    return f"""
+    UNWIND $rows AS row
+    MATCH (s:AuditEntity {{id: row.source}})
+    MATCH (t:AuditEntity {{id: row.target}})
+    MERGE (s)-[:{_check_identifier(rel_type)}]->(t)
+    """
+
+def _group_by(items: list, key: str) -> dict:
+    groups = {}
+    for item in items:
+        groups.setdefault(item[key], []).append(item)
+    return groups
+
+def _log_rate(stage: str, rows: int, started: float):
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else float('inf')
+    logger.info(f"[{stage}] {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def iter_csv_batches(name: str, batch_size: int = DEFAULT_BATCH_SIZE, usecols=None):
+    """
+    Stream a CSV from DATA_DIR as lists of row dicts of at most `batch_size`.
+    Only one chunk is held in memory at a time.
+    """
+    for chunk in iter_csv_chunks(name, batch_size, usecols):
+        yield chunk.to_dict('records')
+
+def iter_csv_chunks(name: str, batch_size: int = DEFAULT_BATCH_SIZE, usecols=None, directory: str = None):
+    """Stream a CSV from `directory` (default DATA_DIR) as DataFrame chunks of at most `batch_size` rows."""
+    csv_path = os.path.join(directory or DATA_DIR, name)
+    if not os.path.exists(csv_path):
+        logger.error(f"File not found: {csv_path}")
+        return
+    with pd.read_csv(csv_path, chunksize=batch_size, usecols=usecols) as reader:
+        yield from reader
+
+def ensure_schema(labels):
+    """
+    Create the uniqueness constraints the bulk loader relies on, plus the
+    property indexes backing the filtered/sorted listing endpoints.
+    Every loaded node also carries :AuditEntity, so relationship endpoints
+    are resolved through a single indexed label instead of a full scan.
+    """
+    for label in sorted(set(labels) | {'Risk', 'AuditEntity'}):
+        _check_identifier(label)
+        neo4j_client.execute_query(
+            f"CREATE CONSTRAINT {label.lower()}_id_unique IF NOT EXISTS "
+            f"FOR (n:{label}) REQUIRE n.id IS UNIQUE"
+        )
+    for label, props in PROPERTY_INDEXES.items():
+        for prop in props:
+            neo4j_client.execute_query(
+                f"CREATE INDEX {label.lower()}_{prop.lower()} IF NOT EXISTS "
+                f"FOR (n:{label}) ON (n.{prop})"
+            )
+    neo4j_client.execute_query("CALL db.awaitIndexes()")
+    logger.info("Schema constraints are in place.")
+
+def _control_row(node: dict) -> dict:
+    label = _check_identifier(node['type'])
+    node['group_id'] = GROUP_MAP.get(label, 3)
+    return {
+        "type": label,
+        "id": node['id'],
+        "props": {k: v for k, v in node.items() if k != 'type'},
+        "title": node.get('title'),
+        "code": node.get('code'),
+        "group_id": node['group_id'],
+    }
+
+def bulk_load_risks(batch_size: int = DEFAULT_BATCH_SIZE):
+    started = time.perf_counter()
+    total = 0
+    for batch in iter_csv_batches('risks.csv', batch_size):
+        neo4j_client.execute_write(RISK_BATCH_QUERY, {"rows": batch})
+        total += len(batch)
+    _log_rate("risks", total, started)
+
+def bulk_load_controls_and_entities(batch_size: int = DEFAULT_BATCH_SIZE):
+    started = time.perf_counter()
+    total = 0
+    for batch in iter_csv_batches('controls.csv', batch_size):
+        rows = [_control_row(node) for node in batch]
+        for label, group in _group_by(rows, 'type').items():
+            neo4j_client.execute_write(_entity_batch_query(label), {"rows": group})
+        total += len(rows)
+    _log_rate("controls", total, started)
+
+def bulk_load_relationships(batch_size: int = DEFAULT_BATCH_SIZE):
+    started = time.perf_counter()
+    total = 0
+    for batch in iter_csv_batches('relationships.csv', batch_size):
+        for rel_type, group in _group_by(batch, 'type').items():
+            neo4j_client.execute_write(_relationship_batch_query(rel_type), {"rows": group})
+        total += len(batch)
+    _log_rate("relationships", total, started)
+
+def _csv_labels() -> set:
+    labels = set()
+    for batch in iter_csv_batches('controls.csv', usecols=['type']):
+        labels.update(row['type'] for row in batch if isinstance(row['type'], str))
+    return labels
+
+# --- Incremental mode: fingerprinted upserts and batched removal of vanished rows ---
+
+EXISTING_NODES_PAGE_QUERY = """
+MATCH (n:AuditEntity)
+WHERE n.id > $after
+RETURN n.id AS id, n.row_hash AS hash, [l IN labels(n) WHERE l <> 'AuditEntity'][0] AS label
+ORDER BY n.id
+LIMIT $limit
+"""
+
+EXISTING_RELATIONSHIPS_PAGE_QUERY = """
+MATCH (s:AuditEntity)
+WHERE s.id > $after
+WITH s ORDER BY s.id LIMIT $limit
+OPTIONAL MATCH (s)-[r]->(t:AuditEntity)
+RETURN s.id AS source, type(r) AS type, t.id AS target
+"""
+
+DELETE_NODES_QUERY = """
+UNWIND $ids AS id
+MATCH (n:AuditEntity {id: id})
+DETACH DELETE n
+"""
+
+def _fingerprint(row: dict) -> str:
+    payload = json.dumps(row, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _rel_key(row: dict) -> tuple:
+    return (row['source'], row['type'], row['target'])
+
+def _relabel_query(old_label: Optional[str], new_label: str) -> str:
+    # The node keeps its relationships and embedding; the upsert that follows MERGEs on the new label
+    remove = f"REMOVE n:{_check_identifier(old_label)}" if old_label else ""
+    return f"""
+    UNWIND $ids AS id
+    MATCH (n:AuditEntity {{id: id}})
+    {remove}
+    SET n:{_check_identifier(new_label)}
+    """
+
+def _delete_relationships_query(rel_type: str) -> str:
+    return f"""
+    UNWIND $rows AS row
+    MATCH (s:AuditEntity {{id: row.source}})-[r:{_check_identifier(rel_type)}]->(t:AuditEntity {{id: row.target}})
+    DELETE r
+    """
+
+def _existing_node_hashes(page_size: int) -> dict:
+    """Page through the id -> (row_hash, label) of every ETL-managed node using the id index."""
+    hashes = {}
+    after = ""
+    while True:
+        page = neo4j_client.execute_query(EXISTING_NODES_PAGE_QUERY, {"after": after, "limit": page_size})
+        if not page:
+            return hashes
+        for record in page:
+            hashes[record['id']] = (record['hash'], record['label'])
+        after = page[-1]['id']
+
+def _existing_relationships(page_size: int) -> set:
+    keys = set()
+    after = ""
+    while True:
+        page = neo4j_client.execute_query(EXISTING_RELATIONSHIPS_PAGE_QUERY, {"after": after, "limit": page_size})
+        if not page:
+            return keys
+        for record in page:
+            if record['type'] is not None:
+                keys.add(_rel_key(record))
+        after = max(record['source'] for record in page)
+
+def clear_graph(batch_size: int = DEFAULT_BATCH_SIZE):
+    """Delete every node in batched transactions so a large graph never needs one huge transaction."""
+    neo4j_client.execute_query(
+        "MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF $size ROWS",
+        {"size": batch_size},
+    )
+
+def _write_manifest(manifest: dict, manifest_dir: str) -> str:
+    os.makedirs(manifest_dir, exist_ok=True)
+    path = os.path.join(manifest_dir, f"{manifest['run_id']}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, default=str)
+    return path
+
+def run_incremental(batch_size: int = DEFAULT_BATCH_SIZE, manifest_dir: str = MANIFEST_DIR) -> dict:
+    """
+    Apply only the delta between the CSVs and the graph.
+
+    Each node stores a `row_hash` fingerprint of its source row; rows whose
+    hash is unchanged are skipped, new or changed rows are upserted, and
+    ETL-managed nodes/relationships no longer present in the CSVs are removed
+    in batched write transactions. A row whose label changed (e.g. a Document
+    re-typed as Evidence, or an id moved between CSVs) relabels the existing
+    node before the upsert, so no stale duplicate is left under the old label.
+    Memory is bounded by the number of ids, not by row contents. A manifest of
+    the changes is written per run.
+    """
+    # The suffix keeps two runs within the same second from overwriting each other's manifest
+    run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    manifest = {
+        "run_id": run_id,
+        "nodes": {"created": [], "updated": [], "relabeled": [], "deleted": []},
+        "relationships": {"created": [], "deleted": []},
+    }
+
+    started = time.perf_counter()
+    existing = _existing_node_hashes(batch_size)
+    _log_rate("snapshot-nodes", len(existing), started)
+
+    def _classify(row_id, fingerprint, label, relabels):
+        # A node loaded by a full run has no row_hash yet (None): it exists, so it is updated
+        if row_id not in existing:
+            manifest["nodes"]["created"].append(row_id)
+            return fingerprint
+        old_hash, old_label = existing.pop(row_id)
+        if old_label != label:
+            relabels.setdefault((old_label, label), []).append(row_id)
+            manifest["nodes"]["relabeled"].append([row_id, old_label, label])
+        elif old_hash == fingerprint:
+            return None
+        manifest["nodes"]["updated"].append(row_id)
+        return fingerprint
+
+    def _relabel(relabels):
+        for (old_label, new_label), ids in relabels.items():
+            neo4j_client.execute_write(_relabel_query(old_label, new_label), {"ids": ids})
+
+    started = time.perf_counter()
+    total = 0
+    for batch in iter_csv_batches('risks.csv', batch_size):
+        changed, relabels = [], {}
+        for row in batch:
+            fingerprint = _classify(row['id'], _fingerprint(row), 'Risk', relabels)
+            if fingerprint is not None:
+                changed.append({**row, "row_hash": fingerprint})
+        _relabel(relabels)
+        if changed:
+            neo4j_client.execute_write(RISK_REPLACE_QUERY, {"rows": changed})
+        total += len(batch)
+    _log_rate("risks", total, started)
+
+    started = time.perf_counter()
+    total = 0
+    for batch in iter_csv_batches('controls.csv', batch_size):
+        changed, relabels = [], {}
+        for node in batch:
+            fingerprint = _classify(node['id'], _fingerprint(node), _check_identifier(node['type']), relabels)
+            if fingerprint is not None:
+                row = _control_row(node)
+                row["props"]["row_hash"] = fingerprint
+                changed.append(row)
+        _relabel(relabels)
+        for label, group in _group_by(changed, 'type').items():
+            neo4j_client.execute_write(_entity_batch_query(label, replace=True), {"rows": group})
+        total += len(batch)
+    _log_rate("controls", total, started)
+
+    # Whatever is left in `existing` was not seen in any CSV
+    started = time.perf_counter()
+    vanished = sorted(existing)
+    for i in range(0, len(vanished), batch_size):
+        neo4j_client.execute_write(DELETE_NODES_QUERY, {"ids": vanished[i:i + batch_size]})
+    manifest["nodes"]["deleted"] = vanished
+    _log_rate("delete-nodes", len(vanished), started)
+
+    started = time.perf_counter()
+    existing_rels = _existing_relationships(batch_size)
+    _log_rate("snapshot-relationships", len(existing_rels), started)
+
+    started = time.perf_counter()
+    total = 0
+    for batch in iter_csv_batches('relationships.csv', batch_size):
+        new_rels = []
+        for rel in batch:
+            key = _rel_key(rel)
+            if key in existing_rels:
+                existing_rels.discard(key)
+            else:
+                new_rels.append(rel)
+                manifest["relationships"]["created"].append(list(key))
+        for rel_type, group in _group_by(new_rels, 'type').items():
+            neo4j_client.execute_write(_relationship_batch_query(rel_type), {"rows": group})
+        total += len(batch)
+    _log_rate("relationships", total, started)
+
+    started = time.perf_counter()
+    vanished_rels = [{"source": s, "type": t, "target": d} for s, t, d in sorted(existing_rels)]
+    for i in range(0, len(vanished_rels), batch_size):
+        for rel_type, group in _group_by(vanished_rels[i:i + batch_size], 'type').items():
+            neo4j_client.execute_write(_delete_relationships_query(rel_type), {"rows": group})
+    manifest["relationships"]["deleted"] = [list(_rel_key(r)) for r in vanished_rels]
+    _log_rate("delete-relationships", len(vanished_rels), started)
+
+    path = _write_manifest(manifest, manifest_dir)
+    logger.info(
+        "Delta applied: nodes +%d ~%d (relabeled %d) -%d, relationships +%d -%d (manifest: %s)",
+        len(manifest["nodes"]["created"]), len(manifest["nodes"]["updated"]),
+        len(manifest["nodes"]["relabeled"]), len(manifest["nodes"]["deleted"]),
+        len(manifest["relationships"]["created"]), len(manifest["relationships"]["deleted"]), path,
+    )
+    return manifest
+
+# --- Parallel mode: dependency-aware stage scheduler ---
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[[], int]
+    provides: frozenset = frozenset()
+    requires: frozenset = frozenset()
+    # Stages sharing an exclusive group never run at the same time
+    exclusive: Optional[str] = None
+    rows: int = field(default=0, init=False)
+
+def run_stages(stages: list, workers: int):
+    """
+    Run stages on a thread pool as soon as every label they require has been
+    provided by a finished stage. Fails fast on the first stage error.
+    """
+    pending = list(stages)
+    provided = set()
+    busy_groups = set()
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for stage in list(pending):
+                if len(running) >= workers:
+                    break
+                if not stage.requires <= provided or stage.exclusive in busy_groups:
+                    continue
+                pending.remove(stage)
+                if stage.exclusive:
+                    busy_groups.add(stage.exclusive)
+                running[pool.submit(stage.run)] = stage
+
+            if not running:
+                missing = set().union(*(s.requires for s in pending)) - provided
+                raise RuntimeError(f"Unsatisfiable stage dependencies: {sorted(missing)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                stage.rows = future.result()
+                provided |= stage.provides
+                busy_groups.discard(stage.exclusive)
+                logger.info(f"Stage {stage.name} finished ({stage.rows} rows).")
+
+def _partition(node_id, partitions: int) -> int:
+    return zlib.crc32(str(node_id).encode('utf-8')) % partitions
+
+def _partition_rounds(partitions: int):
+    """
+    Round-robin (circle method) schedule over an even number of partitions.
+    Each round is a set of disjoint partition pairs, followed by one round of
+    same-partition pairs, so buckets within a round never share a node.
+    """
+    ring = list(range(partitions))
+    rounds = []
+    for _ in range(partitions - 1):
+        rounds.append([
+            tuple(sorted((ring[i], ring[partitions - 1 - i]))) for i in range(partitions // 2)
+        ])
+        ring = [ring[0], ring[-1]] + ring[1:-1]
+    rounds.append([(p, p) for p in range(partitions)])
+    return rounds
+
+def _spool_csv(name: str, column: str, spool_dir: str, batch_size: int, on_chunk=None) -> dict:
+    """
+    Stream a CSV from DATA_DIR once and append every chunk's rows to one spool
+    file per value of `column` (node label or relationship type), so each stage
+    later streams only its own rows. Returns {value: spool file name}.
+    `on_chunk` sees each chunk first. Memory is bounded by the chunk size.
+    """
+    spools = {}
+    for chunk in iter_csv_chunks(name, batch_size):
+        if on_chunk is not None:
+            on_chunk(chunk)
+        for key, group in chunk.groupby(column, sort=False):
+            if not isinstance(key, str):
+                continue
+            spool = spools.get(key)
+            if spool is None:
+                spool = spools[key] = f"{os.path.splitext(name)[0]}-{_check_identifier(key)}.csv"
+                group.to_csv(os.path.join(spool_dir, spool), index=False)
+            else:
+                group.to_csv(os.path.join(spool_dir, spool), mode='a', header=False, index=False)
+    return dict(sorted(spools.items()))
+
+def _iter_spool_batches(spool_dir: str, spool: str, batch_size: int):
+    for chunk in iter_csv_chunks(spool, batch_size, directory=spool_dir):
+        yield chunk.to_dict('records')
+
+def _spool_sources(spool_dir: str, batch_size: int):
+    """
+    Split controls.csv by label and relationships.csv by type into spool files,
+    and derive which node labels each relationship type connects from the
+    endpoint ids it references (only the id -> label map is kept in memory).
+    Endpoints missing from the CSVs are ignored: the MATCH-based load drops
+    those rows anyway.
+    """
+    node_labels = {}
+    for chunk in iter_csv_chunks('risks.csv', batch_size, usecols=['id']):
+        node_labels.update(dict.fromkeys(chunk['id'].tolist(), 'Risk'))
+
+    def _record_labels(chunk):
+        node_labels.update(zip(chunk['id'].tolist(), chunk['type'].tolist()))
+
+    endpoint_labels = {}
+
+    def _record_endpoints(chunk):
+        for column in ('source', 'target'):
+            labels = chunk[column].map(node_labels)
+            known = labels.notna() & chunk['type'].map(lambda value: isinstance(value, str))
+            for rel_type, label in set(zip(chunk['type'][known].tolist(), labels[known].tolist())):
+                endpoint_labels.setdefault(rel_type, set()).add(label)
+
+    entities = _spool_csv('controls.csv', 'type', spool_dir, batch_size, on_chunk=_record_labels)
+    relationships = _spool_csv('relationships.csv', 'type', spool_dir, batch_size, on_chunk=_record_endpoints)
+    return entities, relationships, {rel_type: endpoint_labels.get(rel_type, set()) for rel_type in relationships}
+
+class WriteSlots:
+    """
+    The --workers budget of concurrent write transactions, shared by every
+    stage and by the partition rounds inside relationship stages. Threads only
+    hold a slot while a write is in flight, never while waiting on other work.
+    """
+    def __init__(self, workers: int):
+        self._slots = threading.BoundedSemaphore(workers)
+
+    def execute_write(self, query: str, parameters: dict = None):
+        with self._slots:
+            return neo4j_client.execute_write(query, parameters)
+
+def _load_relationship_type(rel_type: str, batches, workers: int, writes: WriteSlots) -> int:
+    """
+    Load one relationship type with up to `workers` concurrent write transactions.
+    Rows are bucketed by the unordered partition pair of their endpoints and
+    written round by round, so concurrent MERGEs lock disjoint node sets.
+    """
+    partitions = workers * 2
+    rounds = _partition_rounds(partitions)
+    query = _relationship_batch_query(rel_type)
+    total = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch in batches:
+            buckets = {}
+            for rel in batch:
+                key = tuple(sorted((_partition(rel['source'], partitions), _partition(rel['target'], partitions))))
+                buckets.setdefault(key, []).append(rel)
+                total += 1
+            for round_pairs in rounds:
+                futures = [
+                    pool.submit(writes.execute_write, query, {"rows": buckets[pair]})
+                    for pair in round_pairs if pair in buckets
+                ]
+                for future in futures:
+                    future.result()
+    return total
+
+def _load_label(label: str, batches, writes: WriteSlots) -> int:
+    query = _entity_batch_query(label)
+    total = 0
+    for batch in batches:
+        writes.execute_write(query, {"rows": [_control_row(node) for node in batch]})
+        total += len(batch)
+    return total
+
+def _load_risk_batches(batch_size: int, writes: WriteSlots) -> int:
+    total = 0
+    for batch in iter_csv_batches('risks.csv', batch_size):
+        writes.execute_write(RISK_BATCH_QUERY, {"rows": batch})
+        total += len(batch)
+    return total
+
+def parallel_load(batch_size: int = DEFAULT_BATCH_SIZE, workers: int = 4):
+    """
+    Load node labels concurrently, then start each relationship type as soon
+    as the labels of the nodes it connects are loaded. Relationship stages are
+    serialized among themselves and parallelized internally by node partition.
+    All stages draw on one budget of `workers` concurrent write transactions.
+
+    controls.csv and relationships.csv are streamed once up front into per
+    label / per relationship type spool files in a temporary directory, and
+    each stage streams its own spool in `batch_size` chunks, so memory stays
+    bounded by the chunk size plus the id -> label map.
+    """
+    with tempfile.TemporaryDirectory(prefix="etl-spool-") as spool_dir:
+        started = time.perf_counter()
+        entities, relationships, endpoint_labels = _spool_sources(spool_dir, batch_size)
+        logger.info(f"[spool] {len(entities)} labels and {len(relationships)} relationship types "
+                    f"in {time.perf_counter() - started:.2f}s")
+        labels = {_check_identifier(label) for label in entities}
+        ensure_schema(labels)
+
+        writes = WriteSlots(workers)
+        stages = [Stage("Risk", lambda: _load_risk_batches(batch_size, writes), provides=frozenset({'Risk'}))]
+        for label, spool in entities.items():
+            batches = _iter_spool_batches(spool_dir, spool, batch_size)
+            stages.append(Stage(label, lambda label=label, batches=batches: _load_label(label, batches, writes),
+                                provides=frozenset({label})))
+
+        node_labels = labels | {'Risk'}
+        for rel_type, spool in relationships.items():
+            batches = _iter_spool_batches(spool_dir, spool, batch_size)
+            stages.append(Stage(rel_type, lambda rel_type=rel_type, batches=batches: _load_relationship_type(
+                                    rel_type, batches, workers, writes),
+                                requires=frozenset(endpoint_labels[rel_type] & node_labels),
+                                exclusive="relationships"))
+
+        started = time.perf_counter()
+        run_stages(stages, workers)
+        _log_rate("parallel", sum(stage.rows for stage in stages), started)
+
+# --- GraphRAG: node embeddings backing the vector index used by app/langgraph_agent/retriever.py ---
+
+# 每次调用 embedding 接口的文本条数
+EMBEDDING_BATCH_SIZE = 64
+
+EMBEDDING_SOURCE_PAGE_QUERY = f"""
+MATCH (n:AuditEntity)
+WHERE n.id > $after AND ({' OR '.join(f'n:{label}' for label in EMBEDDED_LABELS)})
+RETURN n.id AS id, coalesce(n.title, n.label) AS title, n.description AS description, n.embeddingHash AS hash
+ORDER BY n.id
+LIMIT $limit
+"""
+
+EMBEDDING_WRITE_QUERY = """
+UNWIND $rows AS r
+MATCH (n:AuditEntity {id: r.id})
+CALL db.create.setNodeVectorProperty(n, 'embedding', r.embedding)
+SET n.embeddingHash = r.hash
+"""
+
+EMBEDDING_CLEAR_QUERY = """
+UNWIND $ids AS id
+MATCH (n:AuditEntity {id: id})
+REMOVE n.embedding, n.embeddingHash
+"""
+
+def ensure_vector_index(dimensions: int):
+    neo4j_client.execute_query(
+        f"CREATE VECTOR INDEX {VECTOR_INDEX_NAME} IF NOT EXISTS "
+        f"FOR (n:AuditEntity) ON (n.embedding) "
+        f"OPTIONS {{indexConfig: {{`vector.dimensions`: {int(dimensions)}, "
+        f"`vector.similarity_function`: 'cosine'}}}}"
+    )
+
+def refresh_embeddings(batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Embed the title + description of every Risk/Control/Document whose text
+    changed since it was last embedded. Each node keeps the hash of the text
+    (and model) it was embedded from, so reruns - in particular incremental
+    ETL runs - only call the embedding API for new or edited nodes.
+    """
+    embeddings = get_embeddings()
+    started = time.perf_counter()
+    embedded = 0
+    index_ready = False
+    after = ""
+    while True:
+        page = neo4j_client.execute_query(EMBEDDING_SOURCE_PAGE_QUERY, {"after": after, "limit": batch_size})
+        if not page:
+            break
+        after = page[-1]['id']
+
+        pending, cleared = [], []
+        for record in page:
+            text = embedding_text(record['title'], record['description'])
+            if not text:
+                if record['hash'] is not None:
+                    cleared.append(record['id'])
+                continue
+            fingerprint = text_hash(text)
+            if fingerprint != record['hash']:
+                pending.append({"id": record['id'], "text": text, "hash": fingerprint})
+        if cleared:
+            neo4j_client.execute_write(EMBEDDING_CLEAR_QUERY, {"ids": cleared})
+
+        for start in range(0, len(pending), EMBEDDING_BATCH_SIZE):
+            chunk = pending[start:start + EMBEDDING_BATCH_SIZE]
+            vectors = embeddings.embed_documents([row['text'] for row in chunk])
+            if not index_ready:
+                ensure_vector_index(len(vectors[0]))
+                index_ready = True
+            neo4j_client.execute_write(EMBEDDING_WRITE_QUERY, {"rows": [
+                {"id": row['id'], "hash": row['hash'], "embedding": vector}
+                for row, vector in zip(chunk, vectors)
+            ]})
+            embedded += len(chunk)
+
+    _log_rate("embeddings", embedded, started)
+    return embedded
+
+def run_etl(bulk: bool = False, batch_size: int = DEFAULT_BATCH_SIZE,
+            incremental: bool = False, manifest_dir: str = MANIFEST_DIR, workers: int = 1,
+            embeddings: bool = False):
+    if workers > 1 and (incremental or not bulk):
+        raise ValueError("workers > 1 only applies to full bulk loads (bulk=True, incremental=False)")
     logger.info("Starting ETL Pipeline...")
     
-    # Optional: Clear DB
-    logger.info("Clearing existing database...")
-    neo4j_client.execute_query("MATCH (n) DETACH DELETE n")
+    if incremental:
+        ensure_schema(_csv_labels())
+        run_incremental(batch_size, manifest_dir)
+    elif bulk and workers > 1:
+        logger.info("Clearing existing database...")
+        clear_graph(batch_size)
+        parallel_load(batch_size, workers)
+    elif bulk:
+        logger.info("Clearing existing database...")
+        clear_graph(batch_size)
+        ensure_schema(_csv_labels())
+        bulk_load_risks(batch_size)
+        bulk_load_controls_and_entities(batch_size)
+        bulk_load_relationships(batch_size)
+    else:
+        # Optional: Clear DB
+        logger.info("Clearing existing database...")
+        neo4j_client.execute_query("MATCH (n) DETACH DELETE n")
+        load_risks()
+        load_controls_and_entities()
+        load_relationships()
     
-    load_risks()
-    load_controls_and_entities()
-    load_relationships()
+    if embeddings and settings.RAG_ENABLED:
+        try:
+            refresh_embeddings(batch_size)
+        except Exception as e:
+            # embedding 服务不可用时图谱仍然可用，Agent 退化为纯 Cypher 查询
+            logger.error(f"Embedding refresh failed, GraphRAG retrieval will be unavailable: {e}")
+    
+    # 通知 API 侧缓存 (仪表盘等) 失效，并记录本版本加载的是哪一份 CSV (供 GRAPH_ENGINE_SOURCE=csv 校验)
+    version = bump_graph_version(neo4j_client)
+    write_version_stamp(DATA_DIR, version, CSV_FILES)
     
+    peak_rss = _peak_rss_mb()
+    if peak_rss is not None:
+        logger.info(f"Peak RSS: {peak_rss:.1f} MB")
     logger.info("ETL Pipeline Completed Successfully.")
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load AuditGraph CSV data into Neo4j.")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Stream CSVs in chunks and write them as UNWIND batches grouped by label/relationship type.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"CSV chunk size and rows per write transaction in bulk mode (default: {DEFAULT_BATCH_SIZE}).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Concurrent loader threads in bulk mode; >1 enables the dependency-aware stage scheduler "
+                             "(requires --bulk, not valid with --incremental).")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Upsert only new/changed rows (by content hash) and remove vanished ones instead of wiping the graph.")
+    parser.add_argument("--manifest-dir", default=MANIFEST_DIR,
+                        help="Where incremental runs write their change manifest.")
+    parser.add_argument("--embeddings", action="store_true",
+                        help="Also refresh the node embeddings behind the GraphRAG vector index "
+                             "(calls the EMBEDDING_MODEL API for new or edited nodes).")
+    args = parser.parse_args(argv)
+    if args.workers > 1 and (args.incremental or not args.bulk):
+        parser.error("--workers only applies to full --bulk loads")
+    return args
+
 if __name__ == "__main__":
-    run_etl()
+    args = parse_args()
+    run_etl(bulk=args.bulk, batch_size=args.batch_size,
+            incremental=args.incremental, manifest_dir=args.manifest_dir, workers=args.workers,
+            embeddings=args.embeddings)
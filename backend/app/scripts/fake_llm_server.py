@@ -0,0 +1,144 @@
+"""
+Local OpenAI-compatible stand-in for the Doubao endpoint, for exercising the
+LLM gateway (concurrency limit, rate limiting, 429 backpressure, request
+coalescing) without spending real tokens.
+
+    python -m app.scripts.fake_llm_server --port 9000 --latency 0.5 --max-concurrency 4
+    DOUBAO_BASE_URL=http://localhost:9000/v1 ARK_API_KEY=fake uvicorn app.main:app
+
+Serves /v1/chat/completions (plain and streamed) and /v1/embeddings.
+/stats reports how many requests arrived and the peak number served
+concurrently, which is what the gateway is supposed to bound.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+EMBEDDING_DIMENSIONS = 64
+
+def _last_user_message(messages: list) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            content = message.get("content")
+            return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+    return ""
+
+def _fake_vector(text: str) -> list:
+    # Deterministic per text, so identical inputs embed identically
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [(digest[i % len(digest)] - 128) / 128 for i in range(EMBEDDING_DIMENSIONS)]
+
+def create_app(latency: float, tokens_per_second: float, max_concurrency: int) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI-compatible LLM")
+    state = {"requests": 0, "in_flight": 0, "peak_in_flight": 0, "rejected": 0}
+
+    def _enter():
+        state["requests"] += 1
+        if max_concurrency and state["in_flight"] >= max_concurrency:
+            state["rejected"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+                headers={"Retry-After": "1"},
+            )
+        state["in_flight"] += 1
+        state["peak_in_flight"] = max(state["peak_in_flight"], state["in_flight"])
+        return None
+
+    def _exit():
+        state["in_flight"] -= 1
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        rejected = _enter()
+        if rejected is not None:
+            return rejected
+
+        answer = f"[fake] {_last_user_message(body.get('messages', []))[:200]}"
+        words = answer.split(" ")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "fake")
+
+        if not body.get("stream"):
+            try:
+                await asyncio.sleep(latency + len(words) / tokens_per_second)
+            finally:
+                _exit()
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)},
+            }
+
+        def _chunk(delta: dict, finish_reason=None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        async def _stream():
+            try:
+                await asyncio.sleep(latency)
+                yield _chunk({"role": "assistant", "content": ""})
+                for i, word in enumerate(words):
+                    await asyncio.sleep(1 / tokens_per_second)
+                    yield _chunk({"content": word if i == 0 else f" {word}"})
+                yield _chunk({}, finish_reason="stop")
+                yield "data: [DONE]\n\n"
+            finally:
+                _exit()
+
+        return StreamingResponse(_stream(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        return {
+            "object": "list",
+            "model": body.get("model", "fake"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": _fake_vector(str(text))}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return state
+
+    return app
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a fake OpenAI-compatible LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.3,
+                        help="Seconds before the first token (default: 0.3).")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0,
+                        help="Streaming speed of the fake answer (default: 50).")
+    parser.add_argument("--max-concurrency", type=int, default=0,
+                        help="Answer 429 above this many in-flight requests, like a provider rate limit (0 = unlimited).")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    uvicorn.run(create_app(args.latency, args.tokens_per_second, args.max_concurrency), host=args.host, port=args.port)
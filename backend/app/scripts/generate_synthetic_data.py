@@ -0,0 +1,228 @@
+"""
+Synthetic audit-graph generator for benchmarks.
+
+Writes risks.csv, controls.csv and relationships.csv in the same format as the
+files shipped in backend/data, at any scale from a few thousand to tens of
+millions of nodes:
+
+    python -m app.scripts.generate_synthetic_data --nodes 1000000 --output-dir data/synthetic/1m
+
+The shape follows the real graph: Standard -CONTAINS-> ControlDomain
+-CONTAINS-> Control, Control -MITIGATES-> Risk, Control -EVIDENCED_BY->
+Document/Evidence and Control -REQUIRES-> Control. Relationship endpoints are
+drawn from a power-law distribution (--skew), so a few controls and domains
+become hubs with very high degree while most stay small, which is what makes
+neighbourhood expansion and aggregation queries expensive in practice.
+
+Output is written in chunks, so memory stays flat regardless of --nodes.
+The same --seed always produces the same files.
+"""
+import argparse
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '../../data/synthetic')
+CHUNK_SIZE = 100_000
+
+# Share of all nodes per label; Risk takes whatever is left
+LABEL_SHARES = {
+    'Control': 0.35,
+    'Document': 0.10,
+    'Evidence': 0.05,
+}
+
+SEVERITIES = (['High', 'Medium', 'Low', 'Critical'], [0.22, 0.43, 0.30, 0.05])
+STATUSES = (['Open', 'Mitigated', 'Closed'], [0.45, 0.25, 0.30])
+CATEGORIES = ['Access Control', 'Business Continuity', 'Encryption', 'Supplier Relationships',
+              'Network Security', 'Data Privacy', 'Change Management', 'Asset Management']
+OWNERS = ['IT Security', 'DevOps', 'App Support', 'Procurement', 'Network Ops',
+          'Data Privacy Officer', 'Internal Audit', 'Finance']
+DATE_START = np.datetime64('2022-01-01')
+DATE_RANGE_DAYS = 3 * 365
+
+def plan_counts(nodes: int) -> dict:
+    """Split a total node count into per-label counts."""
+    standards = max(1, nodes // 100_000)
+    domains = max(2, nodes // 1_000)
+    counts = {'Standard': standards, 'ControlDomain': domains}
+    for label, share in LABEL_SHARES.items():
+        counts[label] = max(1, int(nodes * share))
+    counts['Risk'] = max(1, nodes - sum(counts.values()))
+    return counts
+
+def _ids(prefix: str, start: int, stop: int) -> list:
+    return [f"{prefix}-{i:08d}" for i in range(start, stop)]
+
+def _skewed(rng, n: int, size: int, skew: float, permutation=None) -> np.ndarray:
+    """
+    Draw `size` indices in [0, n) with a power-law bias towards a few hubs.
+    skew=1 is uniform; larger values concentrate more edges on fewer nodes.
+    The optional permutation scatters the hubs over the id range.
+    """
+    index = (n * rng.random(size) ** skew).astype(np.int64)
+    np.minimum(index, n - 1, out=index)
+    return permutation[index] if permutation is not None else index
+
+def _chunks(total: int, chunk_size: int):
+    for start in range(0, total, chunk_size):
+        yield start, min(start + chunk_size, total)
+
+class _DegreeCounter:
+    """Tracks per-node degree for one label so the summary can report the skew."""
+    def __init__(self, n: int):
+        self.degree = np.zeros(n, dtype=np.int64)
+
+    def add(self, index: np.ndarray):
+        self.degree += np.bincount(index, minlength=len(self.degree))
+
+    def summary(self) -> dict:
+        degree = self.degree
+        return {
+            "mean": round(float(degree.mean()), 2),
+            "p99": int(np.percentile(degree, 99)),
+            "max": int(degree.max()),
+        }
+
+def write_risks(path: str, count: int, rng, chunk_size: int = CHUNK_SIZE):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'title', 'severity', 'category', 'status', 'description', 'owner', 'dateIdentified'])
+        for start, stop in _chunks(count, chunk_size):
+            size = stop - start
+            severity = rng.choice(SEVERITIES[0], size, p=SEVERITIES[1])
+            status = rng.choice(STATUSES[0], size, p=STATUSES[1])
+            category = rng.choice(CATEGORIES, size)
+            owner = rng.choice(OWNERS, size)
+            dates = (DATE_START + rng.integers(0, DATE_RANGE_DAYS, size)).astype(str)
+            ids = _ids('R', start, stop)
+            writer.writerows(
+                (rid, f"{cat} 风险 {i}", sev, cat, st, f"{cat} 领域的合成风险 (severity={sev})。", own, day)
+                for i, rid, sev, cat, st, own, day in zip(range(start, stop), ids, severity, category, status, owner, dates)
+            )
+
+def write_entities(path: str, counts: dict, chunk_size: int = CHUNK_SIZE):
+    labels = [
+        ('Standard', 'STD', 1, "合成标准"),
+        ('ControlDomain', 'DOM', 1, "合成控制域"),
+        ('Control', 'CTL', 2, "合成控制措施"),
+        ('Document', 'DOC', 3, "合成制度文档"),
+        ('Evidence', 'EVD', 3, "合成审计证据"),
+    ]
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'code', 'title', 'description', 'type', 'group_id'])
+        for label, prefix, group, title in labels:
+            for start, stop in _chunks(counts[label], chunk_size):
+                writer.writerows(
+                    (node_id, node_id, f"{title} {i}", f"{title} {i} 的描述。", label, group)
+                    for i, node_id in zip(range(start, stop), _ids(prefix, start, stop))
+                )
+
+def write_relationships(path: str, counts: dict, rng, skew: float, chunk_size: int = CHUNK_SIZE) -> dict:
+    controls = counts['Control']
+    domains = counts['ControlDomain']
+    control_hubs = rng.permutation(controls)
+    domain_hubs = rng.permutation(domains)
+    control_degree = _DegreeCounter(controls)
+    domain_degree = _DegreeCounter(domains)
+    relationships = {}
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['source', 'target', 'type'])
+
+        def _write(sources: list, targets: list, rel_type: str):
+            writer.writerows((s, t, rel_type) for s, t in zip(sources, targets))
+            relationships[rel_type] = relationships.get(rel_type, 0) + len(targets)
+
+        # Every domain belongs to one standard (round robin)
+        for start, stop in _chunks(domains, chunk_size):
+            standards = np.arange(start, stop) % counts['Standard']
+            _write([f"STD-{s:08d}" for s in standards], _ids('DOM', start, stop), 'CONTAINS')
+
+        # Every control belongs to one domain; domain sizes are skewed
+        for start, stop in _chunks(controls, chunk_size):
+            parents = _skewed(rng, domains, stop - start, skew, domain_hubs)
+            domain_degree.add(parents)
+            _write([f"DOM-{p:08d}" for p in parents], _ids('CTL', start, stop), 'CONTAINS')
+
+        # Each risk is mitigated by 1-3 controls, a few controls mitigate a large share of risks
+        for start, stop in _chunks(counts['Risk'], chunk_size):
+            fanout = rng.integers(1, 4, stop - start)
+            risks = np.repeat(np.arange(start, stop), fanout)
+            sources = _skewed(rng, controls, len(risks), skew, control_hubs)
+            control_degree.add(sources)
+            _write([f"CTL-{s:08d}" for s in sources], [f"R-{r:08d}" for r in risks], 'MITIGATES')
+
+        # Each document / evidence item backs one or two controls
+        for label, prefix in (('Document', 'DOC'), ('Evidence', 'EVD')):
+            for start, stop in _chunks(counts[label], chunk_size):
+                fanout = rng.integers(1, 3, stop - start)
+                targets = np.repeat(np.arange(start, stop), fanout)
+                sources = _skewed(rng, controls, len(targets), skew, control_hubs)
+                control_degree.add(sources)
+                _write([f"CTL-{s:08d}" for s in sources], [f"{prefix}-{t:08d}" for t in targets], 'EVIDENCED_BY')
+
+        # About one control in ten depends on another (popular controls are required often)
+        for start, stop in _chunks(controls, chunk_size):
+            dependants = np.arange(start, stop)[rng.random(stop - start) < 0.1]
+            required = _skewed(rng, controls, len(dependants), skew, control_hubs)
+            keep = required != dependants
+            dependants, required = dependants[keep], required[keep]
+            control_degree.add(required)
+            _write([f"CTL-{s:08d}" for s in dependants], [f"CTL-{t:08d}" for t in required], 'REQUIRES')
+
+    return {
+        "relationships": relationships,
+        "degree": {"Control": control_degree.summary(), "ControlDomain": domain_degree.summary()},
+    }
+
+def generate(nodes: int, output_dir: str, seed: int = 42, skew: float = 3.0, chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Write the three CSVs for a graph of roughly `nodes` nodes into `output_dir`
+    and return a summary (counts per label / relationship type, degree skew).
+    The summary is also written next to the CSVs as dataset.json.
+    """
+    if nodes < 10:
+        raise ValueError("nodes must be at least 10")
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    counts = plan_counts(nodes)
+    started = time.perf_counter()
+
+    write_risks(os.path.join(output_dir, 'risks.csv'), counts['Risk'], rng, chunk_size)
+    write_entities(os.path.join(output_dir, 'controls.csv'), counts, chunk_size)
+    edges = write_relationships(os.path.join(output_dir, 'relationships.csv'), counts, rng, skew, chunk_size)
+
+    summary = {
+        "nodes": sum(counts.values()),
+        "labels": counts,
+        "relationships": sum(edges["relationships"].values()),
+        "relationship_types": edges["relationships"],
+        "degree": edges["degree"],
+        "seed": seed,
+        "skew": skew,
+        "output_dir": os.path.abspath(output_dir),
+        "generation_s": round(time.perf_counter() - started, 2),
+    }
+    with open(os.path.join(output_dir, 'dataset.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic AuditGraph dataset (risks/controls/relationships CSVs).")
+    parser.add_argument("--nodes", type=int, default=10_000, help="Approximate total node count (default: 10000).")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Directory for the generated CSVs.")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed; the same seed gives identical files.")
+    parser.add_argument("--skew", type=float, default=3.0,
+                        help="Degree skew of relationship endpoints: 1 = uniform, higher = fewer, bigger hubs (default: 3).")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows generated and written per chunk.")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(json.dumps(generate(args.nodes, args.output_dir, args.seed, args.skew, args.chunk_size), indent=2))
@@ -0,0 +1,14 @@
+import os
+import sys
+
+# 设置在导入 app 模块之前生效 (Settings 在导入时读取环境变量)
+os.environ.setdefault("ARK_API_KEY", "test")
+os.environ.setdefault("AUTH_USER_STORE", "memory")
+os.environ.setdefault("AGENT_WARMUP", "false")
+os.environ.setdefault("GRAPH_SNAPSHOT_PREPARE", "false")
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+DATA_DIR = os.path.join(BACKEND_DIR, "data")
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from app.langgraph_agent import answer_cache as answer_cache_module
+from app.langgraph_agent.answer_cache import AnswerCache, normalize_question
+
+class FakeEmbeddings:
+    """按问题文本返回固定向量，未登记的问题视为 embedding 服务故障。"""
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = []
+
+    async def aembed_query(self, text):
+        self.calls.append(text)
+        return self.vectors[text]
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    fake = FakeEmbeddings({
+        "列出所有open的高风险": [1.0, 0.0, 0.0],
+        "open状态的高风险有哪些": [0.99, 0.1, 0.0],
+        "c001的负责人": [0.0, 1.0, 0.0],
+    })
+    monkeypatch.setattr(answer_cache_module, "get_embeddings", lambda: fake)
+    return fake
+
+def test_normalize_question_ignores_width_case_and_punctuation():
+    assert normalize_question("列出所有 Open 的高风险？") == normalize_question("列出所有ｏｐｅｎ的高风险")
+
+def test_exact_match_is_scoped_to_the_graph_version():
+    cache = AnswerCache(maxsize=8, ttl=60)
+
+    async def scenario():
+        await cache.store("列出所有 Open 的高风险？", 1, {"answer": "R001"})
+        return (
+            await cache.lookup("列出所有open的高风险", 1),
+            await cache.lookup("列出所有open的高风险", 2),
+        )
+
+    (hit, _), (miss, _) = asyncio.run(scenario())
+    assert hit == {"answer": "R001"}
+    assert miss is None
+    assert (cache.exact_hits, cache.misses) == (1, 1)
+
+def test_semantic_match_reuses_the_lookup_vector(embeddings):
+    cache = AnswerCache(maxsize=8, ttl=60, semantic=True, threshold=0.9)
+
+    async def scenario():
+        answer, vector = await cache.lookup("列出所有 Open 的高风险", 1)
+        assert answer is None and vector is not None
+        await cache.store("列出所有 Open 的高风险", 1, {"answer": "R001"}, vector)
+        similar, _ = await cache.lookup("Open 状态的高风险有哪些？", 1)
+        unrelated, _ = await cache.lookup("C001 的负责人", 1)
+        return similar, unrelated
+
+    similar, unrelated = asyncio.run(scenario())
+    assert similar == {"answer": "R001"}
+    assert unrelated is None
+    # store 没有再次请求 embedding
+    assert embeddings.calls.count("列出所有open的高风险") == 1
+    assert (cache.semantic_hits, cache.misses) == (1, 2)
+
+def test_index_is_rebuilt_after_store(embeddings):
+    cache = AnswerCache(maxsize=8, ttl=60, semantic=True, threshold=0.9)
+
+    async def scenario():
+        await cache.store("C001 的负责人", 1, {"answer": "张三"})
+        first, _ = await cache.lookup("Open 状态的高风险有哪些", 1)
+        await cache.store("列出所有 Open 的高风险", 1, {"answer": "R001"})
+        second, _ = await cache.lookup("Open 状态的高风险有哪些", 1)
+        return first, second
+
+    assert asyncio.run(scenario()) == (None, {"answer": "R001"})
+
+def test_embedding_failure_falls_back_to_exact_match(embeddings):
+    cache = AnswerCache(maxsize=8, ttl=60, semantic=True)
+
+    async def scenario():
+        await cache.store("没有登记的问题", 1, {"answer": "A"})
+        return await cache.lookup("没有登记的问题", 1), await cache.lookup("另一个问题", 1)
+
+    (hit, _), (miss, vector) = asyncio.run(scenario())
+    assert hit == {"answer": "A"}
+    assert (miss, vector) == (None, None)
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+import pytest
+from jose import JWTError
+from app.core import security, users
+from app.core.security import PasswordHasher, PasswordHasherBusy, create_access_token, decode_access_token
+from app.core.users import InMemoryUserStore, JsonFileUserStore, UserStore
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    security._token_cache.clear()
+
+def test_decode_caches_verified_tokens(monkeypatch):
+    token = create_access_token({"sub": "admin"}, timedelta(minutes=5))
+    assert decode_access_token(token)["sub"] == "admin"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cached token decoded again")
+
+    monkeypatch.setattr(security.jwt, "decode", fail)
+    assert decode_access_token(token)["sub"] == "admin"
+
+def test_cache_never_outlives_the_token(monkeypatch):
+    token = create_access_token({"sub": "admin"}, timedelta(seconds=2))
+    decode_access_token(token)
+    # 缓存条目在 token 的 exp 之后失效，之后重新走 jwt.decode 的有效期校验
+    now = time.monotonic()
+    monkeypatch.setattr("app.core.cache.time.monotonic", lambda: now + 3)
+
+    def expired(*args, **kwargs):
+        raise JWTError("Signature has expired.")
+
+    monkeypatch.setattr(security.jwt, "decode", expired)
+    with pytest.raises(JWTError):
+        decode_access_token(token)
+
+def test_expired_and_forged_tokens_are_rejected():
+    with pytest.raises(JWTError):
+        decode_access_token(create_access_token({"sub": "admin"}, timedelta(seconds=-1)))
+    with pytest.raises(JWTError):
+        decode_access_token(create_access_token({"sub": "admin"}, timedelta(minutes=5)) + "x")
+
+def test_password_hasher_round_trip():
+    hasher = PasswordHasher(workers=1, max_pending=1)
+
+    async def scenario():
+        hashed = await hasher.hash("s3cret")
+        return await hasher.verify("s3cret", hashed), await hasher.verify("wrong", hashed)
+
+    assert asyncio.run(scenario()) == (True, False)
+
+def test_password_hasher_rejects_when_queue_is_full():
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        blocked = [loop.create_task(hasher._run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.verify("x", "y")
+        release.set()
+        await asyncio.gather(*blocked)
+        return hasher.in_flight
+
+    assert asyncio.run(scenario()) == 0
+
+def test_user_store_is_abstract():
+    with pytest.raises(TypeError):
+        UserStore()
+
+    store = InMemoryUserStore()
+    store.upsert({"username": "alice", "hashed_password": "h"})
+    assert asyncio.run(store.get("alice"))["hashed_password"] == "h"
+    assert asyncio.run(store.get("bob")) is None
+
+def test_json_file_store_reloads_on_change(tmp_path):
+    path = str(tmp_path / "users.json")
+    store = JsonFileUserStore(path)
+    store.upsert({"username": "alice", "hashed_password": "h1", "disabled": False})
+    assert asyncio.run(store.get("alice"))["hashed_password"] == "h1"
+
+    # 另一个进程 (create_user 脚本) 修改了文件
+    JsonFileUserStore(path).upsert({"username": "bob", "hashed_password": "h2", "disabled": False})
+    assert asyncio.run(store.get("bob"))["hashed_password"] == "h2"
+    assert (tmp_path / "users.json").stat().st_mode & 0o777 == 0o600
+
+def test_missing_file_seeds_the_admin_user(tmp_path, monkeypatch):
+    monkeypatch.setattr(users.settings, "AUTH_BOOTSTRAP_ADMIN_PASSWORD", "admin")
+    store = JsonFileUserStore(str(tmp_path / "users.json"))
+    asyncio.run(store.prepare())
+    admin = asyncio.run(store.get("admin"))
+    assert security.verify_password("admin", admin["hashed_password"])
+
+    # 已有用户文件时不再改动
+    store.upsert({**admin, "hashed_password": security.get_password_hash("changed")})
+    asyncio.run(store.prepare())
+    assert security.verify_password("changed", asyncio.run(store.get("admin"))["hashed_password"])
+
+def test_missing_file_without_bootstrap_password_fails_startup(tmp_path, monkeypatch):
+    monkeypatch.setattr(users.settings, "AUTH_BOOTSTRAP_ADMIN_PASSWORD", "")
+    store = JsonFileUserStore(str(tmp_path / "users.json"))
+    with pytest.raises(RuntimeError):
+        asyncio.run(store.prepare())
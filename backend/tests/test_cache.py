@@ -0,0 +1,54 @@
+import pytest
+from app.core import cache
+from app.core.cache import TTLCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+def test_entries_expire_after_ttl(clock):
+    c = TTLCache(maxsize=4, ttl=10)
+    c.set("a", 1)
+    clock[0] += 9.9
+    assert c.get("a") == 1
+    clock[0] += 0.2
+    assert c.get("a") is None
+    assert c.get("a", "missing") == "missing"
+    assert len(c) == 0
+
+def test_per_entry_ttl_overrides_default(clock):
+    c = TTLCache(maxsize=4, ttl=60)
+    c.set("short", 1, ttl=1)
+    c.set("long", 2)
+    clock[0] += 2
+    assert c.get("short") is None
+    assert c.get("long") == 2
+    assert c.items() == [("long", 2)]
+
+def test_evicts_least_recently_used(clock):
+    c = TTLCache(maxsize=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # a 变为最近使用
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert (c.get("a"), c.get("c")) == (1, 3)
+
+def test_hit_rate_counts_hits_and_misses(clock):
+    c = TTLCache(maxsize=2, ttl=60)
+    assert c.hit_rate == 0.0
+    c.set("a", 1)
+    c.get("a")
+    c.get("b")
+    assert (c.hits, c.misses, c.hit_rate) == (1, 1, 0.5)
+    c.items()
+    assert (c.hits, c.misses) == (1, 1)
+
+def test_falsy_values_are_cached(clock):
+    c = TTLCache(maxsize=2, ttl=60)
+    c.set("empty", [])
+    assert c.get("empty", "missing") == []
+    c.clear()
+    assert c.get("empty", "missing") == "missing"
@@ -0,0 +1,95 @@
+import asyncio
+import datetime
+import gzip
+import json
+import pytest
+from fastapi import Response
+from app.api import responses
+from app.api.responses import FastJSONResponse, dumps, trusted
+from app.core.compression import CompressionMiddleware, negotiate
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("*", "br"),
+    ("identity", None),
+    ("", None),
+    ("gzip;q=abc", None),
+])
+def test_negotiate(header, expected):
+    assert negotiate(header, ("br", "gzip")) == expected
+
+def test_negotiate_without_brotli():
+    assert negotiate("br, gzip", ("gzip",)) == "gzip"
+    assert negotiate("br", ("gzip",)) is None
+
+def _app(body: bytes, content_type: str = "application/json", chunks: int = 1, headers=()):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", content_type.encode())] + list(headers)})
+        size = len(body) // chunks + 1
+        parts = [body[i:i + size] for i in range(0, len(body), size)]
+        for i, part in enumerate(parts):
+            await send({"type": "http.response.body", "body": part, "more_body": i < len(parts) - 1})
+    return app
+
+def _call(app, accept_encoding: str = "gzip", minimum_size: int = 100):
+    middleware = CompressionMiddleware(app, minimum_size=minimum_size)
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    start = messages[0]
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    return headers, b"".join(m.get("body", b"") for m in messages[1:])
+
+BODY = json.dumps([{"id": f"R-{i:03d}", "title": "风险"} for i in range(100)]).encode()
+
+def test_compresses_json():
+    headers, body = _call(_app(BODY))
+    assert headers["content-encoding"] == "gzip"
+    assert headers["content-length"] == str(len(body))
+    assert "Accept-Encoding" in headers["vary"]
+    assert gzip.decompress(body) == BODY
+
+@pytest.mark.parametrize("body, kwargs, accept_encoding", [
+    (BODY, {}, "identity"),
+    (b"[]", {}, "gzip"),
+    (BODY, {"content_type": "application/octet-stream"}, "gzip"),
+    (BODY, {"content_type": "text/event-stream"}, "gzip"),
+    # 多段发送的流式响应原样透传
+    (BODY, {"content_type": "application/x-ndjson", "chunks": 3}, "gzip"),
+    (BODY, {"headers": [(b"content-encoding", b"br")]}, "gzip"),
+])
+def test_passes_through(body, kwargs, accept_encoding):
+    headers, sent = _call(_app(body, **kwargs), accept_encoding)
+    assert headers.get("content-encoding") != "gzip"
+    assert sent == body
+
+def test_dumps_handles_neo4j_and_python_types():
+    class Neo4jDate:
+        def iso_format(self):
+            return "2024-03-01"
+
+    assert json.loads(dumps({"d": Neo4jDate(), "s": {1}, 2: datetime.date(2024, 3, 1)})) == {
+        "d": "2024-03-01", "s": [1], "2": "2024-03-01",
+    }
+
+def test_trusted_keeps_headers(monkeypatch):
+    monkeypatch.setattr(responses.settings, "TRUSTED_RESPONSES", True)
+    response = Response()
+    response.headers["X-Next-Cursor"] = "abc"
+    result = trusted([{"id": "R-001"}], response)
+    assert isinstance(result, FastJSONResponse)
+    assert result.headers["x-next-cursor"] == "abc"
+    assert json.loads(result.body) == [{"id": "R-001"}]
+
+    monkeypatch.setattr(responses.settings, "TRUSTED_RESPONSES", False)
+    assert trusted([{"id": "R-001"}], response) == [{"id": "R-001"}]
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import shutil
+import pandas as pd
+import pytest
+from app.db import graph_engine as engine_module
+from app.db.graph_engine import (
+    ATTRIBUTE_COLUMNS, GROUP_MAP, RISK_GROUP, GraphBuilder, GraphEngine, load_from_csv, load_from_neo4j,
+)
+from app.db.graph_version import write_version_stamp
+from tests.conftest import DATA_DIR
+
+CSV_FILES = ("risks.csv", "controls.csv", "relationships.csv")
+
+@pytest.fixture(scope="module")
+def graph():
+    return load_from_csv(DATA_DIR, 1)
+
+def _ids(result):
+    return {node["id"] for node in result["nodes"]}
+
+def test_counts(graph):
+    assert graph.node_count == len(pd.read_csv(os.path.join(DATA_DIR, "risks.csv"))) + \
+        len(pd.read_csv(os.path.join(DATA_DIR, "controls.csv")))
+    assert graph.edge_count == len(pd.read_csv(os.path.join(DATA_DIR, "relationships.csv")))
+
+def test_explore(graph):
+    result = graph.explore("A.9.4.1", 1, None, None, 50)
+    assert result["nodes"][0]["id"] == "A.9.4.1"
+    assert _ids(result) == {"A.9.4.1", "ISO-A.9", "R-001", "R-006", "LOG-005"}
+    assert {(link["source"], link["target"], link["type"]) for link in result["links"]} >= {
+        ("A.9.4.1", "R-001", "MITIGATES"), ("ISO-A.9", "A.9.4.1", "CONTAINS"),
+    }
+    # 链接两端都在返回的节点中
+    assert all(link["source"] in _ids(result) and link["target"] in _ids(result) for link in result["links"])
+
+def test_explore_filters(graph):
+    assert _ids(graph.explore("A.9.4.1", 1, ["Risk"], None, 50)) == {"A.9.4.1", "R-001", "R-006"}
+    assert _ids(graph.explore("ISO27001", 2, None, ["CONTAINS"], 50)) == {
+        "ISO27001", "ISO-A.5", "ISO-A.9", "ISO-A.12",
+        "A.5.1.1", "A.5.1.2", "A.9.1.1", "A.9.2.1", "A.9.4.1", "A.12.3.1",
+    }
+    assert len(graph.explore("ISO27001", 3, None, None, 4)["nodes"]) == 4
+    assert graph.explore("NOPE", 1, None, None, 50) is None
+
+def test_regulation_tree(graph):
+    tree = graph.regulation_tree()
+    assert [domain["code"] for domain in tree] == ["A.12", "A.5", "A.9"]
+    a9 = next(domain for domain in tree if domain["id"] == "ISO-A.9")
+    assert [child["id"] for child in a9["children"]] == ["A.9.1.1", "A.9.2.1", "A.9.4.1"]
+
+def test_traceability(graph):
+    (row,) = graph.traceability(["A.9.4.1", "R-001", "NOPE"], 3)
+    assert row["control"]["id"] == "A.9.4.1"
+    assert [risk["id"] for risk in row["risks"]] == ["R-001", "R-006"]
+    assert [evidence["id"] for evidence in row["evidence"]] == ["LOG-005"]
+
+def test_risk_page(graph):
+    rows = graph.risk_page({"severity": ["High"]}, "id", False, None, ["id", "severity"], 10)
+    assert [row["item"] for row in rows] == [
+        {"id": "R-001", "severity": "High"}, {"id": "R-005", "severity": "High"}, {"id": "R-006", "severity": "High"},
+    ]
+    rows = graph.risk_page({}, "id", True, ("R-003", "R-003"), ["id"], 1)
+    assert [row["item"]["id"] for row in rows] == ["R-002", "R-001"]
+
+@pytest.fixture(scope="module")
+def sparse_graph():
+    """带缺失属性与无标签节点的小图谱。"""
+    builder = GraphBuilder()
+    builder.add_nodes(
+        ["C1", "R1", "R2", "R3", "X1"],
+        ["Control", "Risk", "Risk", "Risk", None],
+        [2, 4, 4, 4, 3],
+        {"severity": [None, "High", None, "Low"], "owner": [None, "Alice", None, None, None]},
+    )
+    builder.add_edges(["C1", "C1", "C1"], ["R1", "R2", "X1"], ["MITIGATES", "MITIGATES", "EVIDENCED_BY"])
+    return builder.build(1)
+
+def test_risk_page_unknown_value_matches_nothing(sparse_graph):
+    # 不在图谱中的取值与 Neo4j 的 IN 一致: 不匹配属性缺失的节点
+    assert sparse_graph.risk_page({"severity": ["Bogus"]}, "id", False, None, ["id"], 10) == []
+    rows = sparse_graph.risk_page({"severity": ["Bogus", "Low"]}, "id", False, None, ["id"], 10)
+    assert [row["item"]["id"] for row in rows] == ["R3"]
+
+def test_risk_page_null_property_is_not_matched(sparse_graph):
+    # R2 / R3 没有 owner，"Bob" 不在图谱中: 都只能匹配到 R1
+    rows = sparse_graph.risk_page({"owner": ["Alice", "Bob"]}, "id", False, None, ["id", "owner"], 10)
+    assert [row["item"] for row in rows] == [{"id": "R1", "owner": "Alice"}]
+    assert sparse_graph.risk_page({"owner": ["Bob"]}, "id", False, None, ["id"], 10) == []
+    rows = sparse_graph.risk_page({"severity": ["High", "Low"]}, "id", False, None, ["id"], 10)
+    assert [row["item"]["id"] for row in rows] == ["R1", "R3"]
+
+def test_missing_labels_do_not_match_untyped_nodes(sparse_graph):
+    # 图谱中没有 Document / Evidence / ControlDomain 标签，无标签的 X1 不能被当作它们
+    (row,) = sparse_graph.traceability(["C1", "X1"], 2)
+    assert row["evidence"] == []
+    assert [risk["id"] for risk in row["risks"]] == ["R1", "R2"]
+    assert len(sparse_graph.nodes_of_type("Evidence")) == 0
+    assert sparse_graph.regulation_tree() == []
+    assert {node["id"] for node in sparse_graph.explore("C1", 1, ["Document"], None, 10)["nodes"]} == {"C1"}
+
+class FakeNeo4j:
+    """以 ETL 写入的形式 (节点属性 + 标签) 回放 CSV。"""
+    def __init__(self, directory):
+        risks = pd.read_csv(os.path.join(directory, "risks.csv"))
+        entities = pd.read_csv(os.path.join(directory, "controls.csv"))
+        self.nodes = [
+            {"id": row["id"], "type": "Risk", "group": RISK_GROUP,
+             "props": {**_props(row), "label": row["title"]}}
+            for row in risks.to_dict("records")
+        ] + [
+            {"id": row["id"], "type": row["type"], "group": GROUP_MAP.get(row["type"], 3),
+             "props": {**_props(row), "label": row["title"] if isinstance(row["title"], str) else row["code"]}}
+            for row in entities.to_dict("records")
+        ]
+        self.edges = pd.read_csv(os.path.join(directory, "relationships.csv")).to_dict("records")
+
+    async def stream_query(self, query, parameters=None, name=None):
+        for row in self.nodes if name == "graph_engine_nodes" else self.edges:
+            yield row
+
+def _props(row):
+    return {k: v for k, v in row.items() if k in ATTRIBUTE_COLUMNS and isinstance(v, str)}
+
+def test_neo4j_source_matches_csv(graph):
+    from_neo4j = asyncio.run(load_from_neo4j(FakeNeo4j(DATA_DIR), 1))
+    assert from_neo4j.node_count == graph.node_count
+    assert from_neo4j.edge_count == graph.edge_count
+    for seed in ("ISO27001", "A.9.4.1", "R-007"):
+        expected = graph.explore(seed, 2, None, None, 100)
+        actual = from_neo4j.explore(seed, 2, None, None, 100)
+        assert actual["nodes"] == expected["nodes"]
+        assert sorted(map(str, actual["links"])) == sorted(map(str, expected["links"]))
+    assert from_neo4j.regulation_tree() == graph.regulation_tree()
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    for name in CSV_FILES:
+        shutil.copy(os.path.join(DATA_DIR, name), tmp_path / name)
+    return str(tmp_path)
+
+def _load(engine, version):
+    return asyncio.run(engine.load(None, version))
+
+def test_csv_source_requires_a_matching_version_stamp(csv_dir, monkeypatch):
+    engine = GraphEngine(True, "csv", csv_dir)
+    monkeypatch.setattr(engine, "_swap", lambda graph: setattr(engine, "graph", graph))
+
+    with pytest.raises(RuntimeError):
+        _load(engine, 7)
+    assert engine._failed_version == 7
+
+    write_version_stamp(csv_dir, 7, CSV_FILES)
+    assert _load(engine, 7).version == 7
+    # 版本戳属于另一个版本
+    with pytest.raises(RuntimeError):
+        _load(engine, 8)
+
+    # ETL 之后 CSV 又被修改
+    with open(os.path.join(csv_dir, "risks.csv"), "a", encoding="utf-8") as f:
+        f.write("R-999,新增风险,Low,Other,Open,,,\n")
+    with pytest.raises(RuntimeError):
+        _load(engine, 7)
+
+def test_get_backs_off_after_a_failed_load(csv_dir, monkeypatch):
+    engine = GraphEngine(True, "csv", csv_dir)
+
+    async def current(db):
+        return 3
+
+    monkeypatch.setattr(engine_module.graph_version, "current", current)
+
+    async def scenario():
+        assert await engine.get(None) is None
+        with pytest.raises(RuntimeError):
+            await engine._task
+        first = engine._task
+        # 失败后的重试间隔内不再启动新的加载
+        assert await engine.get(None) is None
+        return engine._task is first
+
+    assert asyncio.run(scenario())
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import struct
+import pytest
+from app.db import graph_snapshot
+from app.db.graph_snapshot import SNAPSHOT_MAGIC, SnapshotStore, build_snapshot, etag_matches
+
+NODES = [
+    {"id": "R001", "group": 1, "label": "数据泄露"},
+    {"id": "C001", "group": 2, "label": "访问控制"},
+    {"id": "D001", "group": None, "label": "安全制度"},
+]
+EDGES = [
+    {"source": "C001", "target": "R001", "type": "MITIGATES"},
+    {"source": "C001", "target": "D001", "type": "DOCUMENTED_IN"},
+    {"source": "C001", "target": "X999", "type": "MITIGATES"},  # 端点不存在，丢弃
+]
+
+class FakeDB:
+    def __init__(self):
+        self.queries = []
+
+    async def execute_query(self, query, params=None, name=None):
+        self.queries.append(name)
+        return NODES if name == "snapshot_nodes" else EDGES
+
+@pytest.fixture
+def version(monkeypatch):
+    current = [1]
+
+    async def fake_current(db):
+        return current[0]
+
+    monkeypatch.setattr(graph_snapshot.graph_version, "current", fake_current)
+    return current
+
+def header(body: bytes) -> dict:
+    assert body[:4] == SNAPSHOT_MAGIC
+    length = struct.unpack("<I", body[4:8])[0]
+    return json.loads(body[8:8 + length])
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    (None, False),
+    ('"g3"', True),
+    ('W/"g3"', True),
+    ('"g2", W/"g3"', True),
+    ('"g2"', False),
+    ("*", True),
+])
+def test_etag_matches(if_none_match, expected):
+    assert etag_matches(if_none_match, '"g3"') is expected
+
+def test_snapshot_sections_are_aligned_and_complete():
+    snapshot = build_snapshot(NODES, EDGES, version=7, iterations=5)
+    meta = header(snapshot.body)
+    assert (snapshot.etag, meta["node_count"], meta["edge_count"]) == ('"g7"', 3, 2)
+    assert meta["edge_types"] == ["DOCUMENTED_IN", "MITIGATES"]
+    sections = {s["name"]: s for s in meta["sections"]}
+    assert all(s["offset"] % 4 == 0 for s in sections.values())
+    ids = sections["ids"]
+    assert snapshot.body[ids["offset"]:ids["offset"] + ids["length"]].decode("utf-8").split("\n") == ["R001", "C001", "D001"]
+    degree = sections["degree"]
+    assert struct.unpack("<3I", snapshot.body[degree["offset"]:degree["offset"] + 12]) == (1, 2, 1)
+
+def test_store_rebuilds_once_and_prunes_old_versions(tmp_path, version):
+    db = FakeDB()
+    store = SnapshotStore(str(tmp_path), iterations=2)
+
+    async def scenario():
+        await store.prepare(db)
+        await store._task
+        version[0] = 2
+        stale = await store.get(db)
+        await store._task
+        return stale, await store.get(db)
+
+    stale, fresh = asyncio.run(scenario())
+    # 重建期间继续提供旧快照
+    assert (stale.version, fresh.version) == (1, 2)
+    assert db.queries == ["snapshot_nodes", "snapshot_edges"] * 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["graph-2.bin"]
+
+def test_restart_serves_newest_disk_snapshot_while_rebuilding(tmp_path, version):
+    async def build(store, db):
+        await store.prepare(db)
+        await store._task
+
+    asyncio.run(build(SnapshotStore(str(tmp_path), iterations=2), FakeDB()))
+
+    # 进程重启且版本已前进: 先返回磁盘上的 v1，后台生成 v2
+    version[0] = 2
+    restarted, db = SnapshotStore(str(tmp_path), iterations=2), FakeDB()
+
+    async def scenario():
+        served = await restarted.get(db)
+        await restarted._task
+        return served
+
+    assert asyncio.run(scenario()).version == 1
+    assert restarted.latest.version == 2
+
+    # 版本未变时直接读盘，不再查询数据库
+    reloaded, db = SnapshotStore(str(tmp_path), iterations=2), FakeDB()
+    assert asyncio.run(reloaded.get(db)).version == 2
+    assert db.queries == []
+
+def test_concurrent_writers_never_expose_a_partial_file(tmp_path):
+    snapshot = build_snapshot(NODES, EDGES, version=3, iterations=2)
+    stores = [SnapshotStore(str(tmp_path), iterations=2) for _ in range(4)]
+
+    async def scenario():
+        await asyncio.gather(*(asyncio.to_thread(store._save_to_disk, snapshot) for store in stores))
+
+    asyncio.run(scenario())
+    # 各写入者的临时文件互不相同，替换后不留残余
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["graph-3.bin"]
+    assert (tmp_path / "graph-3.bin").read_bytes() == snapshot.body
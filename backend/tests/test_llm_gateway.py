@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+from app.langgraph_agent import llm_gateway
+from app.langgraph_agent.llm_gateway import LLMGateway, LLMOverloaded, SingleFlight, TokenBucket
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_gateway.time, "monotonic", lambda: now[0])
+    return now
+
+def make_gateway(**overrides):
+    options = dict(max_concurrency=1, rate=0, burst=1, max_queue=4, queue_timeout=1.0)
+    options.update(overrides)
+    return LLMGateway(**options)
+
+def test_token_bucket_bursts_then_waits(clock):
+    bucket = TokenBucket(rate=2, capacity=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    # 令牌可以透支，等待时间随排队线性增长
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+    clock[0] += 10
+    assert bucket.wait_time() == 0.0
+    assert bucket.tokens == 2
+
+def test_token_bucket_cancel_refunds(clock):
+    bucket = TokenBucket(rate=1, capacity=1)
+    bucket.reserve()
+    bucket.reserve()
+    bucket.cancel()
+    assert bucket.wait_time() == pytest.approx(1.0)
+    bucket.cancel()
+    bucket.cancel()
+    assert bucket.tokens == 1
+
+def test_single_flight_shares_the_leader_result():
+    flights = SingleFlight()
+
+    async def call(key, results):
+        future = flights.join(key)
+        if future is not None:
+            return await future
+        await asyncio.sleep(0.01)
+        result = results.pop(0)
+        flights.resolve(key, result)
+        return result
+
+    async def scenario():
+        results = ["first", "second"]
+        return await asyncio.gather(*(call("q", results) for _ in range(3)))
+
+    assert asyncio.run(scenario()) == ["first"] * 3
+    assert flights.coalesced == 2
+
+def test_single_flight_propagates_errors():
+    flights = SingleFlight()
+
+    async def scenario():
+        assert flights.join("q") is None
+        follower = flights.join("q")
+        flights.resolve("q", error=ValueError("boom"))
+        with pytest.raises(ValueError):
+            await follower
+        # leader 结束后相同键重新执行
+        assert flights.join("q") is None
+        flights.resolve("q", error=ValueError("no followers"))
+
+    asyncio.run(scenario())
+
+def test_queue_full_is_rejected_before_waiting():
+    gateway = make_gateway(max_queue=0)
+
+    async def scenario():
+        with pytest.raises(LLMOverloaded):
+            async with gateway.slot():
+                pass
+
+    asyncio.run(scenario())
+    assert (gateway.rejected, gateway.calls) == (1, 0)
+
+def test_slot_timeout_raises_overloaded():
+    gateway = make_gateway(queue_timeout=0.05)
+
+    async def scenario():
+        async with gateway.slot():
+            with pytest.raises(LLMOverloaded) as excinfo:
+                async with gateway.slot():
+                    pass
+        return excinfo.value.retry_after
+
+    assert asyncio.run(scenario()) == 1
+    assert (gateway.rejected, gateway.waiting, gateway.active) == (1, 0, 0)
+
+def test_unlimited_gateway_admits_a_slot_freed_near_the_deadline():
+    gateway = make_gateway(queue_timeout=0.2)
+
+    async def hold():
+        async with gateway.slot():
+            await asyncio.sleep(0.15)
+
+    async def scenario():
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        async with gateway.slot():
+            pass
+        await holder
+
+    asyncio.run(scenario())
+    assert (gateway.calls, gateway.rejected) == (2, 0)
+
+def test_rate_limit_beyond_deadline_refunds_token_and_slot():
+    gateway = make_gateway(max_concurrency=2, rate=1, burst=1, queue_timeout=0.1)
+
+    async def scenario():
+        async with gateway.slot():
+            pass
+        with pytest.raises(LLMOverloaded):
+            async with gateway.slot():
+                pass
+
+    asyncio.run(scenario())
+    assert gateway.rejected == 1
+    assert gateway.semaphore._value == 2
+    assert gateway.bucket.tokens < 1  # 只扣了第一次调用的令牌
+    assert gateway.bucket.tokens > -0.5
+
+def test_cancel_while_waiting_for_a_token_releases_the_slot():
+    gateway = make_gateway(rate=10, burst=1, queue_timeout=5)
+
+    async def use():
+        async with gateway.slot():
+            pass
+
+    async def scenario():
+        await use()
+        waiter = asyncio.create_task(use())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        # 槽位已归还，下一次调用不会因拿不到信号量而超时
+        await asyncio.wait_for(use(), timeout=1)
+
+    asyncio.run(scenario())
+    assert (gateway.waiting, gateway.active, gateway.semaphore._value) == (0, 0, 1)
@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from app.langgraph_agent.memory import GRAPH_CONTEXT_NAME, SUMMARY_NAME, compact_messages, estimate_tokens
+
+def conversation(tool_output: str = "结果"):
+    return [
+        SystemMessage(id="sys", content="你是审计助手"),
+        HumanMessage(id="h1", content="R001 的控制措施有哪些？"),
+        AIMessage(id="a1", content="", tool_calls=[{"id": "c1", "name": "query_graph", "args": {"q": "R001"}}]),
+        ToolMessage(id="t1", content=tool_output, name="query_graph", tool_call_id="c1"),
+        AIMessage(id="a2", content="R001 由 C001 缓解。"),
+        SystemMessage(id="ctx2", content="检索上下文", name=GRAPH_CONTEXT_NAME),
+        HumanMessage(id="h2", content="C001 的负责人是谁？"),
+    ]
+
+class Summarizer:
+    def __init__(self, error: Exception = None):
+        self.calls = []
+        self.error = error
+
+    async def __call__(self, messages):
+        self.calls.append(messages)
+        if self.error is not None:
+            raise self.error
+        return AIMessage(content="用户关注 R001，已知由 C001 缓解。")
+
+def compact(messages, summarize, **kwargs):
+    options = dict(budget=10_000, keep=1, tool_max_chars=100)
+    options.update(kwargs)
+    return asyncio.run(compact_messages(messages, summarize, **options))
+
+def test_within_budget_is_untouched():
+    summarize = Summarizer()
+    assert compact(conversation(), summarize) == []
+    assert summarize.calls == []
+
+def test_large_tool_output_is_truncated_in_place():
+    messages = conversation("x" * 5000)
+    summarize = Summarizer()
+    budget = estimate_tokens(conversation("x" * 100)) + 200
+    updates = compact(messages, summarize, budget=budget)
+    assert [m.id for m in updates] == ["t1"]
+    assert updates[0].content.startswith("x" * 100)
+    assert "已截断" in updates[0].content
+    assert updates[0].tool_call_id == "c1"
+    assert summarize.calls == []
+
+def test_old_turns_are_summarized_and_the_current_turn_kept():
+    summarize = Summarizer()
+    updates = compact(conversation(), summarize, budget=1)
+    assert isinstance(updates[0], RemoveMessage)
+    assert updates[1].id == "sys"
+    assert updates[2].name == SUMMARY_NAME
+    assert "C001" in updates[2].content
+    # 当前这一轮连同它的检索上下文原样保留
+    assert [m.id for m in updates[3:]] == ["ctx2", "h2"]
+    transcript = summarize.calls[0][1].content
+    assert "用户: R001 的控制措施有哪些？" in transcript
+    assert "助手调用工具: query_graph" in transcript
+
+def test_previous_summary_is_rolled_into_the_new_one():
+    messages = conversation()
+    messages.insert(1, SystemMessage(id="s0", content="更早的摘要", name=SUMMARY_NAME))
+    summarize = Summarizer()
+    updates = compact(messages, summarize, budget=1)
+    assert "[此前摘要] 更早的摘要" in summarize.calls[0][1].content
+    assert [m.name for m in updates if isinstance(m, SystemMessage)] == [None, SUMMARY_NAME, GRAPH_CONTEXT_NAME]
+
+def test_split_never_starts_with_a_tool_message():
+    history = [HumanMessage(id="h0", content="有哪些高风险？"), AIMessage(id="a0", content="R001。")]
+    messages = conversation()[:1] + history + conversation()[1:5]
+    updates = compact(messages, Summarizer(), budget=1, keep=3)
+    assert [m.id for m in updates[3:]] == ["h1", "a1", "t1", "a2"]
+
+def test_nothing_to_summarize_before_the_kept_turns():
+    summarize = Summarizer()
+    assert compact(conversation()[:5], summarize, budget=1, keep=4) == []
+    assert summarize.calls == []
+
+@pytest.mark.parametrize("tool_output, expected", [("结果", []), ("x" * 5000, ["t1"])])
+def test_summary_failure_keeps_only_the_truncation(tool_output, expected):
+    updates = compact(conversation(tool_output), Summarizer(RuntimeError("LLM 不可用")), budget=1)
+    assert [m.id for m in updates] == expected
@@ -0,0 +1,43 @@
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from app.main import _route_template
+
+@pytest.fixture
+def templates():
+    router = APIRouter()
+
+    @router.get("/{id}/details")
+    async def details(id: str):
+        return {}
+
+    @router.get("/files/{path:path}")
+    async def files(path: str):
+        return {}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/regulations")
+    seen = []
+
+    @app.middleware("http")
+    async def record(request, call_next):
+        response = await call_next(request)
+        seen.append(_route_template(request.scope))
+        return response
+
+    client = TestClient(app)
+
+    def route_of(path):
+        client.get(path)
+        return seen[-1]
+
+    return route_of
+
+def test_route_template_uses_the_matched_route(templates):
+    assert templates("/api/regulations/A.9/details") == "/api/regulations/{id}/details"
+    # 路径参数的取值与固定路径段相同
+    assert templates("/api/regulations/details/details") == "/api/regulations/{id}/details"
+    assert templates("/api/regulations/files/a/b") == "/api/regulations/files/{path:path}"
+
+def test_unmatched_requests_share_one_label(templates):
+    assert templates("/api/nope/x") == "unmatched"
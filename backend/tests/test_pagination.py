@@ -0,0 +1,74 @@
+import random
+import pytest
+from fastapi import HTTPException, Response
+from app.api.pagination import NEXT_CURSOR_HEADER, build_page_query, decode_cursor, encode_cursor, paginate
+from app.db.graph_engine import GraphBuilder
+
+def test_cursor_round_trip():
+    for value in ("IT Security", None, 3, "含中文 / 与 符号"):
+        assert decode_cursor(encode_cursor(value, "R-001")) == (value, "R-001")
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not-a-cursor")
+    assert error.value.status_code == 400
+
+def test_first_page_has_only_filters():
+    query, params = build_page_query("Risk", "r", {"severity": ["High"], "status": None}, "id", False,
+                                     None, ["id", "title"], 50)
+    assert "r.severity IN $severity" in query
+    assert "$status" not in query
+    assert "ORDER BY r.id ASC" in query
+    assert params == {"limit": 51, "severity": ["High"]}
+
+def test_cursor_on_value_keeps_null_rows_ascending():
+    query, params = build_page_query("Risk", "r", {}, "owner", False, encode_cursor("a", "R-1"), ["id", "owner"], 10)
+    assert params["after_value"] == "a" and params["after_id"] == "R-1"
+    # null 排在升序末尾，不能被 r.owner > $after_value 过滤掉
+    assert "r.owner IS NULL" in query
+    assert "ORDER BY r.owner ASC, r.id ASC" in query
+
+def test_cursor_on_null_value():
+    query, params = build_page_query("Risk", "r", {}, "owner", False, encode_cursor(None, "R-1"), ["id", "owner"], 10)
+    assert "after_value" not in params
+    assert "(r.owner IS NULL AND r.id > $after_id)" in query
+
+    query, params = build_page_query("Risk", "r", {}, "owner", True, encode_cursor(None, "R-1"), ["id", "owner"], 10)
+    # 降序时 null 段在最前，之后还有全部非 null 的行
+    assert "((r.owner IS NULL AND r.id < $after_id) OR r.owner IS NOT NULL)" in query
+
+def test_paginate_sets_next_cursor_only_when_more_rows():
+    response = Response()
+    items = paginate([{"item": {"id": "R-1", "owner": "a"}}, {"item": {"id": "R-2", "owner": None}}], "owner", 1,
+                     response)
+    assert items == [{"id": "R-1", "owner": "a"}]
+    assert decode_cursor(response.headers[NEXT_CURSOR_HEADER]) == ("a", "R-1")
+
+    response = Response()
+    paginate([{"item": {"id": "R-1", "owner": "a"}}], "owner", 1, response)
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_engine_keyset_pages_cover_null_sort_values(descending):
+    rng = random.Random(1)
+    ids = [f"R-{i:04d}" for i in range(300)]
+    owners = [rng.choice([None, None, "a", "b", "c"]) for _ in ids]
+    builder = GraphBuilder()
+    builder.add_nodes(ids, ["Risk"] * len(ids), [4] * len(ids), {"owner": owners})
+    graph = builder.build(1)
+
+    # Neo4j 的顺序: null 在升序末尾、降序开头
+    present = sorted(((o, i) for o, i in zip(owners, ids) if o is not None), reverse=descending)
+    missing = sorted((i for o, i in zip(owners, ids) if o is None), reverse=descending)
+    present = [i for _, i in present]
+    expected = missing + present if descending else present + missing
+
+    seen, cursor = [], None
+    while True:
+        rows = graph.risk_page({}, "owner", descending, cursor, ["id", "owner"], 37)
+        items = [row["item"] for row in rows[:37]]
+        seen.extend(item["id"] for item in items)
+        if len(rows) <= 37:
+            break
+        cursor = decode_cursor(encode_cursor(items[-1]["owner"], items[-1]["id"]))
+    assert seen == expected
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import pytest
+from app.langgraph_agent import query_executor
+from app.langgraph_agent.query_executor import EMPTY_RESULT, normalize_query, run_guarded_query
+
+class RecordingClient:
+    def __init__(self, rows=None, truncated=False):
+        self.rows = rows if rows is not None else []
+        self.truncated = truncated
+        self.calls = []
+
+    async def execute_read(self, query, parameters=None, timeout=None, max_rows=None, name=None):
+        self.calls.append((query, parameters, name))
+        return self.rows, self.truncated
+
+@pytest.fixture
+def client(monkeypatch):
+    client = RecordingClient()
+    monkeypatch.setattr(query_executor, "async_neo4j_client", client)
+
+    async def current(db):
+        return 1
+
+    monkeypatch.setattr(query_executor.graph_version, "current", current)
+    query_executor._query_cache.clear()
+    return client
+
+def test_normalize_query_only_collapses_whitespace():
+    assert normalize_query("  MATCH (n)\n\tRETURN n.Title ;\n") == "MATCH (n) RETURN n.Title"
+
+def test_normalize_query_keeps_literals_and_comments():
+    query = "MATCH (r)  WHERE r.title = 'a  b' AND r.`x  y` = \"c\\\"  d\" // 注释  \n  RETURN r"
+    assert normalize_query(query) == "MATCH (r) WHERE r.title = 'a  b' AND r.`x  y` = \"c\\\"  d\" // 注释  \n RETURN r"
+    assert normalize_query("RETURN 'a b'") != normalize_query("RETURN 'a  b'")
+
+def test_literal_spacing_is_part_of_the_cache_key(client):
+    asyncio.run(run_guarded_query("MATCH (r:Risk {title: 'a b'}) RETURN r.id"))
+    asyncio.run(run_guarded_query("MATCH (r:Risk {title: 'a  b'}) RETURN r.id"))
+    assert len(client.calls) == 2
+
+def test_executes_original_text(client):
+    # 折叠换行会让 // 注释吞掉后面的 RETURN
+    query = "MATCH (r:Risk) // 全部风险\nRETURN r.id AS id;\n"
+    asyncio.run(run_guarded_query(query))
+    assert client.calls[0][0] == "MATCH (r:Risk) // 全部风险\nRETURN r.id AS id"
+
+def test_cache_key_is_normalized(client):
+    client.rows = [{"id": "R-001"}]
+    first = asyncio.run(run_guarded_query("MATCH (r:Risk)\nRETURN r.id AS id"))
+    second = asyncio.run(run_guarded_query("MATCH (r:Risk)   RETURN r.id AS id;"))
+    assert first == second == '[{"id": "R-001"}]'
+    assert len(client.calls) == 1
+
+def test_parameters_are_part_of_the_cache_key(client):
+    asyncio.run(run_guarded_query("MATCH (r:Risk {id: $id}) RETURN r", {"id": "R-001"}))
+    asyncio.run(run_guarded_query("MATCH (r:Risk {id: $id}) RETURN r", {"id": "R-002"}))
+    assert len(client.calls) == 2
+
+def test_empty_result(client):
+    assert asyncio.run(run_guarded_query("MATCH (r:Risk) RETURN r")) == EMPTY_RESULT
+
+def test_hidden_properties_and_truncation(client):
+    client.rows = [{"r": {"id": f"R-{i}", "embedding": [0.1] * 8, "embeddingHash": "x"}} for i in range(50)]
+    client.truncated = True
+    text = asyncio.run(run_guarded_query("MATCH (r:Risk) RETURN r"))
+    assert "embedding" not in text
+    assert "结果已截断" in text
+    rows = json.loads(text.split("\n")[0])
+    assert rows[0] == {"r": {"id": "R-0"}}
@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+from app.langgraph_agent.templates import TEMPLATES, IntentRouter, extract_slots, mentioned_ids
+
+@pytest.fixture
+def router():
+    return IntentRouter(TEMPLATES, limit=50)
+
+def _template(router, question):
+    route = router.match(question)
+    return route.template.name if route is not None else None
+
+def test_extract_slots():
+    assert extract_slots("列出所有 Open 的高风险") == {
+        "risk_id": None, "entity_id": None, "severity": "High", "status": "Open",
+    }
+    assert extract_slots("风险 r-12 的详情")["risk_id"] == "R-12"
+    # 全角字符先做 NFKC 归一化
+    assert extract_slots("控制 Ａ.9.1.1 的证据")["entity_id"] == "A.9.1.1"
+
+def test_mentioned_ids():
+    assert mentioned_ids("比较 R-001 和 R-002") == {"R-001", "R-002"}
+    assert mentioned_ids("ISO-A.5 包含哪些控制") == {"ISO-A.5"}
+
+@pytest.mark.parametrize("question, template", [
+    ("风险 R-001 由哪些控制缓解？", "risk_overview"),
+    ("R-001 的详情", "risk_overview"),
+    ("A.9.1.1 有哪些证据文档", "control_evidence"),
+    ("A.9.1.1 依赖哪些控制", "control_requires"),
+    ("ISO-A.5 包含哪些控制", "standard_controls"),
+    ("DOC-001 是什么", "entity_overview"),
+    ("列出所有 Open 的高风险", "risks_by_filter"),
+    ("有多少个风险", "risk_counts"),
+    ("哪些风险没有控制缓解", "unmitigated_risks"),
+])
+def test_routes(router, question, template):
+    assert _template(router, question) == template
+
+@pytest.mark.parametrize("question", [
+    # 只因为出现了像 ID 的词不能走概览模板
+    "FY2024-Q3 审计计划",
+    "R-001 的负责人调岗了",
+    # 多个实体: 模板只能回答其中一个
+    "R-001 和 R-002 的关系",
+    "A.9.1.1 与 A.9.2.1 有什么关联",
+    # 开放式问题交给完整的 Agent
+    "为什么 R-001 是高风险",
+    "如何降低高风险",
+])
+def test_falls_back_to_agent(router, question):
+    assert router.match(question) is None
+
+def test_filter_query_only_has_supplied_conditions(router):
+    both = router.match("列出所有 Open 的高风险")
+    assert "r.severity = $severity AND r.status = $status" in both.query
+    severity = router.match("列出所有高风险")
+    assert "r.severity = $severity" in severity.query and "$status" not in severity.query
+    unfiltered = router.match("列出所有风险")
+    assert "WHERE" not in unfiltered.query and "{where}" not in unfiltered.query
+    assert "IS NULL" not in both.query + severity.query + unfiltered.query
+
+def test_route_stats(router):
+    router.route("R-001 的详情")
+    router.route("如何降低高风险")
+    router.record_fallback()
+    stats = router.stats()
+    assert stats["requests"] == 2
+    assert stats["templates"] == {"risk_overview": 1}
+    assert stats["fast_path"] == 0 and stats["fallbacks"] == 1
+
+def test_empty_template_result_falls_back_to_agent(monkeypatch):
+    from langchain_core.messages import AIMessage
+    from app.langgraph_agent import graph
+    from app.langgraph_agent.query_executor import EMPTY_RESULT
+
+    async def empty_result(query, parameters=None, name="agent_cypher"):
+        return EMPTY_RESULT
+
+    async def store(*args, **kwargs):
+        pass
+
+    class FakeAgent:
+        async def astream_events(self, inputs, config=None, version=None):
+            yield {"event": "on_chain_end", "name": "LangGraph", "run_id": "1", "parent_ids": [],
+                   "data": {"output": {"messages": [AIMessage(content="agent answer")]}}}
+
+    router = IntentRouter(TEMPLATES, limit=50)
+    monkeypatch.setattr(graph, "intent_router", router)
+    monkeypatch.setattr(graph, "run_guarded_query", empty_result)
+    monkeypatch.setattr(graph.answer_cache, "store", store)
+    monkeypatch.setattr(graph.settings, "AGENT_FAST_PATH_ENABLED", True)
+    monkeypatch.setattr(graph.settings, "RAG_ENABLED", False)
+
+    async def collect():
+        return [event async for event in graph._answer_events(FakeAgent(), {}, [], "R-999 的详情", 1)]
+
+    done = asyncio.run(collect())[-1]
+    assert done["event"] == "done"
+    assert done["response"] == "agent answer"
+    assert "fast_path" not in done
+    assert router.stats()["fallbacks"] == 1